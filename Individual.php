@@ -21,9 +21,18 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST' && !empty($stock_code)) {
     // 4桁の数字部分を抽出（例: 7203.T → 7203）
     $code_only = preg_replace('/\.T$/', '', $stock_code);
 
-    // Pythonスクリプトを実行して分析結果を取得
-    $command = escapeshellcmd("python3 swing_analysis.py --individual " . escapeshellarg($code_only));
-    $output = shell_exec($command . ' 2>&1');
+    // 常駐分析サーバー（analysis_server.py）が起動していればそちらに問い合わせる
+    $context = stream_context_create(['http' => ['timeout' => 60, 'ignore_errors' => true]]);
+    $response = @file_get_contents("http://127.0.0.1:8765/individual?code=" . urlencode($code_only), false, $context);
+    $response_data = $response !== false ? json_decode($response, true) : null;
+
+    if (isset($response_data['text'])) {
+        $output = $response_data['text'];
+    } else {
+        // サーバー未起動時は従来どおりPythonスクリプトを実行
+        $command = escapeshellcmd("python3 swing_analysis.py --individual " . escapeshellarg($code_only));
+        $output = shell_exec($command . ' 2>&1');
+    }
 
     // 分析結果を解析
     $analysis_results = parse_analysis_results($output, $code_only);
@@ -0,0 +1,61 @@
+"""
+常駐分析サーバーの簡易クライアント（標準ライブラリのみで起動が速い）
+
+サーバーが起動していればHTTPで結果を受け取り、起動していなければ
+従来どおりこのプロセス内で分析する。出力は company.py / swing_analysis.py --individual と同じ。
+
+使用例:
+	python3 analysis_client.py company 7203
+	python3 analysis_client.py individual 7203
+"""
+import argparse
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Optional, Dict, Any
+
+# 常駐サーバーの待ち受け先（analysis_server.pyと共通）
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+def request_server(kind: str, code: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                   timeout: float = 60) -> Optional[Dict[str, Any]]:
+	"""
+	常駐サーバーに分析を依頼
+
+	Returns:
+		結果の辞書、サーバーに接続できなければNone
+	"""
+	url = f"http://{host}:{port}/{kind}?" + urllib.parse.urlencode({'code': code})
+	try:
+		with urllib.request.urlopen(url, timeout=timeout) as response:
+			return json.loads(response.read().decode('utf-8'))
+	except urllib.error.HTTPError as e:
+		return json.loads(e.read().decode('utf-8'))
+	except (urllib.error.URLError, OSError):
+		return None
+
+def main():
+	"""メイン処理"""
+	parser = argparse.ArgumentParser(description='常駐分析サーバーのクライアント')
+	parser.add_argument('kind', choices=['company', 'individual'], help='分析の種類')
+	parser.add_argument('code', help='銘柄コード（例: 7203）')
+	parser.add_argument('--host', default=DEFAULT_HOST, help='サーバーのアドレス')
+	parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='サーバーのポート')
+	args = parser.parse_args()
+
+	result = request_server(args.kind, args.code, args.host, args.port)
+
+	# サーバー未起動時はプロセス内で分析（重いモジュールはここで初めて読み込む）
+	if result is None:
+		from analysis_server import run_analysis
+		result = run_analysis(args.kind, args.code.strip())
+
+	if args.kind == 'company':
+		print(json.dumps(result, ensure_ascii=False))
+	else:
+		print(result.get('text', result.get('error', '')))
+
+if __name__ == "__main__":
+	main()
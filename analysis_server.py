@@ -0,0 +1,153 @@
+"""
+常駐分析サーバー
+
+yfinance・pandas・bs4などの重いモジュールを読み込んだまま常駐し、
+comp.php（銘柄レポート）とIndividual.php（個別分析）のリクエストにJSONで応答する。
+ページを開くたびにPythonを起動して読み込みを待つ必要がなくなる。
+
+起動例:
+	python3 analysis_server.py --port 8765
+
+リクエスト例:
+	http://127.0.0.1:8765/company?code=7203     → company.py と同じJSON
+	http://127.0.0.1:8765/individual?code=7203  → {"code": ..., "text": 個別分析の出力}
+	http://127.0.0.1:8765/health                → {"status": "ok"}
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import company
+import swing_analysis
+from analysis_client import DEFAULT_HOST, DEFAULT_PORT
+
+# 同じ銘柄への連続アクセスは計算結果を使い回す（秒）
+DEFAULT_RESULT_TTL = 60
+
+# 結果キャッシュに残す銘柄数の上限
+DEFAULT_RESULT_CACHE_SIZE = 256
+
+# comp.phpと同じ銘柄コードの形式（例: 7203, 285A）
+CODE_PATTERN = re.compile(r'^[0-9A-Z]{3,5}$')
+
+class ResultCache:
+	"""
+	(種類, 銘柄コード) をキーにした有効期限付きの結果キャッシュ
+	常駐中に銘柄が増え続けてもメモリを使い続けないよう、max_size件を超えたら最も長く使われていない結果から捨てる
+	"""
+
+	def __init__(self, ttl: float, max_size: int = DEFAULT_RESULT_CACHE_SIZE):
+		self.ttl = ttl
+		self.max_size = max_size
+		self._lock = threading.Lock()
+		# 古く使われた順（末尾が最近使った結果）
+		self._items: 'OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]' = OrderedDict()
+
+	def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			item = self._items.get(key)
+			if item is None:
+				return None
+			if time.monotonic() - item[0] >= self.ttl:
+				del self._items[key]
+				return None
+			self._items.move_to_end(key)
+			return item[1]
+
+	def set(self, key: Tuple[str, str], value: Dict[str, Any]) -> None:
+		with self._lock:
+			now = time.monotonic()
+			# 期限切れの結果を捨ててから追加し、それでも多ければ最も長く使われていないものから捨てる
+			for expired in [k for k, (stored_at, _) in self._items.items() if now - stored_at >= self.ttl]:
+				del self._items[expired]
+			self._items[key] = (now, value)
+			self._items.move_to_end(key)
+			while len(self._items) > self.max_size:
+				self._items.popitem(last=False)
+
+	def __len__(self) -> int:
+		with self._lock:
+			return len(self._items)
+
+def run_analysis(kind: str, code: str) -> Dict[str, Any]:
+	"""
+	分析を実行して結果を返す
+
+	Args:
+		kind: 'company'（銘柄レポート）または 'individual'（個別分析）
+		code: 銘柄コード
+	"""
+	if kind == 'company':
+		return company.analyze_company(code)
+	return {'code': code, 'text': swing_analysis.individual_report(code)}
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+	"""GET /company?code=... と GET /individual?code=... に応答するハンドラ"""
+
+	cache: ResultCache = ResultCache(DEFAULT_RESULT_TTL)
+
+	def do_GET(self):
+		parsed = urlparse(self.path)
+		kind = parsed.path.strip('/')
+
+		if kind == 'health':
+			self._send_json(200, {'status': 'ok'})
+			return
+
+		if kind not in ('company', 'individual'):
+			self._send_json(404, {'error': 'unknown endpoint'})
+			return
+
+		code = parse_qs(parsed.query).get('code', [''])[0].strip().upper()
+		if not CODE_PATTERN.match(code):
+			self._send_json(400, {'error': 'invalid code'})
+			return
+
+		result = self.cache.get((kind, code))
+		if result is None:
+			try:
+				result = run_analysis(kind, code)
+			except Exception as e:
+				traceback.print_exc()
+				self._send_json(500, {'error': str(e)})
+				return
+			self.cache.set((kind, code), result)
+
+		self._send_json(200, result)
+
+	def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+		body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json; charset=utf-8')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+def main():
+	"""メイン処理"""
+	parser = argparse.ArgumentParser(description='常駐分析サーバー')
+	parser.add_argument('--host', default=DEFAULT_HOST, help='待ち受けアドレス（デフォルト: 127.0.0.1）')
+	parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='待ち受けポート')
+	parser.add_argument('--ttl', type=float, default=DEFAULT_RESULT_TTL, help='結果キャッシュの有効期間（秒）')
+	parser.add_argument('--cache-size', type=int, default=DEFAULT_RESULT_CACHE_SIZE, help='結果キャッシュに残す件数の上限')
+	args = parser.parse_args()
+
+	AnalysisRequestHandler.cache = ResultCache(args.ttl, args.cache_size)
+	server = ThreadingHTTPServer((args.host, args.port), AnalysisRequestHandler)
+	print(f"分析サーバー起動: http://{args.host}:{args.port}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+if __name__ == "__main__":
+	main()
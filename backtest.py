@@ -0,0 +1,204 @@
+"""
+保存済みの分析結果のバックテスト
+
+analysis_results・bandwalk_results・expansion_results に保存された利食い目標・損切りラインが、
+シグナル発生後の日足で実際に達成されたかを検証し、モデル・スコア帯ごとに集計する。
+全シグナルの判定は (シグナル × 保有日数) の配列でまとめて行う。
+
+使用例:
+	python3 backtest.py                            # 保存済みの日足で5営業日後まで検証
+	python3 backtest.py --horizon 10 --start 2025-01-01
+	python3 backtest.py --update                   # 不足している日足をyfinanceから取得してから検証
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Optional, List, Dict
+from db_manager import DatabaseManager
+from price_store import PriceStore
+
+MODELS = ['trinity', 'bandwalk', 'expansion']
+
+# 利食い目標・損切りラインはATRから「5日後の期待値」として計算している
+DEFAULT_HORIZON = 5
+
+# 三位一体モデルのスコア帯
+SCORE_BANDS = [0, 40, 60, 80, 101]
+SCORE_BAND_LABELS = ['0-39', '40-59', '60-79', '80-100']
+
+class BarMatrix:
+	"""全銘柄の日足を共通の日付軸に並べた (銘柄 × 日) の配列（その日に日足がない銘柄はNaN）"""
+
+	def __init__(self, price_data: Dict[str, pd.DataFrame]):
+		self.codes = list(price_data)
+		self.code_index = {code: i for i, code in enumerate(self.codes)}
+		if price_data:
+			self.dates = np.unique(np.concatenate([df.index.values for df in price_data.values()]))
+		else:
+			self.dates = np.array([], dtype='datetime64[ns]')
+
+		shape = (len(self.codes), len(self.dates))
+		self.high = np.full(shape, np.nan)
+		self.low = np.full(shape, np.nan)
+		self.close = np.full(shape, np.nan)
+		for i, code in enumerate(self.codes):
+			df = price_data[code]
+			columns = np.searchsorted(self.dates, df.index.values)
+			self.high[i, columns] = df['High'].to_numpy(dtype=float)
+			self.low[i, columns] = df['Low'].to_numpy(dtype=float)
+			self.close[i, columns] = df['Close'].to_numpy(dtype=float)
+
+def run_backtest(signals: pd.DataFrame, bars: BarMatrix, horizon: int = DEFAULT_HORIZON) -> pd.DataFrame:
+	"""
+	シグナルごとに利食い目標・損切りラインへの到達を判定
+
+	エントリーはシグナル日（analysis_date）以前の最後の終値。
+	目標・損切りはシグナル時の価格からの比率で扱うため、後から配当・分割の調整が入っても判定がずれない。
+	同じ日に両方へ達した場合は損切りが先とみなす（保守的な判定）。
+
+	Args:
+		signals: analysis_date, code, price, profit_target, stop_loss の列を持つDataFrame
+		bars: 全銘柄の日足
+		horizon: 保有する最大の営業日数
+
+	Returns:
+		signalsに outcome（target / stop / timeout / open）・days・return の列を加えたDataFrame
+		（日足のない銘柄のシグナルは除く）
+	"""
+	signals = signals[signals['code'].isin(list(bars.code_index))].reset_index(drop=True)
+	if signals.empty or len(bars.dates) == 0:
+		return signals.iloc[0:0].assign(outcome='', days=np.nan, **{'return': np.nan})
+
+	rows = signals['code'].map(bars.code_index).to_numpy()
+	signal_dates = pd.to_datetime(signals['analysis_date']).values
+	entry_columns = np.searchsorted(bars.dates, signal_dates, side='right') - 1
+	n_dates = len(bars.dates)
+
+	entry = np.where(entry_columns >= 0, bars.close[rows, np.maximum(entry_columns, 0)], np.nan)
+	price = signals['price'].to_numpy(dtype=float)
+	target_ratio = signals['profit_target'].to_numpy(dtype=float) / price - 1
+	stop_ratio = signals['stop_loss'].to_numpy(dtype=float) / price - 1
+	target = entry * (1 + target_ratio)
+	stop = entry * (1 + stop_ratio)
+
+	# (シグナル × 保有日数) の高値・安値・終値
+	columns = entry_columns[:, np.newaxis] + 1 + np.arange(horizon)
+	in_range = columns < n_dates
+	columns = np.minimum(columns, n_dates - 1)
+	future_high = np.where(in_range, bars.high[rows[:, np.newaxis], columns], np.nan)
+	future_low = np.where(in_range, bars.low[rows[:, np.newaxis], columns], np.nan)
+	future_close = np.where(in_range, bars.close[rows[:, np.newaxis], columns], np.nan)
+
+	with np.errstate(invalid='ignore'):
+		hit_target = future_high >= target[:, np.newaxis]
+		hit_stop = future_low <= stop[:, np.newaxis]
+	first_target = np.where(hit_target.any(axis=1), hit_target.argmax(axis=1), horizon)
+	first_stop = np.where(hit_stop.any(axis=1), hit_stop.argmax(axis=1), horizon)
+
+	# 保有期間の最後の終値（期間内に日足が揃っていなければ判定保留）
+	complete = entry_columns + horizon < n_dates
+	valid_close = ~np.isnan(future_close)
+	last_valid = horizon - 1 - valid_close[:, ::-1].argmax(axis=1)
+	exit_close = np.where(valid_close.any(axis=1), future_close[np.arange(len(signals)), last_valid], np.nan)
+
+	is_stop = first_stop < horizon
+	is_stop &= first_stop <= first_target
+	is_target = (first_target < horizon) & ~is_stop
+	is_timeout = ~is_stop & ~is_target & complete
+
+	outcome = np.select([is_target, is_stop, is_timeout], ['target', 'stop', 'timeout'], 'open')
+	days = np.select([is_target, is_stop, is_timeout], [first_target + 1, first_stop + 1, horizon], np.nan)
+	returns = np.select(
+		[is_target, is_stop, is_timeout],
+		[target_ratio, stop_ratio, exit_close / entry - 1],
+		np.nan
+	) * 100
+
+	result = signals.assign(outcome=outcome, days=days, **{'return': returns})
+	# エントリー価格がない（シグナル日以前の日足がない）シグナルは除く
+	return result[~np.isnan(entry)].reset_index(drop=True)
+
+def score_band(scores: pd.Series) -> pd.Series:
+	"""三位一体モデルのスコアをスコア帯のラベルに変換"""
+	return pd.cut(scores, SCORE_BANDS, right=False, labels=SCORE_BAND_LABELS).astype(str)
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+	"""
+	モデル・スコア帯ごとの集計
+
+	Returns:
+		シグナル数・判定保留数・利食い率・損切り率・時間切れ率（%）・利食いまでの平均日数・期待値（平均騰落率%）
+	"""
+	columns = ['model', 'band', 'signals', 'open', 'hit_rate', 'stop_rate', 'timeout_rate',
+	           'days_to_target', 'expectancy']
+	if results.empty:
+		return pd.DataFrame(columns=columns)
+
+	rows = []
+	for (model, band), group in results.groupby(['model', 'band'], sort=False):
+		closed = group[group['outcome'] != 'open']
+		n = len(closed)
+		targets = closed[closed['outcome'] == 'target']
+		rows.append({
+			'model': model,
+			'band': band,
+			'signals': n,
+			'open': len(group) - n,
+			'hit_rate': round(len(targets) / n * 100, 1) if n else None,
+			'stop_rate': round((closed['outcome'] == 'stop').mean() * 100, 1) if n else None,
+			'timeout_rate': round((closed['outcome'] == 'timeout').mean() * 100, 1) if n else None,
+			'days_to_target': round(targets['days'].mean(), 2) if len(targets) else None,
+			'expectancy': round(closed['return'].mean(), 2) if n else None
+		})
+	return pd.DataFrame(rows, columns=columns)
+
+def load_signals(db: DatabaseManager, models: List[str], start_date: Optional[str] = None,
+                 end_date: Optional[str] = None) -> pd.DataFrame:
+	"""保存済みのシグナルをモデル・スコア帯の列付きで読み込む"""
+	frames = []
+	for model in models:
+		signals = pd.DataFrame(db.get_signals(model, start_date, end_date))
+		if signals.empty:
+			continue
+		signals['model'] = model
+		signals['band'] = score_band(signals['score']) if model == 'trinity' else 'all'
+		frames.append(signals)
+	if not frames:
+		return pd.DataFrame(columns=['analysis_date', 'code', 'price', 'score', 'profit_target', 'stop_loss', 'model', 'band'])
+	return pd.concat(frames, ignore_index=True)
+
+def main():
+	"""メイン処理"""
+	parser = argparse.ArgumentParser(description='保存済みの分析結果のバックテスト')
+	parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON, help='保有する最大の営業日数（デフォルト: 5）')
+	parser.add_argument('--start', type=str, help='この日付以降のシグナルを検証（YYYY-MM-DD）')
+	parser.add_argument('--end', type=str, help='この日付以前のシグナルを検証（YYYY-MM-DD）')
+	parser.add_argument('--model', choices=MODELS, action='append', help='検証するモデル（複数指定可、省略時は全モデル）')
+	parser.add_argument('--update', action='store_true', help='不足している日足をyfinanceから取得してから検証')
+	args = parser.parse_args()
+
+	db = DatabaseManager()
+	signals = load_signals(db, args.model or MODELS, args.start, args.end)
+	if signals.empty:
+		print("検証できるシグナルがありません")
+		return
+
+	# 最初のシグナル日から今日までの日足（保存済みの日足を使い、--update時のみ不足分を取得）
+	first_date = pd.to_datetime(signals['analysis_date']).min().date()
+	days = (date.today() - first_date).days + 10
+	codes = sorted(signals['code'].unique())
+	price_data = PriceStore(db).load(codes, days=days, auto_adjust=True, update=args.update)
+	print(f"シグナル: {len(signals)} 件 / 銘柄: {len(codes)} / 日足あり: {len(price_data)} 銘柄")
+
+	results = run_backtest(signals, BarMatrix(price_data), args.horizon)
+	summary = summarize(results)
+
+	print(f"\n【バックテスト結果】（{args.horizon}営業日以内に利食い目標・損切りラインへ到達したか）")
+	if summary.empty:
+		print("判定できるシグナルがありません（日足が保存されていません。--update を指定してください）")
+	else:
+		print(summary.to_string(index=False))
+
+if __name__ == "__main__":
+	main()
@@ -18,12 +18,21 @@ if ($code !== '') {
 	if (!preg_match('/^[0-9A-Z]{3,5}$/', $code)) {
 		$error = "❌ 無効なコード形式です（例: 7203, 285A, 2768T など）: {$code}";
 	} else {
-		$python = 'python3';
-		$script = escapeshellarg("{$root}/company.py");
-		$arg = escapeshellarg($code);
-		$cmd = "{$python} {$script} {$arg} 2>&1";
-		exec($cmd, $output, $ret);
-		$out = implode("\n", (array)$output);
+		// 常駐分析サーバー（analysis_server.py）が起動していればそちらに問い合わせる
+		$cmd = "http://127.0.0.1:8765/company?code=" . urlencode($code);
+		$context = stream_context_create(['http' => ['timeout' => 60, 'ignore_errors' => true]]);
+		$out = @file_get_contents($cmd, false, $context);
+		$ret = 0;
+
+		// サーバー未起動時は従来どおりPythonスクリプトを実行
+		if ($out === false) {
+			$python = 'python3';
+			$script = escapeshellarg("{$root}/company.py");
+			$arg = escapeshellarg($code);
+			$cmd = "{$python} {$script} {$arg} 2>&1";
+			exec($cmd, $output, $ret);
+			$out = implode("\n", (array)$output);
+		}
 		$json_raw = $out; // 生のJSONを保存
 		$data = json_decode($out, true);
 		if ($ret !== 0) {
@@ -1,10 +1,15 @@
 import yfinance as yf
-import requests, re, json, sys, math
+import requests, re, json, sys, math, time
+from concurrent.futures import ThreadPoolExecutor, wait
 import pandas as pd
 import numpy as np
-from bs4 import BeautifulSoup
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime
-import pandas_ta as ta
+from price_store import PriceStore, benchmark_cache
+from scrape_cache import scrape_cache
+import kabutan
+from rules import Rule, Model, ScoreModel, latest
+from indicators import atr
 
 # --- helpers ---
 def to_float_or_none(x):
@@ -41,157 +46,108 @@ def calc_macd(close):
 	signal = macd.ewm(span=9, adjust=False).mean()
 	return macd, signal
 
+# === CCI ===
+def rolling_mean_deviation(values, window=14):
+	"""
+	移動平均偏差（窓内の平均からの絶対偏差の平均）を一括計算
+	rolling().apply(lambda) と同じ値を、sliding_window_viewでPythonの関数呼び出しなしに求める
+	1次元（1銘柄）でも2次元（銘柄×日付）でも最後の軸に沿って計算し、先頭のwindow-1本はNaN
+	"""
+	values = np.asarray(values, dtype=float)
+	out = np.full(values.shape, np.nan)
+	if values.shape[-1] < window:
+		return out
+	windows = sliding_window_view(values, window, axis=-1)
+	means = windows.mean(axis=-1, keepdims=True)
+	out[..., window - 1:] = np.abs(windows - means).mean(axis=-1)
+	return out
+
+def calc_cci(high, low, close, length=14):
+	"""
+	CCI = (TP - SMA(TP, n)) / (0.015 * 移動平均偏差)、TP = (高値 + 安値 + 終値) / 3
+	2次元配列（銘柄×日付）を渡すと複数銘柄をまとめて計算できる
+	"""
+	tp = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float) + np.asarray(close, dtype=float)) / 3
+	sma = np.full(tp.shape, np.nan)
+	if tp.shape[-1] >= length:
+		sma[..., length - 1:] = sliding_window_view(tp, length, axis=-1).mean(axis=-1)
+	return (tp - sma) / (0.015 * rolling_mean_deviation(tp, length))
+
 # === ベータ値 ===
-def calc_beta(stock_close, index_close):
-	df = pd.concat([stock_close, index_close], axis=1).dropna()
-	df.columns = ['stock', 'index']
-	ret_s = df['stock'].pct_change().dropna()
-	ret_i = df['index'].pct_change().dropna()
+def calc_beta(stock_close, index_close=None, index_returns=None):
+	"""
+	指数に対するベータ値
+	index_returnsに事前計算した指数の日次リターン（日付インデックスのSeries）を渡すと、
+	複数銘柄で同じ指数データを使い回せる
+	"""
+	if index_returns is None:
+		df = pd.concat([stock_close, index_close], axis=1).dropna()
+		df.columns = ['stock', 'index']
+		ret_s = df['stock'].pct_change().dropna()
+		ret_i = df['index'].pct_change().dropna()
+	else:
+		# 指数の日付に揃えてからリターンを計算する（銘柄だけ欠けた日の翌日は2日分のリターンになるため除外）
+		stock_returns = stock_close.reindex(index_returns.index).pct_change(fill_method=None)
+		df = pd.concat([stock_returns, index_returns], axis=1).dropna()
+		ret_s = df.iloc[:, 0]
+		ret_i = df.iloc[:, 1]
 	if len(ret_s) < 10:
 		return None
 	cov = np.cov(ret_s, ret_i)[0][1]
 	var = np.var(ret_i)
 	return float(cov / var) if var else None
 
+def calc_beta_many(stock_closes, index_returns):
+	"""
+	複数銘柄のベータ値を1回のベクトル演算で計算
+	stock_closesは日付×銘柄の終値DataFrame。calc_betaと同じく指数の日付に揃えてからリターンを計算し、
+	欠損は銘柄ごとに除外する
+
+	Returns:
+		銘柄をインデックスとしたベータ値のSeries（データ不足・指数の分散0はNaN）
+	"""
+	rets = stock_closes.reindex(index_returns.index).pct_change(fill_method=None)
+	stock_r = rets.to_numpy(dtype=float)
+	index_r = index_returns.to_numpy(dtype=float)[:, None]
+
+	mask = ~np.isnan(stock_r) & ~np.isnan(index_r)
+	n = mask.sum(axis=0)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		mean_s = np.where(mask, stock_r, 0).sum(axis=0) / n
+		mean_i = np.where(mask, index_r, 0).sum(axis=0) / n
+		dev_s = np.where(mask, stock_r - mean_s, 0)
+		dev_i = np.where(mask, index_r - mean_i, 0)
+		cov = (dev_s * dev_i).sum(axis=0) / (n - 1)  # np.covと同じ不偏共分散
+		var = (dev_i ** 2).sum(axis=0) / n           # np.varと同じ標本分散
+		beta = np.where((n >= 10) & (var > 0), cov / var, np.nan)
+	return pd.Series(beta, index=stock_closes.columns)
+
 # === Kabutan決算発表予定日 ===
-def fetch_earnings_date(code):
+def fetch_earnings_date(code, session=None, timeout=10):
 	url = f"https://kabutan.jp/stock/finance?code={code}"
 	try:
-		html = requests.get(url, headers={"User-Agent":"Mozilla/5.0"}, timeout=10).text
-		soup = BeautifulSoup(html, "html.parser")
-
-		# 方法1: id="kessan_happyoubi" のdiv要素を探す
-		kessan_div = soup.find("div", id="kessan_happyoubi")
-		if kessan_div:
-			# time要素のdatetime属性から日付を取得
-			time_elem = kessan_div.find("time")
-			if time_elem and time_elem.has_attr("datetime"):
-				datetime_str = time_elem["datetime"]
-				# datetime形式: "2025-11-06T00:00:00+09:00" から日付部分を抽出
-				m = re.search(r"(\d{4}-\d{2}-\d{2})", datetime_str)
-				if m:
-					return m.group(1)
-
-		# 方法2: 「決算発表予定日」を含むdt要素を探す
-		dt_elem = soup.find("dt", string=lambda s: s and "決算発表予定日" in s)
-		if dt_elem:
-			dd_elem = dt_elem.find_next_sibling("dd")
-			if dd_elem:
-				time_elem = dd_elem.find("time")
-				if time_elem and time_elem.has_attr("datetime"):
-					datetime_str = time_elem["datetime"]
-					m = re.search(r"(\d{4}-\d{2}-\d{2})", datetime_str)
-					if m:
-						return m.group(1)
-
-		# 方法3: 従来の方法（互換性のため）
-		th = soup.find("th", string=lambda s: s and "決算発表日" in s)
-		if th:
-			td = th.find_next_sibling("td")
-			if td:
-				m = re.search(r"(\d{4})年(\d{1,2})月(\d{1,2})日", td.text)
-				if m:
-					y,mn,d = map(int, m.groups())
-					return f"{y:04d}-{mn:02d}-{d:02d}"
-
-		# 方法4: テキスト検索で探す
-		dt = soup.find(string=re.compile("決算発表日"))
-		if dt:
-			dd = dt.find_parent().find_next_sibling()
-			if dd:
-				m = re.search(r"(\d{4})年(\d{1,2})月(\d{1,2})日", dd.text)
-				if m:
-					y,mn,d = map(int, m.groups())
-					return f"{y:04d}-{mn:02d}-{d:02d}"
+		html = (session or requests).get(url, headers={"User-Agent":"Mozilla/5.0"}, timeout=timeout).text
+		return kabutan.parse_earnings_date(html)
 	except Exception as e:
 		# デバッグ用: エラーを無視するが、必要に応じてログ出力可能
 		pass
 	return None
 
 # === Kabutan信用倍率 ===
-def fetch_credit_ratio(code):
-	url = f"https://kabutan.jp/stock/?code={code}"
-	headers = {"User-Agent": "Mozilla/5.0"}
+def fetch_credit_ratio(code, session=None, timeout=10):
+	# 銘柄ページはswing_analysis.pyの企業名取得と共通のキャッシュ済みレコードから読む
 	try:
-		res = requests.get(url, headers=headers, timeout=10)
-		res.raise_for_status()
-		soup = BeautifulSoup(res.text, "html.parser")
-
-		# 方法1: stockinfo_i3テーブル内の信用倍率を探す
-		stockinfo_i3 = soup.find("div", id="stockinfo_i3")
-		if stockinfo_i3:
-			table = stockinfo_i3.find("table")
-			if table:
-				# thead内のth要素で「信用倍率」の列インデックスを探す
-				thead = table.find("thead")
-				if thead:
-					th_elements = thead.find_all("th")
-					credit_ratio_index = -1
-					for i, th in enumerate(th_elements):
-						if th.get_text(strip=True) == "信用倍率":
-							credit_ratio_index = i
-							break
-
-					# tbody内の対応するtd要素を取得
-					if credit_ratio_index >= 0:
-						tbody = table.find("tbody")
-						if tbody:
-							tr = tbody.find("tr")
-							if tr:
-								td_elements = tr.find_all("td")
-								if len(td_elements) > credit_ratio_index:
-									td = td_elements[credit_ratio_index]
-									text = td.get_text(strip=True)
-									# 「－倍」などのデータなしを検出
-									if "－" in text or text == "―" or not text or text.startswith("-"):
-										return None
-									val = re.sub(r"[^0-9.]", "", text)
-									if val:
-										return float(val)
-
-		# 方法2: th要素で「信用倍率」を探す（従来の方法）
-		th = soup.find("th", string=lambda s: s and "信用倍率" in s)
-		if th:
-			td = th.find_next_sibling("td")
-			if not td:
-				td = th.find_next("td")
-			if td:
-				text = td.get_text(strip=True)
-				# 「－倍」などのデータなしを検出
-				if "－" in text or text == "―" or not text or text.startswith("-"):
-					return None
-				val = re.sub(r"[^0-9.]", "", text)
-				if val:
-					return float(val)
-
-		# 方法3: dt要素で探す
-		dt = soup.find("dt", string=lambda s: s and "信用倍率" in s)
-		if dt:
-			dd = dt.find_next_sibling("dd")
-			if dd:
-				text = dd.get_text(strip=True)
-				val = re.sub(r"[^0-9.]", "", text)
-				if val:
-					return float(val)
-
-		# 方法4: div.fin_data_set 内を探す
-		fin_data = soup.find_all("div", class_=re.compile(r"fin.*data"))
-		for div in fin_data:
-			if "信用倍率" in div.get_text():
-				text = div.get_text()
-				m = re.search(r"信用倍率[^0-9]*([0-9.]+)", text)
-				if m:
-					return float(m.group(1))
-
+		info = kabutan.get_stock_info(code, session, timeout)
+		return info.credit_ratio if info else None
 	except Exception as e:
 		pass
 	return None
 
 # === Minkabuニュース ===
-def fetch_minkabu_news(code, limit=10):
+def fetch_minkabu_news(code, limit=10, session=None, timeout=10):
 	url = f"https://assets.minkabu.jp/jsons/stock-jam/stocks/{code}/lump.json"
 	try:
-		data = requests.get(url, headers={"User-Agent":"Mozilla/5.0"}, timeout=10).json()
+		data = (session or requests).get(url, headers={"User-Agent":"Mozilla/5.0"}, timeout=timeout).json()
 		news_days = data.get("stock", {}).get("news", [])
 		items = [n for group in news_days for n in (group or [])]
 		items.sort(key=lambda x: x.get("published_at", ""), reverse=True)
@@ -211,7 +167,134 @@ def fetch_minkabu_news(code, limit=10):
 	except Exception:
 		return {"error": "ニュース取得失敗"}
 
+# === 外部サイトの並行取得 ===
+# kabutan・minkabuの取得全体の締め切り（秒）
+SCRAPE_DEADLINE = 15
+
+# 1回のリクエストのタイムアウトの上限・下限（秒、締め切りまでの残り時間に合わせて短くする）
+REQUEST_TIMEOUT = 10
+MIN_REQUEST_TIMEOUT = 0.5
+
+class ExternalDataFetcher:
+	"""
+	決算発表日・信用倍率・ニュースを1つのSessionで並行して取得する
+	応答時間は3つの合計ではなく最も遅い1つになり、締め切りを過ぎた項目は取得失敗として扱う
+	有効期限内の値はscrape_cacheから返すため、同じ銘柄の再表示では通信しない
+	"""
+
+	# 締め切りまでに取得できなかった場合の値
+	DEFAULTS = {
+		"earnings_date": None,
+		"credit_ratio": None,
+		"news": {"error": "ニュース取得失敗"}
+	}
+
+	def __init__(self, code, deadline=SCRAPE_DEADLINE):
+		self.deadline = time.monotonic() + deadline
+		self.session = requests.Session()
+		self.closed = False
+		self.executor = ThreadPoolExecutor(max_workers=len(self.DEFAULTS))
+		# タイムアウトはリクエストを送る時点の残り時間から決める（レート制限の待ち時間を含めて締め切りに収める）
+		# scrape_cacheの裏での再取得はclose()の後にも呼ばれるため、Sessionは呼ばれた時点でlive_session()から得る
+		self.futures = {
+			"earnings_date": self.executor.submit(
+				scrape_cache.get, "earnings_date", code,
+				lambda: fetch_earnings_date(code, self.live_session(), self.request_timeout())
+			),
+			# 信用倍率は銘柄ページのレコード（kabutan.get_stock_info）がキャッシュ済み
+			"credit_ratio": self.executor.submit(
+				lambda: fetch_credit_ratio(code, self.live_session(), self.request_timeout())
+			),
+			"news": self.executor.submit(
+				scrape_cache.get, "news", code,
+				lambda: fetch_minkabu_news(code, session=self.live_session(), timeout=self.request_timeout())
+			)
+		}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		self.close()
+
+	def live_session(self):
+		"""取得に使うSession（close()の後はNoneを返し、各取得関数はリクエストごとに接続を開く）"""
+		return None if self.closed else self.session
+
+	def request_timeout(self):
+		"""締め切りまでの残り時間に収まるリクエストのタイムアウト（秒、close()後の裏での再取得はREQUEST_TIMEOUT）"""
+		if self.closed:
+			return REQUEST_TIMEOUT
+		remaining = self.deadline - time.monotonic()
+		return max(MIN_REQUEST_TIMEOUT, min(REQUEST_TIMEOUT, remaining))
+
+	def results(self):
+		"""締め切りまで待ち、揃った結果を返す"""
+		done, _ = wait(self.futures.values(), timeout=max(0, self.deadline - time.monotonic()))
+		out = {
+			key: future.result() if future in done else self.DEFAULTS[key]
+			for key, future in self.futures.items()
+		}
+		self.close()
+		return out
+
+	def close(self):
+		"""
+		未完了の取得を待たずに終了し、Sessionの接続を閉じる（2回呼んでもよい）
+		実行中のリクエストはタイムアウトが締め切りまでの残り時間以下のため、プロセス終了を締め切り後まで引き延ばさない
+		"""
+		if self.closed:
+			return
+		self.closed = True
+		self.executor.shutdown(wait=False, cancel_futures=True)
+		self.session.close()
+
 # === CCIベースの翌日株価期待値スコアラー ===
+# ステップAの優先順位・ステップCの出来高補正・ステップDのローソク足補正をルールで定義
+CCI_SCORE_MODEL = ScoreModel("cci", [
+	# A. CCIシグナル（優先順位に基づき重複適用不可）
+	Model("signal", [
+		# 優先度1：トレンド継続（順張り・バンドウォーク）
+		Rule("CCI > 100 and CCI > CCI[-1]", 5),     # 買い（順張り・加速）
+		Rule("CCI > 100", 3),                       # 買い（順張り・維持）
+		Rule("CCI < -100 and CCI < CCI[-1]", -5),   # 売り（順張り・加速）
+		Rule("CCI < -100", -3),                     # 売り（順張り・維持）
+		# 優先度2：トレンド転換（±200ラインからの反転が最強、±100ラインは通常の転換）
+		Rule("CCI[-1] < -200 and CCI >= -200", 6),
+		Rule("CCI[-1] > 200 and CCI <= 200", -6),
+		Rule("CCI[-1] < -100 and CCI >= -100", 4),
+		Rule("CCI[-1] > 100 and CCI <= 100", -4),
+		# 優先度3：トレンド発生（ゼロライン・クロス）
+		Rule("CCI[-1] < 0 and CCI >= 0", 3),
+		Rule("CCI[-1] > 0 and CCI <= 0", -3)
+	], mode="first", when="not isnan(CCI) and not isnan(CCI[-1])"),
+
+	# B. ダイバージェンス（簡易実装）: 複雑なため、まずはスキップ
+
+	# C. 補強要素：出来高（加熱圏にいる場合は出来高の有無で補正、転換・発生シグナルは出来高で強化）
+	Model("volume", [
+		Rule("CCI > 100 and VOLUME_RATIO < 1.0", -4),     # 出来高が伴わない（ダマシ・天井警戒）
+		Rule("CCI > 100 and VOLUME_RATIO >= 1.5", 2),     # 出来高を伴う（強い順張り）
+		Rule("CCI > 100", 0),
+		Rule("CCI < -100 and VOLUME_RATIO < 1.0", 4),     # 出来高が伴わない（ダマシ・底値警戒）
+		Rule("CCI < -100 and VOLUME_RATIO >= 1.5", -2),   # 出来高を伴う（強い順張り）
+		Rule("CCI < -100", 0),
+		Rule("score in (6, 4, 3) and VOLUME_RATIO >= 1.5", 2),      # 買い転換の信頼性強化
+		Rule("score in (-6, -4, -3) and VOLUME_RATIO >= 1.5", -2)   # 売り転換の信頼性強化
+	], mode="first"),
+
+	# D. 補強要素：ローソク足（大陽線・長い下ヒゲで買い、大陰線・長い上ヒゲで売りを強化）
+	Model("candle", [
+		Rule("score > 0 and High != Low and ((Close > Open and abs(Close - Open) / (High - Low) >= 0.7) or "
+		     "(min(Open, Close) - Low) / (High - Low) >= 0.5)", 2),
+		Rule("score < 0 and High != Low and ((Open > Close and abs(Close - Open) / (High - Low) >= 0.7) or "
+		     "(High - max(Open, Close)) / (High - Low) >= 0.5)", -2)
+	], mode="first")
+], derived={
+	# 出来高データがない場合は中立（1.0）として扱う
+	"VOLUME_RATIO": "Volume / Volume_SMA5 if Volume_SMA5 > 0 and not isnan(Volume) else 1.0"
+})
+
 def calc_cci_score(df, code):
 	"""
 	CCIベースの翌日株価期待値スコアを計算する
@@ -220,15 +303,9 @@ def calc_cci_score(df, code):
 		# データの最終日（最新日付）を取得
 		last_date = df.index[-1].strftime("%Y-%m-%d")
 
-		# CCI計算 (length=14) - pandas-taを使わずに手動計算
+		# CCI計算 (length=14) - pandas-taを使わずにcalc_cciで計算
 		df_copy = df.copy()
-
-		# CCIの計算式: (Typical Price - SMA(TP, n)) / (0.015 * Mean Deviation)
-		# Typical Price = (High + Low + Close) / 3
-		df_copy["TP"] = (df_copy["High"] + df_copy["Low"] + df_copy["Close"]) / 3
-		df_copy["TP_SMA"] = df_copy["TP"].rolling(window=14).mean()
-		df_copy["Mean_Deviation"] = df_copy["TP"].rolling(window=14).apply(lambda x: np.mean(np.abs(x - x.mean())))
-		df_copy["CCI"] = (df_copy["TP"] - df_copy["TP_SMA"]) / (0.015 * df_copy["Mean_Deviation"])
+		df_copy["CCI"] = calc_cci(df_copy["High"], df_copy["Low"], df_copy["Close"], 14)
 
 		# 出来高の5日間単純移動平均
 		df_copy["Volume_SMA5"] = df_copy["Volume"].rolling(5).mean()
@@ -240,107 +317,17 @@ def calc_cci_score(df, code):
 		# 必要な値を取得
 		cci_T = to_float_or_none(T["CCI"])
 		cci_T_minus_1 = to_float_or_none(T_minus_1["CCI"])
-		volume_T = to_float_or_none(T["Volume"])
-		volume_sma5_T = to_float_or_none(T["Volume_SMA5"])
-		open_T = to_float_or_none(T["Open"])
-		close_T = to_float_or_none(T["Close"])
-		high_T = to_float_or_none(T["High"])
-		low_T = to_float_or_none(T["Low"])
-
-		# スコア初期化
-		total_score = 0
-
-		# A. CCIシグナル（優先順位に基づき重複適用不可）
-		if cci_T_minus_1 is not None and cci_T is not None:
-
-			# 優先度1：トレンド継続（順張り・バンドウォーク）
-			# +100以上で、さらに勢いが加速している（または高値圏を維持）
-			if cci_T > 100:
-				if cci_T > cci_T_minus_1:
-					total_score = 5  # 買い（順張り・加速）
-				else:
-					total_score = 3  # 買い（順張り・維持）
-
-			# -100以下で、さらに勢いが加速している（または安値圏を維持）
-			elif cci_T < -100:
-				if cci_T < cci_T_minus_1:
-					total_score = -5 # 売り（順張り・加速）
-				else:
-					total_score = -3 # 売り（順張り・維持）
-
-			# 優先度2：トレンド転換（反転シグナル）
-			# 上記1の継続条件に該当しない場合のみ、反転をチェック
-			# ±200ラインからの反転（最強の転換）
-			elif cci_T_minus_1 < -200 and cci_T >= -200:
-				total_score = 6  # 買い（反転）
-			elif cci_T_minus_1 > 200 and cci_T <= 200:
-				total_score = -6 # 売り（反転）
-
-			# ±100ラインからの反転（通常の転換）
-			elif cci_T_minus_1 < -100 and cci_T >= -100:
-				total_score = 4  # 買い（反転）
-			elif cci_T_minus_1 > 100 and cci_T <= 100:
-				total_score = -4 # 売り（反転）
-
-			# 優先度3：トレンド発生（ゼロライン・クロス）
-			# 上記1, 2のいずれにも該当しない場合
-			elif cci_T_minus_1 < 0 and cci_T >= 0:
-				total_score = 3  # 買い（発生）
-			elif cci_T_minus_1 > 0 and cci_T <= 0:
-				total_score = -3 # 売り（発生）
-
-		# B. ダイバージェンス（簡易実装）
-		# 複雑なため、まずはスキップ
-
-		# C. 補強要素：出来高（加点・減点）
-		if volume_T is not None and volume_sma5_T is not None and volume_sma5_T > 0:
-			volume_ratio = volume_T / volume_sma5_T
-		else:
-			volume_ratio = 1.0 # 出来高データがない場合は中立（1.0）として扱う
-
-		# 判定1：CCIが加熱圏（±100超過）に「いる」場合
-		if cci_T > 100: # 買い加熱圏
-			if volume_ratio < 1.0: # 出来高が伴わない（ダマシ・天井警戒）
-				total_score -= 4 # スコア減点 (例: +5点シグナルが +1点に)
-			elif volume_ratio >= 1.5: # 出来高を伴う（強い順張り）
-				total_score += 2 # スコア加点 (例: +5点シグナルが +7点に)
-			# 1.0 <= ratio < 1.5 の場合は、ステップAのスコアのまま (加点・減点なし)
-
-		elif cci_T < -100: # 売り加熱圏
-			if volume_ratio < 1.0: # 出来高が伴わない（ダマシ・底値警戒）
-				total_score += 4 # スコア加点（反転期待）(例: -5点シグナルが -1点に)
-			elif volume_ratio >= 1.5: # 出来高を伴う（強い順張り）
-				total_score -= 2 # スコア減点 (例: -5点シグナルが -7点に)
-			# 1.0 <= ratio < 1.5 の場合は、ステップAのスコアのまま (加点・減点なし)
-
-		# 判定2：CCIが「転換・発生シグナル」を出した場合（±100の内側）
-		# (ステップAの優先度2, 3のスコアが対象)
-		elif total_score in [6, 4, 3, -6, -4, -3]:
-			if volume_ratio >= 1.5: # 転換時に出来高が多い
-				if total_score > 0:
-					total_score += 2 # 買い転換の信頼性強化
-				elif total_score < 0:
-					total_score -= 2 # 売り転換の信頼性強化
-
-		# D. 補強要素：ローソク足（加点）
-		if (open_T is not None and close_T is not None and
-			high_T is not None and low_T is not None and
-			high_T != low_T):  # ゼロ除算回避
-
-			body = abs(close_T - open_T)
-			range_val = high_T - low_T
-			body_ratio = body / range_val
-
-			if total_score > 0:  # 買いシグナル中
-				# 大陽線または長い下ヒゲ
-				if (close_T > open_T and body_ratio >= 0.7) or \
-				   (min(open_T, close_T) - low_T) / range_val >= 0.5:
-					total_score += 2
-			elif total_score < 0:  # 売りシグナル中
-				# 大陰線または長い上ヒゲ
-				if (open_T > close_T and body_ratio >= 0.7) or \
-				   (high_T - max(open_T, close_T)) / range_val >= 0.5:
-					total_score -= 2
+
+		# CCIが計算できない場合（データ不足など）はエラー扱い
+		if cci_T is None:
+			raise ValueError("CCIを計算できません（データ不足）")
+
+		# ステップA〜Dのルール（CCI_SCORE_MODEL）で採点
+		env = {
+			column: df_copy[column].to_numpy(dtype=float)[np.newaxis, :]
+			for column in ("Open", "High", "Low", "Close", "Volume", "Volume_SMA5", "CCI")
+		}
+		total_score = int(latest(CCI_SCORE_MODEL.evaluate(env))[0])
 
 		# 最終判定
 		if total_score >= 10:
@@ -370,13 +357,19 @@ def calc_cci_score(df, code):
 			"cci_previous": None
 		}
 
-# === MAIN ===
-def main():
-	if len(sys.argv) < 2:
-		print(json.dumps({"error":"no code"}, ensure_ascii=False))
-		return
+# === 銘柄レポート ===
+def analyze_company(code):
+	"""
+	銘柄レポートの辞書を作成する（常駐サーバーからも呼ばれる）
+	"""
+	code = code.strip()
+
+	# 外部サイトの取得は株価の計算と並行して進める（例外で抜けてもスレッドとSessionを必ず閉じる）
+	with ExternalDataFetcher(code) as external:
+		return build_company_report(code, external)
 
-	code = sys.argv[1].strip()
+def build_company_report(code, external):
+	"""株価から指標を計算し、externalの取得結果とまとめて銘柄レポートの辞書を作成"""
 	symbol = f"{code}.T"
 
 	# yfinanceのTickerオブジェクトから企業情報を取得
@@ -384,10 +377,10 @@ def main():
 	info = ticker.info
 	company_name = info.get("longName") or info.get("shortName") or code
 
-	df = yf.download(symbol, period="90d", interval="1d", auto_adjust=False, progress=False)
-	if df.empty:
-		print(json.dumps({"error":"no data"}, ensure_ascii=False))
-		return
+	# ローカルの株価ストアから取得（不足分だけyfinanceから追記）
+	df = PriceStore().load_one(code, days=90, auto_adjust=False)
+	if df is None or df.empty:
+		return {"error":"no data"}
 
 	# データの最終日（最新日付）を取得
 	last_date = df.index[-1].strftime("%Y-%m-%d")
@@ -527,7 +520,12 @@ def main():
 	# ATR%によるボラティリティ計算
 	try:
 		# 14日間のATRを計算
-		df["ATR"] = ta.atr(high=df["High"], low=df["Low"], close=df["Close"], length=14)
+		df["ATR"] = atr(
+			df["High"].to_numpy(dtype=float),
+			df["Low"].to_numpy(dtype=float),
+			df["Close"].to_numpy(dtype=float),
+			14
+		)
 
 		# 最新のATR値と終値を取得
 		latest_atr_value = to_float_or_none(df["ATR"].iloc[-1])
@@ -555,12 +553,16 @@ def main():
 			range_yen = None
 			range_pct = None
 
-	index = yf.download("^N225", period="90d", interval="1d", auto_adjust=False, progress=False)
-	beta = calc_beta(df["Close"], index["Close"]) if not index.empty else None
+	# 指数のリターンは大引けごとに1回だけ取得してキャッシュしたものを使う
+	index_returns = benchmark_cache.get_returns('N225', days=90)
+	beta = calc_beta(df["Close"], index_returns=index_returns) if index_returns is not None else None
 
 	# CCIスコア計算
 	cci_score_data = calc_cci_score(df, code)
 
+	# 並行取得した外部データ
+	external_data = external.results()
+
 	out = {
 		"symbol": code,
 		"company_name": company_name,
@@ -572,9 +574,9 @@ def main():
 		"volume_change_percent": vol_change,
 		"volatility_5d": {"range_yen":range_yen, "range_percent":range_pct},
 		"beta": (round(beta,3) if beta is not None else None),
-		"earnings_date": fetch_earnings_date(code),
-		"credit_ratio": fetch_credit_ratio(code),
-		"news": fetch_minkabu_news(code),
+		"earnings_date": external_data["earnings_date"],
+		"credit_ratio": external_data["credit_ratio"],
+		"news": external_data["news"],
 		"volume_info": {
 			"candle_type": candle_type,
 			"volume_change_rate": volume_change_rate,
@@ -583,7 +585,15 @@ def main():
 		"cci_analysis": cci_score_data,
 		"updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 	}
-	print(json.dumps(out, ensure_ascii=False))
+	return out
+
+# === MAIN ===
+def main():
+	if len(sys.argv) < 2:
+		print(json.dumps({"error":"no code"}, ensure_ascii=False))
+		return
+
+	print(json.dumps(analyze_company(sys.argv[1]), ensure_ascii=False))
 
 if __name__ == "__main__":
 	main()
@@ -1,22 +1,105 @@
+import json
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 class DatabaseManager:
 	"""SQLiteデータベース管理クラス"""
 
 	DB_PATH = 'stock_analysis.db'
 
-	def __init__(self):
-		self.db_path = Path(self.DB_PATH)
+	# 接続設定（PHPの読み込みと夜間バッチの書き込みが競合しないようWALで運用）
+	JOURNAL_MODE = 'WAL'
+	SYNCHRONOUS = 'NORMAL'
+	BUSY_TIMEOUT_MS = 5000
+	CACHE_SIZE_KB = 16384
+
+	def __init__(self, db_path: Optional[str] = None, journal_mode: Optional[str] = None,
+	             synchronous: Optional[str] = None, busy_timeout_ms: Optional[int] = None,
+	             cache_size_kb: Optional[int] = None):
+		"""
+		Args:
+			db_path: DBファイルのパス（省略時はDB_PATH）
+			journal_mode: ジャーナルモード（省略時はJOURNAL_MODE）
+			synchronous: 同期モード（省略時はSYNCHRONOUS）
+			busy_timeout_ms: ロック待ちのタイムアウト（ミリ秒、省略時はBUSY_TIMEOUT_MS）
+			cache_size_kb: 接続ごとのページキャッシュ（KB、省略時はCACHE_SIZE_KB）
+		"""
+		self.db_path = Path(db_path or self.DB_PATH)
+		self.journal_mode = journal_mode or self.JOURNAL_MODE
+		self.synchronous = synchronous or self.SYNCHRONOUS
+		self.busy_timeout_ms = self.BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+		self.cache_size_kb = self.CACHE_SIZE_KB if cache_size_kb is None else cache_size_kb
+		# session()中に再利用する接続
+		self._conn = None
 		self.init_db()
 
+	def _open(self) -> sqlite3.Connection:
+		"""接続を開き、接続ごとの設定（同期モード・ロック待ち・キャッシュ）を適用"""
+		conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000)
+		conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+		conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+		# 負の値はKB単位の指定
+		conn.execute(f'PRAGMA cache_size = {-int(self.cache_size_kb)}')
+		return conn
+
+	@contextmanager
+	def session(self):
+		"""
+		1つの接続・1トランザクションで複数の読み書きをまとめて行う
+		ブロック内の書き込みは終了時に1回だけコミットされる（例外時はロールバック）
+
+		使用例:
+			with db.session():
+				db.upsert_companies_many(companies)
+				db.save_analysis_results_many(analysis_date, results)
+		"""
+		# 入れ子の場合は外側のトランザクションにまとめる
+		if self._conn is not None:
+			yield self
+			return
+
+		self._conn = self._open()
+		try:
+			yield self
+			self._conn.commit()
+		except Exception:
+			self._conn.rollback()
+			raise
+		finally:
+			self._conn.close()
+			self._conn = None
+
+	@contextmanager
+	def _connect(self):
+		"""
+		接続を取得
+		session()の中ではその接続を再利用し、コミットはsession終了時に行う
+		"""
+		if self._conn is not None:
+			yield self._conn
+			return
+
+		conn = self._open()
+		try:
+			yield conn
+			conn.commit()
+		except Exception:
+			conn.rollback()
+			raise
+		finally:
+			conn.close()
+
 	def init_db(self):
 		"""データベースとテーブルを初期化"""
-		with sqlite3.connect(self.db_path) as conn:
+		with self._connect() as conn:
 			cursor = conn.cursor()
 
+			# ジャーナルモードはDBファイルに保存される（WALなら読み込み中でも書き込める）
+			cursor.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+
 			# 企業マスタテーブル
 			cursor.execute('''
 				CREATE TABLE IF NOT EXISTS companies (
@@ -79,6 +162,81 @@ class DatabaseManager:
 				)
 			''')
 
+			# うねり指数・流動性指数のスキャン結果テーブル
+			cursor.execute('''
+				CREATE TABLE IF NOT EXISTS marketwave_results (
+					id INTEGER PRIMARY KEY AUTOINCREMENT,
+					analysis_date TEXT NOT NULL,
+					code TEXT NOT NULL,
+					average_cross_count REAL NOT NULL,
+					average_max_up_percent REAL NOT NULL,
+					average_max_down_percent REAL NOT NULL,
+					average_liquidity_score REAL NOT NULL,
+					days_analyzed INTEGER NOT NULL,
+					created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+					FOREIGN KEY (code) REFERENCES companies(code),
+					UNIQUE(analysis_date, code)
+				)
+			''')
+
+			# 日足OHLCVのローカルストア（調整前の値とAdj Closeを保存）
+			cursor.execute('''
+				CREATE TABLE IF NOT EXISTS daily_bars (
+					code TEXT NOT NULL,
+					date TEXT NOT NULL,
+					open REAL,
+					high REAL,
+					low REAL,
+					close REAL,
+					adj_close REAL,
+					volume REAL,
+					fetched_at TEXT NOT NULL,
+					PRIMARY KEY (code, date)
+				) WITHOUT ROWID
+			''')
+
+			# kabutan・minkabuから取得した値のキャッシュ（値はJSON文字列）
+			cursor.execute('''
+				CREATE TABLE IF NOT EXISTS scrape_cache (
+					source TEXT NOT NULL,
+					code TEXT NOT NULL,
+					value TEXT NOT NULL,
+					fetched_at TEXT NOT NULL,
+					expires_at TEXT NOT NULL,
+					PRIMARY KEY (source, code)
+				) WITHOUT ROWID
+			''')
+
+			# キャッシュのヒット・ミス回数
+			cursor.execute('''
+				CREATE TABLE IF NOT EXISTS scrape_cache_stats (
+					source TEXT PRIMARY KEY,
+					hits INTEGER NOT NULL DEFAULT 0,
+					stale_hits INTEGER NOT NULL DEFAULT 0,
+					misses INTEGER NOT NULL DEFAULT 0
+				)
+			''')
+
+			# 銘柄ごとの指標の途中経過（indicator_state.py、値はJSON文字列）
+			cursor.execute('''
+				CREATE TABLE IF NOT EXISTS indicator_state (
+					code TEXT PRIMARY KEY,
+					as_of TEXT NOT NULL,
+					updates INTEGER NOT NULL DEFAULT 0,
+					state TEXT NOT NULL,
+					updated_at TEXT NOT NULL
+				) WITHOUT ROWID
+			''')
+
+			# 日別レポート（3種類の分析結果を企業名付き・表示順でまとめたJSON、report.phpが読む）
+			cursor.execute('''
+				CREATE TABLE IF NOT EXISTS daily_reports (
+					analysis_date TEXT PRIMARY KEY,
+					report TEXT NOT NULL,
+					created_at TEXT NOT NULL
+				) WITHOUT ROWID
+			''')
+
 			# インデックス作成（検索高速化）
 			cursor.execute('''
 				CREATE INDEX IF NOT EXISTS idx_analysis_date
@@ -104,28 +262,45 @@ class DatabaseManager:
 				CREATE INDEX IF NOT EXISTS idx_expansion_code
 				ON expansion_results(code)
 			''')
-
-			conn.commit()
+			cursor.execute('''
+				CREATE INDEX IF NOT EXISTS idx_marketwave_date
+				ON marketwave_results(analysis_date)
+			''')
 
 	def upsert_company(self, code: str, name: str) -> None:
 		"""企業情報を保存（存在しない場合は挿入、存在する場合は更新）"""
-		with sqlite3.connect(self.db_path) as conn:
+		self.upsert_companies_many([(code, name)])
+
+	def upsert_companies_many(self, companies: List[Tuple[str, str]]) -> None:
+		"""複数の企業情報 (コード, 企業名) をまとめて保存"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
-			cursor.execute('''
+			cursor.executemany('''
 				INSERT OR REPLACE INTO companies (code, name)
 				VALUES (?, ?)
-			''', (code, name))
-			conn.commit()
+			''', companies)
+
+	def get_companies(self) -> List[Dict[str, str]]:
+		"""企業マスタの全銘柄を取得（コード順）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute('SELECT code, name FROM companies ORDER BY code')
+			return [dict(row) for row in cursor.fetchall()]
 
 	def save_analysis_result(self, analysis_date: str, result: Dict[str, Any]) -> None:
 		"""三位一体モデルの分析結果を保存"""
-		with sqlite3.connect(self.db_path) as conn:
+		self.save_analysis_results_many(analysis_date, [result])
+
+	def save_analysis_results_many(self, analysis_date: str, results: List[Dict[str, Any]]) -> None:
+		"""三位一体モデルの分析結果をまとめて保存"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
-			cursor.execute('''
+			cursor.executemany('''
 				INSERT OR REPLACE INTO analysis_results
 				(analysis_date, code, price, score, rsi_9, vwap, bb_width, profit_target, stop_loss)
 				VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-			''', (
+			''', [(
 				analysis_date,
 				result['code'],
 				result['price'],
@@ -135,18 +310,21 @@ class DatabaseManager:
 				result['BB_Width'],
 				result['profit_target'],
 				result['stop_loss']
-			))
-			conn.commit()
+			) for result in results])
 
 	def save_bandwalk_result(self, analysis_date: str, result: Dict[str, Any]) -> None:
 		"""バンドウォーク検出結果を保存"""
-		with sqlite3.connect(self.db_path) as conn:
+		self.save_bandwalk_results_many(analysis_date, [result])
+
+	def save_bandwalk_results_many(self, analysis_date: str, results: List[Dict[str, Any]]) -> None:
+		"""バンドウォーク検出結果をまとめて保存"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
-			cursor.execute('''
+			cursor.executemany('''
 				INSERT OR REPLACE INTO bandwalk_results
 				(analysis_date, code, is_bandwalk, price, bb_width, profit_target, stop_loss)
 				VALUES (?, ?, ?, ?, ?, ?, ?)
-			''', (
+			''', [(
 				analysis_date,
 				result['code'],
 				1 if result['is_bandwalk'] else 0,
@@ -154,14 +332,20 @@ class DatabaseManager:
 				result['bb_width'],
 				result['profit_target'],
 				result['stop_loss']
-			))
-			conn.commit()
+			) for result in results])
 
 	def get_analysis_results(self, analysis_date: str) -> List[Dict[str, Any]]:
-		"""指定日付の三位一体モデル分析結果を取得"""
-		with sqlite3.connect(self.db_path) as conn:
-			conn.row_factory = sqlite3.Row
+		"""指定日付の三位一体モデル分析結果を取得（日別レポートがあればそこから読む）"""
+		report = self.get_daily_report(analysis_date)
+		if report is not None:
+			return report['trinity']
+		return self._query_analysis_results(analysis_date)
+
+	def _query_analysis_results(self, analysis_date: str) -> List[Dict[str, Any]]:
+		"""三位一体モデル分析結果を企業名と結合して取得（スコアの降順）"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
 			cursor.execute('''
 				SELECT ar.*, c.name as company_name
 				FROM analysis_results ar
@@ -173,13 +357,17 @@ class DatabaseManager:
 
 	def save_expansion_result(self, analysis_date: str, result: Dict[str, Any]) -> None:
 		"""エクスパンション検出結果を保存"""
-		with sqlite3.connect(self.db_path) as conn:
+		self.save_expansion_results_many(analysis_date, [result])
+
+	def save_expansion_results_many(self, analysis_date: str, results: List[Dict[str, Any]]) -> None:
+		"""エクスパンション検出結果をまとめて保存"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
-			cursor.execute('''
+			cursor.executemany('''
 				INSERT OR REPLACE INTO expansion_results
 				(analysis_date, code, is_expansion, price, bb_width, expansion_rate, profit_target, stop_loss)
 				VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-			''', (
+			''', [(
 				analysis_date,
 				result['code'],
 				1 if result['is_expansion'] else 0,
@@ -188,14 +376,20 @@ class DatabaseManager:
 				result['expansion_rate'],
 				result['profit_target'],
 				result['stop_loss']
-			))
-			conn.commit()
+			) for result in results])
 
 	def get_bandwalk_results(self, analysis_date: str) -> List[Dict[str, Any]]:
-		"""指定日付のバンドウォーク検出結果を取得"""
-		with sqlite3.connect(self.db_path) as conn:
-			conn.row_factory = sqlite3.Row
+		"""指定日付のバンドウォーク検出結果を取得（日別レポートがあればそこから読む）"""
+		report = self.get_daily_report(analysis_date)
+		if report is not None:
+			return report['bandwalk']
+		return self._query_bandwalk_results(analysis_date)
+
+	def _query_bandwalk_results(self, analysis_date: str) -> List[Dict[str, Any]]:
+		"""バンドウォーク検出結果を企業名と結合して取得（銘柄コード順）"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
 			cursor.execute('''
 				SELECT br.*, c.name as company_name
 				FROM bandwalk_results br
@@ -206,10 +400,17 @@ class DatabaseManager:
 			return [dict(row) for row in cursor.fetchall()]
 
 	def get_expansion_results(self, analysis_date: str) -> List[Dict[str, Any]]:
-		"""指定日付のエクスパンション検出結果を取得"""
-		with sqlite3.connect(self.db_path) as conn:
-			conn.row_factory = sqlite3.Row
+		"""指定日付のエクスパンション検出結果を取得（日別レポートがあればそこから読む）"""
+		report = self.get_daily_report(analysis_date)
+		if report is not None:
+			return report['expansion']
+		return self._query_expansion_results(analysis_date)
+
+	def _query_expansion_results(self, analysis_date: str) -> List[Dict[str, Any]]:
+		"""エクスパンション検出結果を企業名と結合して取得（銘柄コード順）"""
+		with self._connect() as conn:
 			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
 			cursor.execute('''
 				SELECT er.*, c.name as company_name
 				FROM expansion_results er
@@ -219,9 +420,134 @@ class DatabaseManager:
 			''', (analysis_date,))
 			return [dict(row) for row in cursor.fetchall()]
 
+	def build_daily_report(self, analysis_date: str) -> Dict[str, Any]:
+		"""3種類の分析結果を企業名と結合し、report.phpの表示順に並べたレポートを作成"""
+		return {
+			'analysis_date': analysis_date,
+			'trinity': self._query_analysis_results(analysis_date),
+			'bandwalk': self._query_bandwalk_results(analysis_date),
+			'expansion': self._query_expansion_results(analysis_date)
+		}
+
+	def save_daily_report(self, analysis_date: str, replace: bool = False) -> None:
+		"""
+		指定日付の日別レポートを作成して保存
+
+		Args:
+			analysis_date: 分析日（YYYY-MM-DD）
+			replace: Trueなら既存のレポートを作り直す（当日の再実行用）。
+			         Falseなら保存済みの日付は何もしない（過去のレポートは変更しない）
+		"""
+		if not replace:
+			with self._connect() as conn:
+				cursor = conn.cursor()
+				cursor.execute('SELECT 1 FROM daily_reports WHERE analysis_date = ?', (analysis_date,))
+				if cursor.fetchone():
+					return
+
+		report = json.dumps(self.build_daily_report(analysis_date), ensure_ascii=False, separators=(',', ':'))
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.execute(f'''
+				INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO daily_reports
+				(analysis_date, report, created_at)
+				VALUES (?, ?, ?)
+			''', (analysis_date, report, datetime.now().isoformat()))
+
+	def get_daily_report(self, analysis_date: str) -> Optional[Dict[str, Any]]:
+		"""
+		指定日付の日別レポートを取得（主キーでの1回の検索、なければNone）
+
+		Returns:
+			{'analysis_date', 'trinity', 'bandwalk', 'expansion'} の辞書
+			（各結果はget_*_resultsと同じ行、company_name付き）
+		"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.execute('SELECT report FROM daily_reports WHERE analysis_date = ?', (analysis_date,))
+			row = cursor.fetchone()
+		return json.loads(row[0]) if row else None
+
+	def get_unreported_dates(self) -> List[str]:
+		"""分析結果はあるが日別レポートが未作成の日付（古い順）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.execute('''
+				SELECT analysis_date FROM analysis_results
+				UNION SELECT analysis_date FROM bandwalk_results
+				UNION SELECT analysis_date FROM expansion_results
+				EXCEPT SELECT analysis_date FROM daily_reports
+				ORDER BY analysis_date
+			''')
+			return [row[0] for row in cursor.fetchall()]
+
+	def save_marketwave_results_many(self, analysis_date: str, results: List[Dict[str, Any]]) -> None:
+		"""うねり指数・流動性指数のスキャン結果をまとめて保存"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.executemany('''
+				INSERT OR REPLACE INTO marketwave_results
+				(analysis_date, code, average_cross_count, average_max_up_percent,
+				 average_max_down_percent, average_liquidity_score, days_analyzed)
+				VALUES (?, ?, ?, ?, ?, ?, ?)
+			''', [(
+				analysis_date,
+				result['code'],
+				result['average_cross_count'],
+				result['average_max_up_percent'],
+				result['average_max_down_percent'],
+				result['average_liquidity_score'],
+				result['days_analyzed']
+			) for result in results])
+
+	def get_marketwave_results(self, analysis_date: str) -> List[Dict[str, Any]]:
+		"""指定日付のうねり指数・流動性指数を取得（流動性の高い順）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute('''
+				SELECT mr.*, c.name as company_name
+				FROM marketwave_results mr
+				LEFT JOIN companies c ON mr.code = c.code
+				WHERE mr.analysis_date = ?
+				ORDER BY mr.average_liquidity_score DESC, mr.average_cross_count DESC
+			''', (analysis_date,))
+			return [dict(row) for row in cursor.fetchall()]
+
+	# バックテスト対象のシグナル（モデル名 → 結果テーブルと抽出条件）
+	SIGNAL_QUERIES = {
+		'trinity': ('analysis_results', 'score', '1 = 1'),
+		'bandwalk': ('bandwalk_results', 'NULL', 'is_bandwalk = 1'),
+		'expansion': ('expansion_results', 'NULL', 'is_expansion = 1')
+	}
+
+	def get_signals(self, model: str, start_date: Optional[str] = None,
+	                end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+		"""
+		保存済みの分析結果をバックテスト用のシグナルとして取得（日付・コード順）
+
+		Args:
+			model: 'trinity' / 'bandwalk' / 'expansion'
+			start_date: この日付以降（省略時は全期間）
+			end_date: この日付以前（省略時は全期間）
+		"""
+		table, score, condition = self.SIGNAL_QUERIES[model]
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute(f'''
+				SELECT analysis_date, code, price, {score} AS score, profit_target, stop_loss
+				FROM {table}
+				WHERE {condition}
+				  AND profit_target IS NOT NULL AND stop_loss IS NOT NULL
+				  AND analysis_date >= ? AND analysis_date <= ?
+				ORDER BY analysis_date, code
+			''', (start_date or '0000-00-00', end_date or '9999-99-99'))
+			return [dict(row) for row in cursor.fetchall()]
+
 	def get_all_analysis_dates(self) -> List[str]:
 		"""全ての分析日付を取得（降順）"""
-		with sqlite3.connect(self.db_path) as conn:
+		with self._connect() as conn:
 			cursor = conn.cursor()
 			cursor.execute('''
 				SELECT DISTINCT analysis_date
@@ -232,7 +558,7 @@ class DatabaseManager:
 
 	def get_analysis_dates_by_year_month(self) -> Dict[str, Dict[str, List[str]]]:
 		"""年月ごとにグループ化した分析日付を取得"""
-		with sqlite3.connect(self.db_path) as conn:
+		with self._connect() as conn:
 			cursor = conn.cursor()
 			cursor.execute('''
 				SELECT DISTINCT analysis_date
@@ -261,3 +587,129 @@ class DatabaseManager:
 
 			return date_groups
 
+	def save_daily_bars(self, code: str, bars: List[Dict[str, Any]]) -> None:
+		"""日足データを保存（同じ日付は上書き）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.executemany('''
+				INSERT OR REPLACE INTO daily_bars
+				(code, date, open, high, low, close, adj_close, volume, fetched_at)
+				VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+			''', [(
+				code,
+				bar['date'],
+				bar['open'],
+				bar['high'],
+				bar['low'],
+				bar['close'],
+				bar['adj_close'],
+				bar['volume'],
+				bar['fetched_at']
+			) for bar in bars])
+
+	def delete_daily_bars(self, code: str) -> None:
+		"""指定銘柄の日足データを削除（株式分割・配当による再取得用）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.execute('DELETE FROM daily_bars WHERE code = ?', (code,))
+
+	def get_daily_bars(self, code: str, start_date: Optional[str] = None) -> List[Dict[str, Any]]:
+		"""指定銘柄の日足データを取得（日付の昇順）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute('''
+				SELECT date, open, high, low, close, adj_close, volume, fetched_at
+				FROM daily_bars
+				WHERE code = ? AND date >= ?
+				ORDER BY date
+			''', (code, start_date or ''))
+			return [dict(row) for row in cursor.fetchall()]
+
+	def get_latest_daily_bars(self, code: str, limit: int = 2) -> List[Dict[str, Any]]:
+		"""指定銘柄の直近の日足データを取得（日付の降順）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute('''
+				SELECT date, close, adj_close, fetched_at
+				FROM daily_bars
+				WHERE code = ?
+				ORDER BY date DESC
+				LIMIT ?
+			''', (code, limit))
+			return [dict(row) for row in cursor.fetchall()]
+
+	def get_scrape_cache(self, source: str, code: str) -> Optional[Dict[str, Any]]:
+		"""キャッシュ済みの取得結果を取得（なければNone）"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute('''
+				SELECT value, fetched_at, expires_at
+				FROM scrape_cache
+				WHERE source = ? AND code = ?
+			''', (source, code))
+			row = cursor.fetchone()
+			return dict(row) if row else None
+
+	def save_scrape_cache(self, source: str, code: str, value: str, fetched_at: str, expires_at: str) -> None:
+		"""取得結果をキャッシュに保存"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.execute('''
+				INSERT OR REPLACE INTO scrape_cache
+				(source, code, value, fetched_at, expires_at)
+				VALUES (?, ?, ?, ?, ?)
+			''', (source, code, value, fetched_at, expires_at))
+
+	def add_scrape_cache_stats(self, counts: Dict[Tuple[str, str], int]) -> None:
+		"""ヒット・ミス回数をまとめて加算（(取得元, hits / stale_hits / misses) → 回数）"""
+		for _, field in counts:
+			if field not in ('hits', 'stale_hits', 'misses'):
+				raise ValueError(f"unknown stat field: {field}")
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			for (source, field), count in counts.items():
+				cursor.execute('''
+					INSERT OR IGNORE INTO scrape_cache_stats (source) VALUES (?)
+				''', (source,))
+				cursor.execute(f'''
+					UPDATE scrape_cache_stats SET {field} = {field} + ? WHERE source = ?
+				''', (count, source))
+
+	def get_scrape_cache_stats(self) -> Dict[str, Dict[str, int]]:
+		"""取得元ごとのヒット・ミス回数を取得"""
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			cursor.execute('SELECT * FROM scrape_cache_stats ORDER BY source')
+			return {row['source']: dict(row) for row in cursor.fetchall()}
+
+	def get_indicator_states(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+		"""指定銘柄の指標の途中経過を取得（銘柄コード → 行）"""
+		states = {}
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.row_factory = sqlite3.Row
+			# SQLiteの変数の上限を超えないよう分割して取得
+			for i in range(0, len(codes), 500):
+				chunk = codes[i:i + 500]
+				cursor.execute(f'''
+					SELECT code, as_of, updates, state
+					FROM indicator_state
+					WHERE code IN ({','.join('?' * len(chunk))})
+				''', chunk)
+				states.update({row['code']: dict(row) for row in cursor.fetchall()})
+		return states
+
+	def save_indicator_states_many(self, states: List[Tuple[str, str, int, str]]) -> None:
+		"""指標の途中経過を一括保存（(銘柄コード, 基準日, 差分更新の回数, JSON) のリスト）"""
+		updated_at = datetime.now().isoformat()
+		with self._connect() as conn:
+			cursor = conn.cursor()
+			cursor.executemany('''
+				INSERT OR REPLACE INTO indicator_state
+				(code, as_of, updates, state, updated_at)
+				VALUES (?, ?, ?, ?, ?)
+			''', [(code, as_of, updates, state, updated_at) for code, as_of, updates, state in states])
@@ -14,6 +14,9 @@ if (!file_exists($db_path)) {
 try {
 	$pdo = new PDO('sqlite:' . $db_path);
 	$pdo->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
+	// 夜間バッチの書き込み中はロック解除を待つ（WALモードでは通常待たずに読める）
+	$pdo->setAttribute(PDO::ATTR_TIMEOUT, 5);
+	$pdo->exec('PRAGMA busy_timeout = 5000');
 } catch (PDOException $e) {
 	die('データベース接続エラー: ' . $e->getMessage());
 }
@@ -0,0 +1,215 @@
+"""
+複数銘柄のテクニカル指標をまとめて計算するエンジン
+
+N銘柄の日足を (銘柄 × 日) の2次元配列に右揃え（最新日が最後の列）で並べ、
+RSI(9)・ボリンジャーバンド(20, 2)・VWAP・ATR(14) を全銘柄同時に計算する。
+三位一体・バンドウォーク・エクスパンションの判定はrules.pyのルールとして定義し、
+結果は swing_analysis.analyze_stock と同じ形式で返す。
+
+指標の計算はindicators.py（pandas_taの rsi / bbands / vwap / atr と同じ値）で行う。
+"""
+import numpy as np
+import pandas as pd
+from typing import Optional, List, Dict, Tuple
+from indicators import rsi, bbands, vwap, atr
+from rules import Rule, Model, latest
+
+# データ不足とみなす日数（三位一体・期待値は50日、バンドウォーク・エクスパンションは25日）
+MIN_BARS_TRINITY = 50
+MIN_BARS_BAND = 25
+
+class PricePanel:
+	"""
+	N銘柄 × T日の日足配列（右揃え）
+
+	銘柄ごとに日数が違う場合は左側（古い側）をNaNで埋めるため、
+	列 -1 はどの銘柄でも最新日、列 -4 は3日前になる（df.iloc[-1] / iloc[-4] と同じ）。
+	"""
+
+	def __init__(self, codes: List[str], open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+	             close: np.ndarray, volume: np.ndarray, lengths: np.ndarray):
+		self.codes = codes
+		self.open = open_
+		self.high = high
+		self.low = low
+		self.close = close
+		self.volume = volume
+		# 銘柄ごとの実際の日数
+		self.lengths = lengths
+
+	@classmethod
+	def from_frames(cls, price_data: Dict[str, pd.DataFrame], codes: Optional[List[str]] = None) -> 'PricePanel':
+		"""
+		銘柄コードをキーとした日足DataFrameの辞書から配列を作成
+
+		Args:
+			price_data: fetch_price_data_batchの戻り値
+			codes: 並べる順の銘柄コード（省略時は辞書の順、データのない銘柄は除外）
+		"""
+		codes = [code for code in (codes or list(price_data)) if price_data.get(code) is not None]
+		lengths = np.array([len(price_data[code]) for code in codes], dtype=int)
+		width = int(lengths.max()) if len(codes) else 0
+
+		arrays = {}
+		for column in ('Open', 'High', 'Low', 'Close', 'Volume'):
+			values = np.full((len(codes), width), np.nan)
+			for i, code in enumerate(codes):
+				n = lengths[i]
+				if n:
+					values[i, width - n:] = price_data[code][column].to_numpy(dtype=float)
+			arrays[column] = values
+
+		return cls(codes, arrays['Open'], arrays['High'], arrays['Low'],
+		           arrays['Close'], arrays['Volume'], lengths)
+
+# === 指標の計算（indicators.pyの関数を (N, T) 配列にそのまま適用） ===
+
+def compute_indicators(panel: PricePanel) -> Dict[str, np.ndarray]:
+	"""三位一体・バンドウォーク・エクスパンション・期待値で使う指標をまとめて計算"""
+	bands = bbands(panel.close, 20, 2.0)
+	return {
+		'VWAP_D': vwap(panel.high, panel.low, panel.close, panel.volume),
+		'RSI_9': rsi(panel.close, 9),
+		'BBL_20_2.0': bands['lower'],
+		'BBM_20_2.0': bands['mid'],
+		'BBU_20_2.0': bands['upper'],
+		'BBB_20_2.0': bands['bandwidth'],
+		'ATRr_14': atr(panel.high, panel.low, panel.close, 14)
+	}
+
+# === 判定モデル（rules.pyのルールで全銘柄を同時に判定） ===
+
+# 三位一体モデル（VWAP 30点・RSI 40点・ボリンジャーバンド 30点、0〜100に制限）
+TRINITY_MODEL = Model('trinity', [
+	Rule('Close > VWAP_D', 20),
+	Rule('VWAP_D > VWAP_D[-3]', 10),
+	Rule('RSI_9 > RSI_9[-1]', 20),
+	Rule('RSI_9 < 70', 20),
+	Rule('RSI_9 > 70', -10),
+	Rule('Close > BBM', 15),
+	Rule('BBB > BBB[-3]', 15)
+], mode='sum', clip=(0, 100))
+
+# バンドウォーク（3日連続で終値が+1σ超え、かつバンド幅が3日前より拡大）
+BANDWALK_MODEL = Model('bandwalk', [
+	Rule('Close > BB_PLUS1'),
+	Rule('Close[-1] > BB_PLUS1[-1]'),
+	Rule('Close[-2] > BB_PLUS1[-2]'),
+	Rule('BBB > BBB[-3]')
+], mode='all', derived={'BB_PLUS1': 'BBM + (BBU - BBL) / 4'})
+
+# エクスパンション（バンド幅が4日連続で拡大）
+EXPANSION_MODEL = Model('expansion', [
+	Rule('BBB > BBB[-1]'),
+	Rule('BBB[-1] > BBB[-2]'),
+	Rule('BBB[-2] > BBB[-3]'),
+	Rule('BBB[-3] > BBB[-4]')
+], mode='all')
+
+def rule_env(panel: PricePanel, ind: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+	"""ルール式で使う名前と配列の対応"""
+	return {
+		'Open': panel.open,
+		'High': panel.high,
+		'Low': panel.low,
+		'Close': panel.close,
+		'Volume': panel.volume,
+		'VWAP_D': ind['VWAP_D'],
+		'RSI_9': ind['RSI_9'],
+		'BBL': ind['BBL_20_2.0'],
+		'BBM': ind['BBM_20_2.0'],
+		'BBU': ind['BBU_20_2.0'],
+		'BBB': ind['BBB_20_2.0'],
+		'ATR': ind['ATRr_14']
+	}
+
+def expansion_rates(ind: Dict[str, np.ndarray]) -> np.ndarray:
+	"""4日前からのバンド幅の拡大率（%、4日前のバンド幅が0以下なら0）"""
+	current = ind['BBB_20_2.0'][:, -1]
+	before = ind['BBB_20_2.0'][:, -5]
+	with np.errstate(invalid='ignore', divide='ignore'):
+		return np.where(before > 0, (current - before) / before * 100, 0)
+
+def analyze_panel(price_data: Dict[str, pd.DataFrame], codes: List[str]) -> List[Tuple[Optional[dict], Optional[dict], Optional[dict]]]:
+	"""
+	全銘柄の三位一体・バンドウォーク・エクスパンションをまとめて分析
+
+	Args:
+		price_data: 銘柄コードをキーとした日足DataFrameの辞書
+		codes: 銘柄コードのリスト（結果はこの順で返す）
+
+	Returns:
+		銘柄ごとの (三位一体, バンドウォーク, エクスパンション) のリスト（analyze_stockと同じ形式）
+	"""
+	panel = PricePanel.from_frames(price_data, codes)
+	if not panel.codes or panel.close.shape[1] < 5:
+		return [(None, None, None) for _ in codes]
+
+	results = evaluate_models(panel, compute_indicators(panel))
+	return [results.get(code, (None, None, None)) for code in codes]
+
+def evaluate_models(panel: PricePanel, ind: Dict[str, np.ndarray]) -> Dict[str, Tuple[Optional[dict], Optional[dict], Optional[dict]]]:
+	"""
+	計算済みの指標から三位一体・バンドウォーク・エクスパンションを判定
+
+	Args:
+		panel: 日足の配列（直近5日分以上、lengthsは銘柄ごとの日数）
+		ind: compute_indicatorsと同じキーの指標（panelと同じ形）
+
+	Returns:
+		銘柄コードをキーとした (三位一体, バンドウォーク, エクスパンション) の辞書
+	"""
+	env = rule_env(panel, ind)
+	scores = latest(TRINITY_MODEL.evaluate(env))
+	is_bandwalk = latest(BANDWALK_MODEL.evaluate(env))
+	is_expansion = latest(EXPANSION_MODEL.evaluate(env))
+	rates = expansion_rates(ind)
+
+	close = panel.close[:, -1]
+	atr_14 = ind['ATRr_14'][:, -1]
+	profit_targets = close + atr_14 * 2.0
+	stop_losses = close - atr_14 * 1.5
+
+	results = {}
+	for i, code in enumerate(panel.codes):
+		length = panel.lengths[i]
+		trinity = bandwalk = expansion = None
+
+		# 期待値（ATR）は50日以上のデータがある銘柄だけ
+		profit_target = round(profit_targets[i], 2) if length >= MIN_BARS_TRINITY else None
+		stop_loss = round(stop_losses[i], 2) if length >= MIN_BARS_TRINITY else None
+
+		if length >= MIN_BARS_TRINITY:
+			trinity = {
+				'code': code,
+				'price': round(close[i], 2),
+				'score': int(scores[i]),
+				'RSI_9': round(ind['RSI_9'][i, -1], 2),
+				'VWAP': round(ind['VWAP_D'][i, -1], 2),
+				'BB_Width': round(ind['BBB_20_2.0'][i, -1], 2),
+				'profit_target': profit_target,
+				'stop_loss': stop_loss
+			}
+
+		if length >= MIN_BARS_BAND:
+			bandwalk = {
+				'code': code,
+				'is_bandwalk': bool(is_bandwalk[i]),
+				'price': round(close[i], 2),
+				'bb_width': round(ind['BBB_20_2.0'][i, -1], 2),
+				'profit_target': profit_target,
+				'stop_loss': stop_loss
+			}
+			expansion = {
+				'code': code,
+				'is_expansion': bool(is_expansion[i]),
+				'price': round(close[i], 2),
+				'bb_width': round(ind['BBB_20_2.0'][i, -1], 2),
+				'expansion_rate': round(rates[i], 2),
+				'profit_target': profit_target,
+				'stop_loss': stop_loss
+			}
+
+		results[code] = (trinity, bandwalk, expansion)
+
+	return results
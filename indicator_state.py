@@ -0,0 +1,307 @@
+"""
+テクニカル指標の差分更新
+
+RSI(9)・ATR(14)のWilder移動平均の累積値、ボリンジャーバンド(20)の窓内の合計・二乗和と直近20日の終値、
+直近5日分の指標を銘柄ごとに stock_analysis.db の indicator_state テーブルに保存しておき、
+翌営業日は新しい日足1本を畳み込むだけで指標を更新する（全銘柄分を銘柄方向の配列でまとめて計算）。
+
+次の場合は保存済みの日足から計算し直す:
+	- 途中経過がない、または前回から日足が2本以上進んでいる
+	- 前回の基準日の終値が変わっている（配当・分割で調整された）
+	- 差分更新がFULL_RECOMPUTE_INTERVAL回続いた（浮動小数点の誤差が積み重ならないように）
+
+計算式はindicators.py（pandas_taと同じ値）と同じ。ただし差分更新ではWilder移動平均が前回の計算し直し以降の
+全期間を含むため、取得期間（120日）だけで毎回計算する場合と比べてRSI・ATRが小数点以下でわずかに異なることがある。
+"""
+import json
+import math
+import sys
+import numpy as np
+import pandas as pd
+from typing import Optional, List, Dict, Tuple
+from db_manager import DatabaseManager
+from indicator_engine import PricePanel, evaluate_models
+
+RSI_LENGTH = 9
+BB_LENGTH = 20
+BB_STD = 2.0
+ATR_LENGTH = 14
+
+# 判定に使う直近の日数（エクスパンションの4日前との比較まで）
+SNAPSHOT_DAYS = 5
+
+# この回数だけ差分更新したら日足から計算し直す
+FULL_RECOMPUTE_INTERVAL = 20
+
+# 銘柄ごとに1つの値を持つ途中経過
+SCALAR_FIELDS = (
+	'bars', 'prev_close', 'atr_has_zero',
+	'rsi_up_num', 'rsi_up_den', 'rsi_up_count',
+	'rsi_down_num', 'rsi_down_den', 'rsi_down_count',
+	'atr_num', 'atr_den', 'atr_count',
+	'bb_ref', 'bb_sum', 'bb_sumsq', 'bb_count'
+)
+
+# 直近SNAPSHOT_DAYS日分を持つ値（compute_indicatorsと同じキー）
+SNAPSHOT_KEYS = (
+	'Open', 'High', 'Low', 'Close', 'Volume',
+	'VWAP_D', 'RSI_9', 'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'ATRr_14'
+)
+
+def _nz(values: np.ndarray) -> np.ndarray:
+	return np.where(np.isnan(values), 0.0, values)
+
+def _bar_date(df: pd.DataFrame, position: int) -> str:
+	"""日足の日付（YYYY-MM-DD）"""
+	return df.index[position].strftime('%Y-%m-%d')
+
+def _rma_step(num: np.ndarray, den: np.ndarray, count: np.ndarray, values: np.ndarray,
+              length: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+	"""Wilder移動平均に1日分を畳み込む（indicators.rmaの1列分と同じ計算）"""
+	decay = 1.0 - 1.0 / length
+	valid = ~np.isnan(values)
+	num = num * decay + np.where(valid, values, 0.0)
+	den = den * decay + valid
+	count = count + valid
+	with np.errstate(invalid='ignore', divide='ignore'):
+		out = np.where(count >= length, num / den, np.nan)
+	return num, den, count, out
+
+class IndicatorState:
+	"""N銘柄分の指標の途中経過（各値は銘柄方向の配列）"""
+
+	def __init__(self, codes: List[str], scalars: Dict[str, np.ndarray], window: np.ndarray,
+	             snapshots: Dict[str, np.ndarray], as_of: List[str], updates: np.ndarray):
+		self.codes = codes
+		self.scalars = scalars
+		# 直近BB_LENGTH日の終値 (N, BB_LENGTH)
+		self.window = window
+		# 直近SNAPSHOT_DAYS日の日足と指標 (N, SNAPSHOT_DAYS)
+		self.snapshots = snapshots
+		# 最後に畳み込んだ日足の日付
+		self.as_of = as_of
+		# 前回の計算し直しからの差分更新の回数
+		self.updates = updates
+
+	@classmethod
+	def empty(cls, codes: List[str]) -> 'IndicatorState':
+		n = len(codes)
+		scalars = {name: np.zeros(n) for name in SCALAR_FIELDS}
+		scalars['prev_close'] = np.full(n, np.nan)
+		scalars['bb_ref'] = np.full(n, np.nan)
+		return cls(
+			codes,
+			scalars,
+			np.full((n, BB_LENGTH), np.nan),
+			{key: np.full((n, SNAPSHOT_DAYS), np.nan) for key in SNAPSHOT_KEYS},
+			[''] * n,
+			np.zeros(n, dtype=int)
+		)
+
+	@classmethod
+	def from_frames(cls, price_data: Dict[str, pd.DataFrame], codes: List[str]) -> 'IndicatorState':
+		"""日足の全期間を1日ずつ畳み込んで作り直す（全銘柄を右揃えの配列にして同時に処理）"""
+		panel = PricePanel.from_frames(price_data, codes)
+		state = cls.empty(panel.codes)
+		for j in range(panel.close.shape[1]):
+			state.fold(panel.open[:, j], panel.high[:, j], panel.low[:, j], panel.close[:, j], panel.volume[:, j])
+		state.as_of = [_bar_date(price_data[code], -1) for code in panel.codes]
+		state.updates = np.zeros(len(panel.codes), dtype=int)
+		return state
+
+	def fold(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+	         volume: np.ndarray) -> None:
+		"""全銘柄に1日分の日足を畳み込む（NaNの銘柄はその日のデータなしとして扱う）"""
+		s = self.scalars
+		valid = ~np.isnan(close)
+
+		# RSI（前日比の上昇分・下落分のWilder移動平均）
+		diff = close - s['prev_close']
+		up = np.where(diff < 0, 0.0, diff)
+		down = np.where(diff > 0, 0.0, diff)
+		s['rsi_up_num'], s['rsi_up_den'], s['rsi_up_count'], up_avg = _rma_step(
+			s['rsi_up_num'], s['rsi_up_den'], s['rsi_up_count'], up, RSI_LENGTH)
+		s['rsi_down_num'], s['rsi_down_den'], s['rsi_down_count'], down_avg = _rma_step(
+			s['rsi_down_num'], s['rsi_down_den'], s['rsi_down_count'], down, RSI_LENGTH)
+		with np.errstate(invalid='ignore', divide='ignore'):
+			rsi = 100 * up_avg / (up_avg + np.abs(down_avg))
+
+		# ATR（真の値幅のWilder移動平均、最初の日足はNaN）
+		high_low = high - low
+		s['atr_has_zero'] = np.maximum(s['atr_has_zero'], high_low == 0)
+		high_low = np.where(s['atr_has_zero'] > 0, high_low + sys.float_info.epsilon, high_low)
+		true_range = np.fmax(np.fmax(np.abs(high_low), np.abs(high - s['prev_close'])),
+		                     np.abs(s['prev_close'] - low))
+		true_range = np.where(s['bars'] == 0, np.nan, true_range)
+		s['atr_num'], s['atr_den'], s['atr_count'], atr = _rma_step(
+			s['atr_num'], s['atr_den'], s['atr_count'], true_range, ATR_LENGTH)
+
+		# ボリンジャーバンド（窓から外れる終値を引き、新しい終値を足す）
+		# 桁落ちを防ぐため、最初の終値からの差で合計・二乗和を持つ
+		s['bb_ref'] = np.where(np.isnan(s['bb_ref']) & valid, close, s['bb_ref'])
+		dropped = self.window[:, 0]
+		added_diff = close - s['bb_ref']
+		dropped_diff = dropped - s['bb_ref']
+		s['bb_sum'] = s['bb_sum'] + _nz(added_diff) - _nz(dropped_diff)
+		s['bb_sumsq'] = s['bb_sumsq'] + _nz(added_diff ** 2) - _nz(dropped_diff ** 2)
+		s['bb_count'] = s['bb_count'] + valid - ~np.isnan(dropped)
+		self.window = np.concatenate([self.window[:, 1:], close[:, np.newaxis]], axis=1)
+
+		full = s['bb_count'] == BB_LENGTH
+		mean_diff = s['bb_sum'] / BB_LENGTH
+		variance = np.maximum(s['bb_sumsq'] / BB_LENGTH - mean_diff ** 2, 0.0)
+		mid = np.where(full, s['bb_ref'] + mean_diff, np.nan)
+		deviations = np.where(full, BB_STD * np.sqrt(variance), np.nan)
+		lower = mid - deviations
+		upper = mid + deviations
+		with np.errstate(invalid='ignore', divide='ignore'):
+			bandwidth = 100 * (upper - lower) / mid
+			vwap = (high + low + close) / 3 * volume / volume
+
+		s['prev_close'] = close
+		s['bars'] = s['bars'] + valid
+
+		values = {
+			'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume,
+			'VWAP_D': vwap, 'RSI_9': rsi,
+			'BBL_20_2.0': lower, 'BBM_20_2.0': mid, 'BBU_20_2.0': upper, 'BBB_20_2.0': bandwidth,
+			'ATRr_14': atr
+		}
+		for key in SNAPSHOT_KEYS:
+			self.snapshots[key] = np.concatenate(
+				[self.snapshots[key][:, 1:], np.asarray(values[key], dtype=float)[:, np.newaxis]], axis=1)
+
+	def panel(self) -> Tuple[PricePanel, Dict[str, np.ndarray]]:
+		"""判定用の直近SNAPSHOT_DAYS日分の日足と指標（evaluate_modelsに渡す形）"""
+		snap = self.snapshots
+		panel = PricePanel(self.codes, snap['Open'], snap['High'], snap['Low'], snap['Close'],
+		                   snap['Volume'], self.scalars['bars'].astype(int))
+		return panel, {key: snap[key] for key in SNAPSHOT_KEYS[5:]}
+
+	def to_rows(self) -> List[Tuple[str, str, int, str]]:
+		"""indicator_stateテーブルの行（銘柄コード, 基準日, 差分更新の回数, JSON）"""
+		rows = []
+		for i, code in enumerate(self.codes):
+			state = {name: float(self.scalars[name][i]) for name in SCALAR_FIELDS}
+			state['window'] = self.window[i].tolist()
+			state['snapshots'] = {key: self.snapshots[key][i].tolist() for key in SNAPSHOT_KEYS}
+			rows.append((code, self.as_of[i], int(self.updates[i]), json.dumps(state)))
+		return rows
+
+	@classmethod
+	def from_rows(cls, rows: List[Dict]) -> 'IndicatorState':
+		"""indicator_stateテーブルの行から復元（stateはJSON文字列または読み込み済みの辞書）"""
+		states = [row['state'] if isinstance(row['state'], dict) else json.loads(row['state']) for row in rows]
+		return cls(
+			[row['code'] for row in rows],
+			{name: np.array([state[name] for state in states], dtype=float) for name in SCALAR_FIELDS},
+			np.array([state['window'] for state in states], dtype=float).reshape(len(rows), BB_LENGTH),
+			{
+				key: np.array([state['snapshots'][key] for state in states], dtype=float).reshape(len(rows), SNAPSHOT_DAYS)
+				for key in SNAPSHOT_KEYS
+			},
+			[row['as_of'] for row in rows],
+			np.array([row['updates'] for row in rows], dtype=int)
+		)
+
+	@classmethod
+	def concat(cls, states: List['IndicatorState']) -> 'IndicatorState':
+		"""複数の途中経過を1つにまとめる"""
+		states = [state for state in states if state.codes]
+		if not states:
+			return cls.empty([])
+		return cls(
+			[code for state in states for code in state.codes],
+			{name: np.concatenate([state.scalars[name] for state in states]) for name in SCALAR_FIELDS},
+			np.concatenate([state.window for state in states]),
+			{key: np.concatenate([state.snapshots[key] for state in states]) for key in SNAPSHOT_KEYS},
+			[as_of for state in states for as_of in state.as_of],
+			np.concatenate([state.updates for state in states])
+		)
+
+def _same_close(stored: float, bar_close: float) -> bool:
+	"""保存済みの終値と日足の終値が一致するか（配当・分割調整の検出）"""
+	return math.isclose(stored, bar_close, rel_tol=1e-9)
+
+class IndicatorStateStore:
+	"""
+	指標の途中経過の読み書き（stock_analysis.dbのindicator_stateテーブル）
+
+	advance() で日足の最新日まで途中経過を進め、analyze() でanalyze_panelと同じ形式の判定結果を返す。
+	"""
+
+	def __init__(self, db: Optional[DatabaseManager] = None):
+		self.db = db or DatabaseManager()
+
+	def advance(self, price_data: Dict[str, pd.DataFrame], codes: List[str],
+	            full: bool = False) -> IndicatorState:
+		"""
+		日足の最新日まで途中経過を進めて保存
+
+		Args:
+			price_data: 銘柄コードをキーとした日足DataFrameの辞書（PriceStore.loadの戻り値）
+			codes: 銘柄コードのリスト
+			full: Trueなら全銘柄を日足から計算し直す
+
+		Returns:
+			日足のある銘柄の途中経過
+		"""
+		codes = [code for code in codes if price_data.get(code) is not None and len(price_data[code])]
+		stored = {} if full else self.db.get_indicator_states(codes)
+
+		current_rows = []
+		step_rows = []
+		recompute = []
+		for code in codes:
+			df = price_data[code]
+			row = stored.get(code)
+			if row is None:
+				recompute.append(code)
+				continue
+
+			# 状態のJSONは1回だけ読み、from_rowsでもそのまま使う
+			row = dict(row, state=json.loads(row['state']))
+			last_close = row['state']['snapshots']['Close'][-1]
+			closes = df['Close'].to_numpy(dtype=float)
+			if _bar_date(df, -1) == row['as_of'] and _same_close(last_close, closes[-1]):
+				current_rows.append(row)
+			elif len(df) >= 2 and _bar_date(df, -2) == row['as_of'] and _same_close(last_close, closes[-2]) and \
+			     row['updates'] + 1 < FULL_RECOMPUTE_INTERVAL:
+				step_rows.append(row)
+			else:
+				recompute.append(code)
+
+		current = IndicatorState.from_rows(current_rows)
+
+		# 新しい日足を1本だけ畳み込む
+		stepped = IndicatorState.from_rows(step_rows)
+		if stepped.codes:
+			last_bars = [price_data[code].iloc[-1] for code in stepped.codes]
+			bars = np.array([
+				[bar[column] for column in ('Open', 'High', 'Low', 'Close', 'Volume')]
+				for bar in last_bars
+			], dtype=float)
+			stepped.fold(*bars.T)
+			stepped.as_of = [_bar_date(price_data[code], -1) for code in stepped.codes]
+			stepped.updates = stepped.updates + 1
+
+		rebuilt = IndicatorState.from_frames(price_data, recompute) if recompute else IndicatorState.empty([])
+
+		with self.db.session():
+			self.db.save_indicator_states_many(stepped.to_rows() + rebuilt.to_rows())
+
+		return IndicatorState.concat([current, stepped, rebuilt])
+
+	def analyze(self, price_data: Dict[str, pd.DataFrame], codes: List[str],
+	            full: bool = False) -> List[Tuple[Optional[dict], Optional[dict], Optional[dict]]]:
+		"""
+		途中経過を進めて三位一体・バンドウォーク・エクスパンションを判定
+
+		Returns:
+			銘柄ごとの (三位一体, バンドウォーク, エクスパンション) のリスト（codesの順、analyze_panelと同じ形式）
+		"""
+		state = self.advance(price_data, codes, full)
+		if not state.codes:
+			return [(None, None, None) for _ in codes]
+		results = evaluate_models(*state.panel())
+		return [results.get(code, (None, None, None)) for code in codes]
@@ -0,0 +1,110 @@
+"""
+テクニカル指標の計算（NumPy）
+
+pandas_taの rsi / bbands / vwap / atr と同じ式の値を、中間のDataFrameを作らずに配列のまま計算する。
+各関数は1銘柄の1次元配列（日付順）でも、複数銘柄の (銘柄 × 日) の2次元配列でも受け取り、
+最後の軸を日付として同じ形の配列を返す。先頭のNaN（銘柄ごとに日数が違う場合の埋め草）はデータなしとして扱う。
+
+列名との対応:
+	rsi(close, 9)                    RSI_9
+	bbands(close, 20, 2.0)           BBL_20_2.0 / BBM_20_2.0 / BBU_20_2.0 / BBB_20_2.0
+	vwap(high, low, close, volume)   VWAP_D（日足）
+	atr(high, low, close, 14)        ATRr_14
+"""
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict
+
+def shift_right(values: np.ndarray, periods: int = 1) -> np.ndarray:
+	"""日付の軸に沿って後ろへずらす（前日の値、先頭はNaN）"""
+	out = np.full(values.shape, np.nan)
+	if periods < values.shape[-1]:
+		out[..., periods:] = values[..., :-periods]
+	return out
+
+def rolling_window(values: np.ndarray, length: int) -> np.ndarray:
+	"""直近length日の窓（最後の軸に窓の長さが増える）、窓が足りない先頭はNaN"""
+	padding = np.full(values.shape[:-1] + (length - 1,), np.nan)
+	padded = np.concatenate([padding, values], axis=-1)
+	return sliding_window_view(padded, length, axis=-1)
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+	"""単純移動平均（窓内にNaNがあればNaN、rolling(length).mean()と同じ）"""
+	return rolling_window(values, length).mean(axis=-1)
+
+def stdev(values: np.ndarray, length: int) -> np.ndarray:
+	"""移動標準偏差（ddof=0、pandas_taのstdevと同じ）"""
+	return rolling_window(values, length).std(axis=-1, ddof=0)
+
+def rma(values: np.ndarray, length: int) -> np.ndarray:
+	"""
+	Wilderの移動平均（pandas_taのrma = ewm(alpha=1/length, min_periods=length).mean()）
+	NaNは重みの計算にだけ含め、値の平均からは除く（adjust=True, ignore_na=False と同じ）
+	"""
+	decay = 1.0 - 1.0 / length
+	shape = values.shape[:-1]
+	out = np.full(values.shape, np.nan)
+	numerator = np.zeros(shape)
+	denominator = np.zeros(shape)
+	count = np.zeros(shape)
+	for j in range(values.shape[-1]):
+		column = values[..., j]
+		valid = ~np.isnan(column)
+		numerator = numerator * decay + np.where(valid, column, 0.0)
+		denominator = denominator * decay + valid
+		count += valid
+		with np.errstate(invalid='ignore', divide='ignore'):
+			out[..., j] = np.where(count >= length, numerator / denominator, np.nan)
+	return out
+
+def rsi(close: np.ndarray, length: int = 9) -> np.ndarray:
+	"""RSI（pandas_taのrsi、列名RSI_9）"""
+	diff = close - shift_right(close)
+	positive = np.where(diff < 0, 0.0, diff)
+	negative = np.where(diff > 0, 0.0, diff)
+	positive_avg = rma(positive, length)
+	negative_avg = rma(negative, length)
+	with np.errstate(invalid='ignore', divide='ignore'):
+		return 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+def bbands(close: np.ndarray, length: int = 20, std: float = 2.0) -> Dict[str, np.ndarray]:
+	"""ボリンジャーバンド（pandas_taのbbands、BBL/BBM/BBU/BBBに相当）"""
+	mid = sma(close, length)
+	deviations = std * stdev(close, length)
+	lower = mid - deviations
+	upper = mid + deviations
+	with np.errstate(invalid='ignore', divide='ignore'):
+		bandwidth = 100 * (upper - lower) / mid
+	return {'lower': lower, 'mid': mid, 'upper': upper, 'bandwidth': bandwidth}
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+	"""
+	日次アンカーのVWAP（pandas_taのvwap、列名VWAP_D）
+	日足では1日1本のため典型価格 (H+L+C)/3 と同じ値になる（出来高0の日はNaN）
+	"""
+	typical_price = (high + low + close) / 3
+	with np.errstate(invalid='ignore', divide='ignore'):
+		return typical_price * volume / volume
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+	"""
+	真の値幅（pandas_taのtrue_range）
+	最初の日足は前日終値がないためNaN
+	"""
+	high_low = high - low
+	# pandas_taのnon_zero_rangeと同じく、高値=安値の日があれば系列全体に微小値を加える
+	has_zero = (high_low == 0).any(axis=-1, keepdims=True)
+	high_low = np.where(has_zero, high_low + sys.float_info.epsilon, high_low)
+	prev_close = shift_right(close)
+	ranges = np.fmax(np.fmax(np.abs(high_low), np.abs(high - prev_close)), np.abs(prev_close - low))
+
+	# 銘柄ごとの最初の日足（先頭の埋め草のNaNの次）をNaNにする
+	has_data = ~np.isnan(close)
+	first = np.argmax(has_data, axis=-1)[..., np.newaxis]
+	np.put_along_axis(ranges, first, np.nan, axis=-1)
+	return ranges
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> np.ndarray:
+	"""ATR（pandas_taのatr、列名ATRr_14）"""
+	return rma(true_range(high, low, close), length)
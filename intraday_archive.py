@@ -0,0 +1,306 @@
+"""
+5分足のローカルアーカイブ
+
+yfinanceの5分足は直近60日分しか取得できないため、毎日取得した5分足を銘柄ごとのファイルに追記して蓄積する
+（ストン法・弱張りの統計には1年分の5分足が必要）。
+
+保存形式:
+	intraday/<銘柄コード>.npy に (6, 本数) のfloat64配列を1つ保存する。
+	行は COLUMNS の順（時刻(UNIX秒), 始値, 高値, 安値, 終値, 出来高）で、各行が連続したメモリになる列指向の配置。
+	読み込みはメモリマップで行い、時刻の行を二分探索して必要な期間だけを切り出す。
+	追記時は既存分と結合して時刻で重複を除き（後から取得した値を優先）、一時ファイルに書いてから置き換える。
+	intraday/<銘柄コード>.fetched には、大引け後に取得済みの最後の取引日（YYYY-MM-DD）を保存する
+	（売買のない時間帯の5分足は配信されないため、大引けの足の有無では取得済みかどうかを判定できない）。
+
+使用例:
+	python3 intraday_archive.py                          # アーカイブ済みの全銘柄を更新
+	python3 intraday_archive.py --universe ranking       # kabutan.jpのランキング銘柄を追加・更新
+	python3 intraday_archive.py --codes-file codes.txt   # 一覧ファイルの銘柄を追加・更新
+	python3 intraday_archive.py --stats                  # 銘柄ごとの保存期間・本数を表示
+"""
+import os
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Tuple
+from price_store import JST, BAR_FINAL_TIME, download_bars, latest_session_date
+from trading_calendar import tse_calendar
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intraday')
+
+# yfinanceが返す5分足のタイムゾーン
+EXCHANGE_TZ = 'Asia/Tokyo'
+
+# 配列の行の並び（1行目の時刻はUNIX秒）
+COLUMNS = ('ts', 'Open', 'High', 'Low', 'Close', 'Volume')
+
+# yfinanceで取得できる5分足の期間
+MAX_FETCH_DAYS = 60
+
+# 1日の最後の5分足の開始時刻（大引け15:30）
+LAST_BAR_TIME = (15, 25)
+
+# 取引時間中に、最後の5分足からこの時間が経っていれば取り直す
+INTRADAY_REFRESH = timedelta(minutes=10)
+
+def _to_epoch(index: pd.DatetimeIndex) -> np.ndarray:
+	"""DatetimeIndexをUNIX秒に変換（タイムゾーンなしは日本時間とみなす）"""
+	if index.tz is None:
+		index = index.tz_localize(JST)
+	# 解像度（ns・usなど）によらず秒に揃える
+	utc = index.tz_convert('UTC').tz_localize(None)
+	return np.asarray(utc, dtype='datetime64[s]').astype(np.int64)
+
+def frame_to_array(df: pd.DataFrame) -> np.ndarray:
+	"""yfinanceの5分足DataFrameを (6, 本数) の配列に変換（OHLCがすべてNaNの足は除く）"""
+	df = df.dropna(how='all', subset=['Open', 'High', 'Low', 'Close'])
+	array = np.empty((len(COLUMNS), len(df)))
+	array[0] = _to_epoch(pd.DatetimeIndex(df.index))
+	for i, column in enumerate(COLUMNS[1:], 1):
+		array[i] = df[column].to_numpy(dtype=float)
+	return array
+
+def array_to_frame(array: np.ndarray) -> pd.DataFrame:
+	"""(6, 本数) の配列をyfinanceと同じ形のDataFrame（日本時間のDatetimeIndex）に変換"""
+	utc = pd.DatetimeIndex(array[0].astype(np.int64).astype('datetime64[s]').astype('datetime64[ns]'))
+	index = utc.tz_localize('UTC').tz_convert(EXCHANGE_TZ)
+	return pd.DataFrame(
+		{column: np.array(array[i]) for i, column in enumerate(COLUMNS[1:], 1)},
+		index=pd.DatetimeIndex(index, name='Datetime')
+	)
+
+def completed_session(now: Optional[datetime] = None) -> date:
+	"""取引がすべて終わっている直近の取引日（当日はBAR_FINAL_TIMEを過ぎてから）"""
+	now = now or datetime.now(JST)
+	day = now.date()
+	if (now.hour, now.minute) < BAR_FINAL_TIME:
+		day -= timedelta(days=1)
+	return tse_calendar.session_on_or_before(day)
+
+def merge_arrays(stored: Optional[np.ndarray], fetched: np.ndarray) -> np.ndarray:
+	"""保存済みと新しく取得した5分足を結合し、時刻順に並べて重複を除く（同じ時刻は取得した値を優先）"""
+	if stored is None or stored.shape[1] == 0:
+		combined = fetched
+	else:
+		combined = np.concatenate([stored, fetched], axis=1)
+
+	# 後ろ（新しく取得した側）から見て最初に現れた時刻を残す
+	reversed_ts = combined[0, ::-1]
+	_, first = np.unique(reversed_ts, return_index=True)
+	keep = combined.shape[1] - 1 - first
+	return combined[:, keep]
+
+class IntradayArchive:
+	"""銘柄ごとの5分足ファイル（ARCHIVE_DIR/<銘柄コード>.npy）の読み書き"""
+
+	def __init__(self, root: str = ARCHIVE_DIR):
+		self.root = root
+		self._lock = threading.Lock()
+
+	def path(self, code: str) -> str:
+		return os.path.join(self.root, f"{code}.npy")
+
+	def fetched_path(self, code: str) -> str:
+		return os.path.join(self.root, f"{code}.fetched")
+
+	def codes(self) -> List[str]:
+		"""アーカイブ済みの銘柄コード"""
+		if not os.path.isdir(self.root):
+			return []
+		return sorted(name[:-4] for name in os.listdir(self.root) if name.endswith('.npy'))
+
+	def load_array(self, code: str) -> Optional[np.ndarray]:
+		"""全期間の配列をメモリマップで読み込む（アーカイブがなければNone）"""
+		try:
+			return np.load(self.path(code), mmap_mode='r')
+		except (FileNotFoundError, ValueError):
+			return None
+
+	def slice(self, code: str, start: Optional[datetime] = None,
+	          end: Optional[datetime] = None) -> Optional[np.ndarray]:
+		"""
+		start以上end未満の5分足を (6, 本数) の配列で取得（メモリマップのビューでコピーしない）
+
+		Args:
+			start, end: 期間（タイムゾーンなしは日本時間とみなす、省略時は先頭・末尾まで）
+		"""
+		array = self.load_array(code)
+		if array is None:
+			return None
+		ts = array[0]
+		lo = np.searchsorted(ts, self._epoch(start), side='left') if start is not None else 0
+		hi = np.searchsorted(ts, self._epoch(end), side='left') if end is not None else len(ts)
+		return array[:, lo:hi]
+
+	def load(self, code: str, start: Optional[datetime] = None,
+	         end: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+		"""期間の5分足をyfinanceと同じ形のDataFrameで取得（データがなければNone）"""
+		array = self.slice(code, start, end)
+		if array is None or array.shape[1] == 0:
+			return None
+		return array_to_frame(array)
+
+	def last_time(self, code: str) -> Optional[datetime]:
+		"""保存済みの最後の5分足の時刻（日本時間）"""
+		array = self.load_array(code)
+		if array is None or array.shape[1] == 0:
+			return None
+		return datetime.fromtimestamp(int(array[0, -1]), JST)
+
+	def fetched_through(self, code: str) -> Optional[date]:
+		"""大引け後に取得済みの最後の取引日（記録がなければNone）"""
+		try:
+			with open(self.fetched_path(code), encoding='utf-8') as f:
+				return date.fromisoformat(f.read().strip())
+		except (FileNotFoundError, ValueError):
+			return None
+
+	def mark_fetched(self, code: str, through: date) -> None:
+		"""throughの取引日まで取得済みと記録（記録済みの日より前なら何もしない）"""
+		with self._lock:
+			current = self.fetched_through(code)
+			if current is not None and current >= through:
+				return
+			os.makedirs(self.root, exist_ok=True)
+			tmp_path = f"{self.fetched_path(code)}.{os.getpid()}.tmp"
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				f.write(through.isoformat())
+			os.replace(tmp_path, self.fetched_path(code))
+
+	def append(self, code: str, df: pd.DataFrame, fetched_through: Optional[date] = None) -> int:
+		"""
+		5分足を追記（重複する時刻は置き換え）
+
+		Args:
+			fetched_through: 取得した期間に含まれる、取引がすべて終わった最後の取引日
+			                 （5分足を1本以上保存できた場合だけmark_fetchedで記録する。yfinanceは通信エラーや
+			                 アクセス制限でも空のDataFrameを返すため、空の取得では取得済みにしない）
+
+		Returns:
+			追記後に増えた本数
+		"""
+		if df.empty:
+			return 0
+		fetched = frame_to_array(df)
+		if fetched.shape[1] == 0:
+			return 0
+
+		with self._lock:
+			stored = self.load_array(code)
+			before = 0 if stored is None else stored.shape[1]
+			merged = merge_arrays(None if stored is None else np.array(stored), fetched)
+			del stored
+
+			# 一時ファイルに書いてから置き換える（書き込み途中のファイルを読ませない）
+			os.makedirs(self.root, exist_ok=True)
+			tmp_path = f"{self.path(code)}.{os.getpid()}.tmp"
+			with open(tmp_path, 'wb') as f:
+				np.save(f, np.ascontiguousarray(merged))
+				f.flush()
+				os.fsync(f.fileno())
+			os.replace(tmp_path, self.path(code))
+
+		# 保存できてから取得済みと記録する
+		if fetched_through is not None:
+			self.mark_fetched(code, fetched_through)
+		return merged.shape[1] - before
+
+	def has_session(self, code: str, session_date) -> bool:
+		"""session_dateの取引が終わった後に取得済みか（または大引けの5分足まで保存済みか）"""
+		through = self.fetched_through(code)
+		if through is not None and through >= session_date:
+			return True
+		last = self.last_time(code)
+		if last is None:
+			return False
+		return last.date() > session_date or \
+			(last.date() == session_date and (last.hour, last.minute) >= LAST_BAR_TIME)
+
+	def is_fresh(self, code: str, now: Optional[datetime] = None) -> bool:
+		"""
+		直近の取引日の5分足が揃っているか
+		（大引けの足まで保存済み、または取引時間中で最後の足がINTRADAY_REFRESH以内）
+		"""
+		now = now or datetime.now(JST)
+		if self.has_session(code, latest_session_date(now)):
+			return True
+		last = self.last_time(code)
+		return last is not None and last.date() == latest_session_date(now) and now - last < INTRADAY_REFRESH
+
+	def update(self, codes: List[str]) -> Dict[str, int]:
+		"""
+		指定銘柄の不足している5分足をyfinanceから取得して追記
+		最後に保存した日から取り直し（途中までの日を埋める）、同じ開始日の銘柄はまとめて取得する
+
+		Returns:
+			銘柄コードをキーとした追記本数の辞書
+		"""
+		now = datetime.now(JST)
+		oldest_start = (now - timedelta(days=MAX_FETCH_DAYS - 1)).date()
+		groups: Dict[Tuple[str, str], List[str]] = {}
+		for code in codes:
+			if self.is_fresh(code, now):
+				continue
+			last = self.last_time(code)
+			if last is None or last.date() < oldest_start:
+				key = ('period', f"{MAX_FETCH_DAYS}d")
+			else:
+				key = ('start', last.date().isoformat())
+			groups.setdefault(key, []).append(code)
+
+		through = completed_session(now)
+		added = {}
+		for (kind, value), group in groups.items():
+			try:
+				fetched = download_bars(group, interval='5m', auto_adjust=False, **{kind: value})
+			except Exception:
+				continue
+			for code, df in fetched.items():
+				added[code] = self.append(code, df, fetched_through=through)
+		return added
+
+	@staticmethod
+	def _epoch(value: datetime) -> float:
+		value = pd.Timestamp(value)
+		if value.tzinfo is None:
+			value = value.tz_localize(JST)
+		return value.timestamp()
+
+# プロセス内で共有するアーカイブ
+intraday_archive = IntradayArchive()
+
+def main():
+	"""メイン処理"""
+	from swing_analysis import UNIVERSE_CHOICES, load_universe
+
+	parser = argparse.ArgumentParser(description='5分足のローカルアーカイブを更新')
+	parser.add_argument('--universe', choices=UNIVERSE_CHOICES, help='追加する銘柄（省略時はアーカイブ済みの銘柄だけ更新）')
+	parser.add_argument('--codes-file', help='追加する銘柄コード一覧ファイル（--universe file と同じ）')
+	parser.add_argument('--stats', action='store_true', help='銘柄ごとの保存期間・本数を表示して終了')
+	args = parser.parse_args()
+
+	if args.stats:
+		for code in intraday_archive.codes():
+			array = intraday_archive.load_array(code)
+			first = datetime.fromtimestamp(int(array[0, 0]), JST)
+			last = datetime.fromtimestamp(int(array[0, -1]), JST)
+			days = len(np.unique((array[0] + 9 * 3600) // 86400))
+			print(f"{code}: {first:%Y-%m-%d} 〜 {last:%Y-%m-%d} / {days} 日 / {array.shape[1]} 本")
+		return
+
+	codes = intraday_archive.codes()
+	universe = args.universe or ('file' if args.codes_file else None)
+	if universe:
+		codes = sorted(set(codes) | {stock['code'] for stock in load_universe(universe, args.codes_file)})
+	if not codes:
+		print("更新する銘柄がありません（--universe または --codes-file で銘柄を追加してください）")
+		return
+
+	print(f"更新対象: {len(codes)} 銘柄")
+	added = intraday_archive.update(codes)
+	print(f"✓ {len(added)} 銘柄に {sum(added.values())} 本の5分足を追記しました")
+
+if __name__ == "__main__":
+	main()
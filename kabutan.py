@@ -0,0 +1,353 @@
+"""
+kabutan.jpのページ解析
+
+lxmlがあればlxmlで、なければhtml.parserでパースする。
+まずSoupStrainerで必要な領域（株価欄・決算発表日・ランキング表）だけをパースし、
+見つからない場合だけページ全体をパースして従来の探し方で抽出する。
+同じページから複数の項目を取り出すときも、パースはそれぞれ1回だけ行う。
+"""
+import re
+import urllib.request
+from dataclasses import dataclass, asdict
+from typing import Optional, List, Dict, Any
+from bs4 import BeautifulSoup, SoupStrainer
+from rate_limiter import kabutan_limiter
+from scrape_cache import scrape_cache
+
+try:
+	import lxml  # noqa: F401
+	PARSER = 'lxml'
+except ImportError:
+	PARSER = 'html.parser'
+
+# 銘柄ページ（/stock/?code=）・決算ページ（/stock/finance?code=）で使う領域
+STOCK_PAGE_REGIONS = SoupStrainer(attrs={'id': ['stockinfo_i1', 'stockinfo_i2', 'stockinfo_i3', 'kessan_happyoubi']})
+
+STOCK_PAGE_URL = "https://kabutan.jp/stock/?code={code}"
+
+# ブロック対策のUser-Agent
+HEADERS = {
+	'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# ランキングページ（/warning/）の表
+RANKING_REGIONS = SoupStrainer('table')
+
+def make_soup(html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+	"""利用可能な最速のパーサーでBeautifulSoupを作成"""
+	return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+class KabutanPage:
+	"""
+	1ページ分のHTML
+	領域だけのパースとページ全体のパースをそれぞれ必要になった時点で1回だけ行い、複数項目の抽出で使い回す
+	"""
+
+	def __init__(self, html: str, regions: SoupStrainer = STOCK_PAGE_REGIONS):
+		self.html = html
+		self.regions = regions
+		self._region_soup = None
+		self._full_soup = None
+
+	@property
+	def region(self) -> BeautifulSoup:
+		if self._region_soup is None:
+			self._region_soup = make_soup(self.html, self.regions)
+		return self._region_soup
+
+	@property
+	def full(self) -> BeautifulSoup:
+		if self._full_soup is None:
+			self._full_soup = make_soup(self.html)
+		return self._full_soup
+
+def _to_page(page) -> KabutanPage:
+	return page if isinstance(page, KabutanPage) else KabutanPage(page)
+
+def _is_missing(text: str) -> bool:
+	"""「－倍」などのデータなしを検出"""
+	return "－" in text or text == "―" or not text or text.startswith("-")
+
+def _to_number(text: str) -> Optional[float]:
+	"""
+	文字列の最初の数値を取り出す（「12.3倍（前週11.0倍）」なら12.3、「1,234.5倍」なら1234.5）
+	数値がなければNone
+	"""
+	m = re.search(r"\d+(?:\.\d+)?", text.replace(",", ""))
+	return float(m.group(0)) if m else None
+
+def _ymd_from_kanji(text: str) -> Optional[str]:
+	"""「2025年11月6日」形式の日付を YYYY-MM-DD に変換"""
+	m = re.search(r"(\d{4})年(\d{1,2})月(\d{1,2})日", text)
+	if m:
+		y, mn, d = map(int, m.groups())
+		return f"{y:04d}-{mn:02d}-{d:02d}"
+	return None
+
+def _ymd_from_time(time_elem) -> Optional[str]:
+	"""time要素のdatetime属性（例: 2025-11-06T00:00:00+09:00）から日付部分を抽出"""
+	if time_elem and time_elem.has_attr("datetime"):
+		m = re.search(r"(\d{4}-\d{2}-\d{2})", time_elem["datetime"])
+		if m:
+			return m.group(1)
+	return None
+
+def parse_company_name(page) -> str:
+	"""銘柄ページから企業名を取得（見つからなければ空文字）"""
+	page = _to_page(page)
+	for soup in (page.region, page.full):
+		element = soup.find('span', class_='company_name')
+		if element:
+			return element.get_text(strip=True)
+	return ""
+
+def _credit_ratio_from_stockinfo(soup: BeautifulSoup):
+	"""
+	stockinfo_i3テーブルの「信用倍率」列を読む
+
+	Returns:
+		(列が見つかったか, 値) のタプル（データなしの場合は (True, None)）
+	"""
+	stockinfo_i3 = soup.find("div", id="stockinfo_i3")
+	table = stockinfo_i3.find("table") if stockinfo_i3 else None
+	thead = table.find("thead") if table else None
+	if not thead:
+		return False, None
+
+	# thead内のth要素で「信用倍率」の列インデックスを探す
+	credit_ratio_index = -1
+	for i, th in enumerate(thead.find_all("th")):
+		if th.get_text(strip=True) == "信用倍率":
+			credit_ratio_index = i
+			break
+	if credit_ratio_index < 0:
+		return False, None
+
+	# tbody内の対応するtd要素を取得
+	tbody = table.find("tbody")
+	tr = tbody.find("tr") if tbody else None
+	if not tr:
+		return False, None
+	td_elements = tr.find_all("td")
+	if len(td_elements) <= credit_ratio_index:
+		return False, None
+
+	text = td_elements[credit_ratio_index].get_text(strip=True)
+	if _is_missing(text):
+		return True, None
+	val = _to_number(text)
+	if val is not None:
+		return True, val
+	return False, None
+
+def parse_credit_ratio(page) -> Optional[float]:
+	"""銘柄ページから信用倍率を取得（データなし・見つからなければNone）"""
+	page = _to_page(page)
+
+	# 方法1: stockinfo_i3テーブル内の信用倍率を探す（領域だけのパースで足りる）
+	found, value = _credit_ratio_from_stockinfo(page.region)
+	if found:
+		return value
+
+	soup = page.full
+
+	# 方法2: th要素で「信用倍率」を探す（従来の方法）
+	th = soup.find("th", string=lambda s: s and "信用倍率" in s)
+	if th:
+		td = th.find_next_sibling("td")
+		if not td:
+			td = th.find_next("td")
+		if td:
+			text = td.get_text(strip=True)
+			if _is_missing(text):
+				return None
+			val = _to_number(text)
+			if val is not None:
+				return val
+
+	# 方法3: dt要素で探す
+	dt = soup.find("dt", string=lambda s: s and "信用倍率" in s)
+	if dt:
+		dd = dt.find_next_sibling("dd")
+		if dd:
+			val = _to_number(dd.get_text(strip=True))
+			if val is not None:
+				return val
+
+	# 方法4: div.fin_data_set 内を探す
+	for div in soup.find_all("div", class_=re.compile(r"fin.*data")):
+		text = div.get_text()
+		if "信用倍率" in text:
+			m = re.search(r"信用倍率[^0-9]*([0-9.,]+)", text)
+			if m:
+				val = _to_number(m.group(1))
+				if val is not None:
+					return val
+
+	return None
+
+def parse_earnings_date(page) -> Optional[str]:
+	"""決算ページから決算発表予定日（YYYY-MM-DD）を取得"""
+	page = _to_page(page)
+
+	# 方法1: id="kessan_happyoubi" のdiv要素を探す（領域だけのパースで足りる）
+	kessan_div = page.region.find("div", id="kessan_happyoubi")
+	if kessan_div:
+		ymd = _ymd_from_time(kessan_div.find("time"))
+		if ymd:
+			return ymd
+
+	soup = page.full
+
+	# 方法2: 「決算発表予定日」を含むdt要素を探す
+	dt_elem = soup.find("dt", string=lambda s: s and "決算発表予定日" in s)
+	if dt_elem:
+		dd_elem = dt_elem.find_next_sibling("dd")
+		if dd_elem:
+			ymd = _ymd_from_time(dd_elem.find("time"))
+			if ymd:
+				return ymd
+
+	# 方法3: 従来の方法（互換性のため）
+	th = soup.find("th", string=lambda s: s and "決算発表日" in s)
+	if th:
+		td = th.find_next_sibling("td")
+		if td:
+			ymd = _ymd_from_kanji(td.text)
+			if ymd:
+				return ymd
+
+	# 方法4: テキスト検索で探す
+	dt = soup.find(string=re.compile("決算発表日"))
+	if dt:
+		dd = dt.find_parent().find_next_sibling()
+		if dd:
+			ymd = _ymd_from_kanji(dd.text)
+			if ymd:
+				return ymd
+
+	return None
+
+def parse_market(page) -> Optional[str]:
+	"""銘柄ページから市場区分（例: 東証Ｐ）を取得"""
+	page = _to_page(page)
+	element = page.region.find('span', class_='market')
+	if element:
+		return element.get_text(strip=True) or None
+	return None
+
+def parse_sector(page) -> Optional[str]:
+	"""銘柄ページから業種（例: 輸送用機器）を取得"""
+	page = _to_page(page)
+	link = page.region.find('a', href=lambda x: x and 'industry=' in x)
+	if link:
+		return link.get_text(strip=True) or None
+	return None
+
+@dataclass
+class KabutanStockInfo:
+	"""kabutan.jpの銘柄ページ（/stock/?code=）から取得した銘柄情報"""
+	code: str
+	name: str
+	credit_ratio: Optional[float] = None
+	market: Optional[str] = None
+	sector: Optional[str] = None
+
+	def to_dict(self) -> Dict[str, Any]:
+		return asdict(self)
+
+	@classmethod
+	def from_dict(cls, data: Dict[str, Any]) -> 'KabutanStockInfo':
+		return cls(**data)
+
+def parse_stock_page(html: str, code: str = '') -> KabutanStockInfo:
+	"""銘柄ページから企業名・信用倍率・市場・業種をまとめて取得（パースは1回）"""
+	page = KabutanPage(html)
+	return KabutanStockInfo(
+		code=code,
+		name=parse_company_name(page),
+		credit_ratio=parse_credit_ratio(page),
+		market=parse_market(page),
+		sector=parse_sector(page)
+	)
+
+def fetch_html(url: str, session=None, timeout: float = 10) -> str:
+	"""
+	kabutan.jpのページを取得（kabutan_limiterで間隔をあける）
+
+	Args:
+		session: requests.Session（省略時はurllibで取得）
+	"""
+	kabutan_limiter.wait()
+	if session is not None:
+		res = session.get(url, headers=HEADERS, timeout=timeout)
+		res.raise_for_status()
+		return res.text
+	req = urllib.request.Request(url, headers=HEADERS)
+	with urllib.request.urlopen(req, timeout=timeout) as response:
+		return response.read().decode('utf-8')
+
+def fetch_stock_info(code: str, session=None, timeout: float = 10) -> Optional[KabutanStockInfo]:
+	"""銘柄ページを1回取得して銘柄情報を返す（取得・解析の失敗時はNone）"""
+	try:
+		html = fetch_html(STOCK_PAGE_URL.format(code=code), session, timeout)
+		return parse_stock_page(html, code)
+	except Exception:
+		return None
+
+def get_stock_info(code: str, session=None, timeout: float = 10) -> Optional[KabutanStockInfo]:
+	"""
+	銘柄情報をscrape_cache経由で取得
+	企業名（swing_analysis.py）と信用倍率（company.py）は同じレコードを使うため、ページの取得は1回で済む
+	"""
+	def fetch():
+		info = fetch_stock_info(code, session, timeout)
+		return info.to_dict() if info else None
+
+	data = scrape_cache.get('stock_info', code, fetch)
+	return KabutanStockInfo.from_dict(data) if data else None
+
+def _find_ranking_tbody(soup: BeautifulSoup):
+	"""最初の行に銘柄コードリンクがある表（ランキング表）のtbodyを探す"""
+	for table in soup.find_all('table'):
+		tbody = table.find('tbody')
+		if not tbody:
+			continue
+		first_row = tbody.find('tr')
+		if first_row and first_row.find('a', href=lambda x: x and '/stock/?code=' in x):
+			return tbody
+	return None
+
+def parse_ranking(html: str) -> List[Dict[str, str]]:
+	"""
+	ランキングページから銘柄一覧を取得
+
+	Returns:
+		銘柄情報のリスト（コード、企業名を含む、ページ内の順）
+	"""
+	page = KabutanPage(html, RANKING_REGIONS)
+	ranking_tbody = _find_ranking_tbody(page.region) or _find_ranking_tbody(page.full)
+	if not ranking_tbody:
+		return []
+
+	stocks = []
+	seen = set()
+	for row in ranking_tbody.find_all('tr'):
+		# 最初のtdから銘柄コードを取得
+		code_link = row.find('a', href=lambda x: x and '/stock/?code=' in x)
+		if not code_link:
+			continue
+		code = code_link.get_text(strip=True)
+
+		# 次のthから企業名を取得
+		name_th = row.find('th', scope='row')
+		if not name_th:
+			continue
+
+		if code not in seen:
+			seen.add(code)
+			stocks.append({
+				'code': code,
+				'name': name_th.get_text(strip=True)
+			})
+	return stocks
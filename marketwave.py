@@ -1,8 +1,13 @@
 import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import date, datetime, timedelta
+import argparse
 import json
-import pandas.tseries.offsets as offsets
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import yfinance_limiter
+from intraday_archive import intraday_archive
+from trading_calendar import tse_calendar
 
 class MarketWaveAnalyzer:
     def __init__(self, ticker):
@@ -16,23 +21,35 @@ class MarketWaveAnalyzer:
 
     def fetch_data(self):
         """
-        YFinanceから10営業日分の5分足データを取得
+        前日までの10営業日分の5分足データを取得
+        ローカルアーカイブ（intraday_archive.py）に直近の取引日まで揃っていればそれを使い、
+        なければYFinanceから取得してアーカイブに追記する
         """
         try:
-            # 現在時刻から10営業日前までの期間を設定
+            # 当日を含まない直近10営業日（祝日・年末年始を除く）の期間を設定
             end_date = datetime.now()
-            start_date = end_date - offsets.BDay(10)
-
-            # 5分足データを取得
-            stock = yf.Ticker(f"{self.ticker}.T")
-            self.data = stock.history(
-                start=start_date.strftime('%Y-%m-%d'),
-                end=end_date.strftime('%Y-%m-%d'),
-                interval='5m'
-            )
+            sessions = tse_calendar.previous_n_sessions(end_date.date(), 10)
+            start_date = datetime.combine(sessions[0], datetime.min.time())
+
+            # 前の営業日の取引終了後に取得済みであれば取得しない
+            if not intraday_archive.has_session(self.ticker, sessions[-1]):
+                # 5分足を取得（並列スキャン時もアクセス間隔をあける）
+                yfinance_limiter.wait()
+                stock = yf.Ticker(f"{self.ticker}.T")
+                fetched = stock.history(
+                    start=start_date.strftime('%Y-%m-%d'),
+                    end=end_date.strftime('%Y-%m-%d'),
+                    interval='5m'
+                )
+                # 売買のない時間帯の足は配信されないため、5分足を保存できた時点で前の営業日まで取得済みと記録する
+                # （空の結果は通信エラー・アクセス制限の場合もあるので記録せず、次回取り直す）
+                if not fetched.empty:
+                    intraday_archive.append(self.ticker, fetched, fetched_through=sessions[-1])
+
+            self.data = intraday_archive.load(self.ticker, start=start_date, end=end_date.date())
 
             # データが空の場合のエラーハンドリング
-            if self.data.empty:
+            if self.data is None or self.data.empty:
                 raise ValueError(f"データが取得できませんでした: {self.ticker}")
 
             # 日付カラムを一度だけ追加（pandas警告対策）
@@ -54,59 +71,51 @@ class MarketWaveAnalyzer:
             return {"error": "データがありません"}
 
         try:
-            # 日付ごとにグループ化（既にfetch_dataでdateカラムが追加済み）
-            daily_groups = self.data.groupby('date')
+            threshold = 0.3  # ±0.3%以内は"うねり"とみなさない
+
+            # 日付ごとに足を連続させる（groupbyと同じく日付順、日内は元の順序）
+            day_codes, days = pd.factorize(self.data['date'], sort=True)
+            order = np.argsort(day_codes, kind='stable')
+            day_codes = day_codes[order]
+            opens = self.data['Open'].to_numpy(dtype=float)[order]
+            closes = self.data['Close'].to_numpy(dtype=float)[order]
+
+            # 各日の先頭行の位置と本数
+            day_starts = np.flatnonzero(np.r_[True, np.diff(day_codes) != 0])
+            day_lengths = np.diff(np.r_[day_starts, len(day_codes)])
+            bar_positions = np.arange(len(day_codes)) - day_starts[day_codes]
+
+            # その日の始値（最初の5分足の始値）からの変動率
+            # 2本目以降で閾値以上の変動だけを対象にする（NaNは比較でFalseになり除外）
+            start_prices = opens[day_starts][day_codes]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                price_diff_percent = ((closes - start_prices) / start_prices) * 100
+                valid = (bar_positions >= 1) & (np.abs(price_diff_percent) >= threshold)
+            valid_days = day_codes[valid]
+            valid_percent = price_diff_percent[valid]
+
+            # 最大上昇率・下降率（対象の足がなければ0）
+            max_up_percent = np.zeros(len(days))
+            max_down_percent = np.zeros(len(days))
+            np.maximum.at(max_up_percent, valid_days, valid_percent)
+            np.minimum.at(max_down_percent, valid_days, valid_percent)
+
+            # 同じ日の中で、直前の対象足と方向（符号）が変わった回数
+            directions = np.sign(valid_percent)
+            turned = (np.diff(directions) != 0) & (np.diff(valid_days) == 0)
+            cross_counts = np.bincount(valid_days[1:][turned], minlength=len(days))
 
             daily_results = []
-
-            for date, day_data in daily_groups:
-                if len(day_data) < 10:  # 最低10本の足が必要
+            for i, date in enumerate(days):
+                if day_lengths[i] < 10:  # 最低10本の足が必要
                     continue
 
-                # その日の始値（最初の5分足の始値）
-                start_price = day_data.iloc[0]['Open']
-
-                # 往復カウントと変動率を計算
-                cross_count = 0
-                current_direction = None  # 1:上昇, -1:下降, None:初期
-                max_up_percent = 0
-                max_down_percent = 0
-                threshold = 0.3  # ±0.3%以内は"うねり"とみなさない
-
-                for i in range(1, len(day_data)):
-                    current_price = day_data.iloc[i]['Close']
-                    price_diff_percent = ((current_price - start_price) / start_price) * 100
-
-                    # 閾値以下の変動は無視（小さなブレを除外）
-                    if abs(price_diff_percent) < threshold:
-                        continue
-
-                    # 最大上昇率・下降率を更新
-                    if price_diff_percent > max_up_percent:
-                        max_up_percent = price_diff_percent
-                    if price_diff_percent < max_down_percent:
-                        max_down_percent = price_diff_percent
-
-                    # 方向の判定
-                    if price_diff_percent > 0:
-                        new_direction = 1
-                    elif price_diff_percent < 0:
-                        new_direction = -1
-                    else:
-                        new_direction = current_direction
-
-                    # 方向が変わったらカウント
-                    if current_direction is not None and new_direction != current_direction:
-                        cross_count += 1
-
-                    current_direction = new_direction
-
                 # 1日の結果を保存
                 daily_results.append({
                     'date': str(date),
-                    'cross_count': cross_count,
-                    'max_up_percent': round(max_up_percent, 2),
-                    'max_down_percent': round(max_down_percent, 2)
+                    'cross_count': int(cross_counts[i]),
+                    'max_up_percent': round(float(max_up_percent[i]), 2),
+                    'max_down_percent': round(float(max_down_percent[i]), 2)
                 })
 
             # 10日間の平均を計算
@@ -215,19 +224,106 @@ class MarketWaveAnalyzer:
         return json.dumps(combined_result, ensure_ascii=False, indent=2)
 
 
-# テスト用
-if __name__ == "__main__":
-    # 4755 楽天グループでテスト
-    analyzer = MarketWaveAnalyzer(4755)
-
-    print("=== うねり指数 ===")
+def summarize_marketwave(ticker):
+    """
+    1銘柄のうねり指数・流動性指数を計算し、スキャン用の要約を返す
+    データが取得できない場合はNone
+    """
+    analyzer = MarketWaveAnalyzer(ticker)
     uneri_result = analyzer.uneri()
-    print(json.dumps(uneri_result, ensure_ascii=False, indent=2))
-
-    print("\n=== 流動性指数 ===")
     wave_result = analyzer.wave()
-    print(json.dumps(wave_result, ensure_ascii=False, indent=2))
+    if 'error' in uneri_result or 'error' in wave_result:
+        return None
+
+    return {
+        'code': str(ticker),
+        'average_cross_count': uneri_result['average_cross_count'],
+        'average_max_up_percent': uneri_result['average_max_up_percent'],
+        'average_max_down_percent': uneri_result['average_max_down_percent'],
+        'average_liquidity_score': wave_result['average_liquidity_score'],
+        'days_analyzed': wave_result['total_days_analyzed']
+    }
+
+
+def scan_universe(stocks, workers=4):
+    """
+    複数銘柄のうねり指数・流動性指数を並列に計算してランキング
+
+    Args:
+        stocks: 銘柄情報のリスト（fetch_ranking_stocksと同じ形式）
+        workers: 並列数（5分足の取得はI/O待ちが中心のためスレッドで並列化）
+
+    Returns:
+        流動性指数の高い順（同点はうねりの多い順）に並べた結果のリスト
+    """
+    codes = [stock['code'] for stock in stocks]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        summaries = list(executor.map(summarize_marketwave, codes))
+
+    results = []
+    for stock, summary in zip(stocks, summaries):
+        if summary:
+            summary['company_name'] = stock['name'] or stock['code']
+            results.append(summary)
+
+    results.sort(key=lambda r: (-r['average_liquidity_score'], -r['average_cross_count']))
+    for rank, result in enumerate(results, 1):
+        result['rank'] = rank
+    return results
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='うねり指数・流動性指数の分析')
+    parser.add_argument('--ticker', default='4755', help='単一銘柄の分析（デフォルト: 4755 楽天グループ）')
+    parser.add_argument('--scan', action='store_true', help='複数銘柄をスキャンしてDBに保存')
+    parser.add_argument('--codes-file', help='スキャン対象の銘柄コード一覧ファイル（省略時はkabutanのランキング）')
+    parser.add_argument('--workers', type=int, default=4, help='スキャン時の並列数')
+    args = parser.parse_args()
+
+    if not args.scan:
+        # 単一銘柄でテスト
+        analyzer = MarketWaveAnalyzer(args.ticker)
+
+        print("=== うねり指数 ===")
+        uneri_result = analyzer.uneri()
+        print(json.dumps(uneri_result, ensure_ascii=False, indent=2))
+
+        print("\n=== 流動性指数 ===")
+        wave_result = analyzer.wave()
+        print(json.dumps(wave_result, ensure_ascii=False, indent=2))
+
+        print("\n=== 統合結果 ===")
+        full_result = analyzer.get_analysis()
+        print(full_result)
+        return
+
+    from db_manager import DatabaseManager
+    from swing_analysis import fetch_ranking_stocks, load_codes_file
+
+    stocks = load_codes_file(args.codes_file) if args.codes_file else fetch_ranking_stocks()
+    if not stocks:
+        print("エラー: 銘柄情報を取得できませんでした")
+        return
+
+    print(f"スキャン対象: {len(stocks)} 銘柄")
+    results = scan_universe(stocks, args.workers)
+
+    analysis_date = str(date.today())
+    db = DatabaseManager()
+    with db.session():
+        # 企業名のない銘柄（コードだけの一覧ファイル）は企業マスタの名前を上書きしない
+        db.upsert_companies_many([(stock['code'], stock['name']) for stock in stocks if stock['name']])
+        db.save_marketwave_results_many(analysis_date, results)
+
+    if results:
+        print("\n【流動性・うねりランキング】")
+        print(pd.DataFrame(results)[[
+            'rank', 'company_name', 'code', 'average_liquidity_score',
+            'average_cross_count', 'average_max_up_percent', 'average_max_down_percent'
+        ]].to_string(index=False))
+    print(f"✓ {len(results)}/{len(stocks)} 銘柄の結果を保存しました（{analysis_date}）")
 
-    print("\n=== 統合結果 ===")
-    full_result = analyzer.get_analysis()
-    print(full_result)
+
+if __name__ == "__main__":
+    main()
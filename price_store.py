@@ -0,0 +1,321 @@
+import math
+import pandas as pd
+import yfinance as yf
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any
+from db_manager import DatabaseManager
+from rate_limiter import yfinance_limiter
+from trading_calendar import tse_calendar
+
+# 日本時間（東証の取引時間の判定に使用）
+JST = timezone(timedelta(hours=9))
+
+# 初回取得時に保存する履歴の長さ
+INITIAL_PERIOD = "2y"
+
+# この時刻以降に取得した当日の日足を確定値とみなす（大引け15:30 + 配信遅延）
+BAR_FINAL_TIME = (15, 50)
+
+# 1回のyf.downloadで取得する銘柄数（全銘柄スキャンでは分割して取得）
+DOWNLOAD_CHUNK_SIZE = 200
+
+# ベータ値の基準にする指数（TOPIXはyfinanceで指数が取れないため連動ETFの1306で代用）
+BENCHMARKS = {
+	'N225': '^N225',
+	'TOPIX': '1306'
+}
+
+def to_symbol(code: str) -> str:
+	"""
+	銘柄コードをyfinanceのティッカーに変換
+	指数（^N225など）や市場サフィックス付きのティッカーはそのまま使う
+	"""
+	if code.startswith('^') or '.' in code:
+		return code
+	return f"{code}.T"
+
+def download_bars(codes: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+	"""
+	複数銘柄の日足をまとめて取得し、銘柄ごとのDataFrameに分割
+	DOWNLOAD_CHUNK_SIZE銘柄ごとに1回のリクエストで取得する
+
+	Args:
+		codes: 銘柄コードのリスト（例: ['6920', '7203']）
+		**kwargs: yf.downloadに渡す引数（period, start, auto_adjustなど）
+
+	Returns:
+		銘柄コードをキーとした日足DataFrameの辞書（取得できなかった銘柄は含まない）
+	"""
+	bars = {}
+	if not codes:
+		return bars
+
+	if len(codes) > DOWNLOAD_CHUNK_SIZE:
+		for i in range(0, len(codes), DOWNLOAD_CHUNK_SIZE):
+			# 1つの分割で失敗しても残りの銘柄は取得する
+			try:
+				bars.update(download_bars(codes[i:i + DOWNLOAD_CHUNK_SIZE], **kwargs))
+			except Exception:
+				continue
+		return bars
+
+	symbols = [to_symbol(code) for code in codes]
+	yfinance_limiter.wait()
+	data = yf.download(
+		" ".join(symbols),
+		progress=False,
+		group_by='ticker',
+		threads=True,
+		**kwargs
+	)
+
+	for code, symbol in zip(codes, symbols):
+		# group_by='ticker'では (ティッカー, 項目) のMultiIndexになる
+		if isinstance(data.columns, pd.MultiIndex):
+			if symbol not in data.columns.get_level_values(0):
+				continue
+			df = data[symbol]
+		else:
+			df = data
+
+		# 他銘柄にだけ存在する日付の行（全列NaN）を除外
+		df = df.dropna(how='all')
+		if df.empty:
+			continue
+
+		bars[code] = df
+
+	return bars
+
+def latest_session_date(now: Optional[datetime] = None) -> date:
+	"""
+	直近で取引が始まっている日付を返す（土日・祝日・年末年始を除く）
+	"""
+	now = now or datetime.now(JST)
+	target = now.date()
+	if now.hour < 9:
+		target -= timedelta(days=1)
+	return tse_calendar.session_on_or_before(target)
+
+def next_final_time(now: Optional[datetime] = None) -> datetime:
+	"""次に日足が確定する時刻（営業日のBAR_FINAL_TIME）"""
+	now = now or datetime.now(JST)
+	target = now.replace(hour=BAR_FINAL_TIME[0], minute=BAR_FINAL_TIME[1], second=0, microsecond=0)
+	if target <= now or not tse_calendar.is_session(target.date()):
+		target = datetime.combine(tse_calendar.next_session(now.date()), target.timetz())
+	return target
+
+def is_final_bar(bar_date: str, fetched_at: str) -> bool:
+	"""大引け後に取得した日足（＝確定値）かどうかを判定"""
+	final_time = datetime.combine(
+		date.fromisoformat(bar_date),
+		datetime.min.time(),
+		tzinfo=JST
+	).replace(hour=BAR_FINAL_TIME[0], minute=BAR_FINAL_TIME[1])
+	return datetime.fromisoformat(fetched_at) >= final_time
+
+def _to_float(value: Any) -> Optional[float]:
+	"""NaNをNoneに変換してfloat化"""
+	try:
+		value = float(value)
+	except (TypeError, ValueError):
+		return None
+	return None if math.isnan(value) else value
+
+def _frame_to_bars(df: pd.DataFrame, fetched_at: str) -> List[Dict[str, Any]]:
+	"""yfinanceの調整前DataFrameをdaily_barsの行に変換"""
+	adj_close = df['Adj Close'] if 'Adj Close' in df.columns else df['Close']
+	bars = []
+	for ts, open_, high, low, close, adj, volume in zip(
+		df.index, df['Open'], df['High'], df['Low'], df['Close'], adj_close, df['Volume']
+	):
+		bars.append({
+			'date': ts.strftime('%Y-%m-%d'),
+			'open': _to_float(open_),
+			'high': _to_float(high),
+			'low': _to_float(low),
+			'close': _to_float(close),
+			'adj_close': _to_float(adj),
+			'volume': _to_float(volume),
+			'fetched_at': fetched_at
+		})
+	return bars
+
+def _same_price(stored: Optional[float], fetched: Optional[float]) -> bool:
+	"""保存済みの値と再取得した値が一致するか（浮動小数点の誤差は許容）"""
+	if stored is None or fetched is None:
+		return stored is None and fetched is None
+	return math.isclose(stored, fetched, rel_tol=1e-6)
+
+class PriceStore:
+	"""
+	日足OHLCVのローカルストア（stock_analysis.dbのdaily_barsテーブル）
+
+	まずDBから読み、足りない直近分だけyfinanceから取得して追記する。
+	配当や株式分割で過去の値が変わった銘柄は全期間を取り直す。
+	"""
+
+	def __init__(self, db: Optional[DatabaseManager] = None):
+		self.db = db or DatabaseManager()
+
+	def update(self, codes: List[str]) -> None:
+		"""
+		指定銘柄の不足している日足をyfinanceから取得して保存
+		同じ開始日の銘柄はまとめて1回のリクエストで取得する
+		"""
+		session_date = latest_session_date().isoformat()
+		initial_codes = []
+		tail_groups = {}
+		check_bars = {}
+
+		with self.db.session():
+			for code in codes:
+				latest = self.db.get_latest_daily_bars(code, limit=2)
+				if not latest:
+					initial_codes.append(code)
+					continue
+
+				last_bar = latest[0]
+				if last_bar['date'] >= session_date and is_final_bar(last_bar['date'], last_bar['fetched_at']):
+					continue
+
+				# 1本前の確定済みの日足から取り直し、値が変わっていないか照合する
+				check_bar = latest[1] if len(latest) >= 2 else latest[0]
+				check_bars[code] = check_bar
+				tail_groups.setdefault(check_bar['date'], []).append(code)
+
+		fetched_at = datetime.now(JST).isoformat(timespec='seconds')
+
+		for start_date, group in tail_groups.items():
+			try:
+				fetched = download_bars(group, start=start_date, auto_adjust=False)
+			except Exception:
+				continue
+
+			# 取得したグループごとに1トランザクションで保存
+			with self.db.session():
+				for code, df in fetched.items():
+					bars = _frame_to_bars(df, fetched_at)
+					check_bar = check_bars[code]
+					first_bar = bars[0]
+
+					# 照合用の日足が一致しなければ、配当・分割で過去の値が調整されている
+					if first_bar['date'] == check_bar['date'] and \
+					   is_final_bar(check_bar['date'], check_bar['fetched_at']) and \
+					   not (_same_price(check_bar['close'], first_bar['close']) and
+					        _same_price(check_bar['adj_close'], first_bar['adj_close'])):
+						self.db.delete_daily_bars(code)
+						initial_codes.append(code)
+						continue
+
+					self.db.save_daily_bars(code, bars)
+
+		if initial_codes:
+			try:
+				fetched = download_bars(initial_codes, period=INITIAL_PERIOD, auto_adjust=False)
+			except Exception:
+				return
+
+			with self.db.session():
+				for code, df in fetched.items():
+					self.db.save_daily_bars(code, _frame_to_bars(df, fetched_at))
+
+	def load(self, codes: List[str], days: int = 120, auto_adjust: bool = True,
+	         update: bool = True) -> Dict[str, pd.DataFrame]:
+		"""
+		複数銘柄の日足をDataFrameで取得
+
+		Args:
+			codes: 銘柄コードのリスト
+			days: 取得する期間（暦日、yfinanceのperiod="120d"と同じ意味）
+			auto_adjust: Trueなら配当・分割調整後の値（yfinanceのauto_adjust=True相当）
+			update: Trueなら読み込み前に不足分をyfinanceから取得
+
+		Returns:
+			銘柄コードをキーとした日足DataFrameの辞書（データのない銘柄は含まない）
+		"""
+		if update:
+			self.update(codes)
+
+		start_date = (datetime.now(JST).date() - timedelta(days=days)).isoformat()
+		prices = {}
+		with self.db.session():
+			for code in codes:
+				bars = self.db.get_daily_bars(code, start_date)
+				if bars:
+					prices[code] = self._bars_to_frame(bars, auto_adjust)
+		return prices
+
+	def load_one(self, code: str, days: int = 120, auto_adjust: bool = True,
+	             update: bool = True) -> Optional[pd.DataFrame]:
+		"""1銘柄の日足をDataFrameで取得（データがなければNone）"""
+		return self.load([code], days, auto_adjust, update).get(code)
+
+	@staticmethod
+	def _bars_to_frame(bars: List[Dict[str, Any]], auto_adjust: bool) -> pd.DataFrame:
+		"""daily_barsの行をyfinanceと同じ列名のDataFrameに変換"""
+		df = pd.DataFrame(bars)
+		df.index = pd.DatetimeIndex(pd.to_datetime(df['date']), name='Date')
+		df = df.rename(columns={
+			'open': 'Open',
+			'high': 'High',
+			'low': 'Low',
+			'close': 'Close',
+			'adj_close': 'Adj Close',
+			'volume': 'Volume'
+		})[['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']].astype(float)
+
+		if auto_adjust:
+			# yfinanceのauto_adjustと同じく、Adj Close / Close の比率でOHLを調整
+			ratio = df['Adj Close'] / df['Close']
+			df[['Open', 'High', 'Low']] = df[['Open', 'High', 'Low']].mul(ratio, axis=0)
+			df['Close'] = df['Adj Close']
+			df = df.drop(columns='Adj Close')
+
+		return df
+
+class BenchmarkCache:
+	"""
+	指数（日経平均・TOPIX）の終値と日次リターンのキャッシュ
+
+	データはPriceStoreに保存され、プロセス内でも次の大引け後まで同じSeriesを使い回す。
+	1日に何銘柄のベータ値を計算しても、指数の取得は大引け後の1回だけになる。
+	"""
+
+	def __init__(self, store: Optional[PriceStore] = None):
+		self._store = store
+		self._series: Dict[Any, Any] = {}
+
+	@property
+	def store(self) -> PriceStore:
+		if self._store is None:
+			self._store = PriceStore()
+		return self._store
+
+	def get_close(self, name: str = 'N225', days: int = 90) -> Optional[pd.Series]:
+		"""
+		指数の終値を取得
+
+		Args:
+			name: BENCHMARKSのキー（'N225' または 'TOPIX'）
+			days: 取得期間（暦日）
+		"""
+		key = (name, days)
+		cached = self._series.get(key)
+		if cached and datetime.now(JST) < cached[0]:
+			return cached[1]
+
+		df = self.store.load_one(BENCHMARKS[name], days, auto_adjust=False)
+		close = df['Close'].dropna() if df is not None else None
+		if close is not None and not close.empty:
+			self._series[key] = (next_final_time(), close)
+			return close
+		return None
+
+	def get_returns(self, name: str = 'N225', days: int = 90) -> Optional[pd.Series]:
+		"""指数の日次リターン（calc_betaのindex_returnsに渡す）"""
+		close = self.get_close(name, days)
+		return close.pct_change().dropna() if close is not None else None
+
+# プロセス内で共有する指数キャッシュ
+benchmark_cache = BenchmarkCache()
@@ -0,0 +1,31 @@
+import threading
+import time
+
+class RateLimiter:
+	"""
+	リクエスト間隔を一定以上あけるためのスレッドセーフなレート制限
+	並列ワーカーから同じサイトへ同時にアクセスしないように使う
+	"""
+
+	def __init__(self, min_interval: float):
+		"""
+		Args:
+			min_interval: リクエスト間の最小間隔（秒）
+		"""
+		self.min_interval = min_interval
+		self._lock = threading.Lock()
+		self._next_time = 0.0
+
+	def wait(self) -> None:
+		"""前回のリクエストから最小間隔が経過するまで待機"""
+		with self._lock:
+			now = time.monotonic()
+			wait_time = self._next_time - now
+			self._next_time = max(now, self._next_time) + self.min_interval
+
+		if wait_time > 0:
+			time.sleep(wait_time)
+
+# サイトごとの共有レート制限（プロセス内で共有）
+yfinance_limiter = RateLimiter(0.5)
+kabutan_limiter = RateLimiter(1.0)
@@ -14,6 +14,9 @@ if (!file_exists($db_path)) {
 try {
 	$pdo = new PDO('sqlite:' . $db_path);
 	$pdo->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
+	// 夜間バッチの書き込み中はロック解除を待つ（WALモードでは通常待たずに読める）
+	$pdo->setAttribute(PDO::ATTR_TIMEOUT, 5);
+	$pdo->exec('PRAGMA busy_timeout = 5000');
 } catch (PDOException $e) {
 	die('データベース接続エラー: ' . $e->getMessage());
 }
@@ -26,38 +29,60 @@ if (!preg_match('/^\d{4}-\d{2}-\d{2}$/', $analysis_date)) {
 	die('エラー: 無効な日付形式です。');
 }
 
-// 三位一体モデルの分析結果を取得
-$stmt = $pdo->prepare('
-	SELECT ar.*, c.name as company_name
-	FROM analysis_results ar
-	LEFT JOIN companies c ON ar.code = c.code
-	WHERE ar.analysis_date = ?
-	ORDER BY ar.score DESC
-');
-$stmt->execute([$analysis_date]);
-$trinity_results = $stmt->fetchAll(PDO::FETCH_ASSOC);
+// 夜間バッチが作成した日別レポート（企業名付き・表示順）を主キーで1回だけ読む
+$report = null;
+try {
+	$stmt = $pdo->prepare('SELECT report FROM daily_reports WHERE analysis_date = ?');
+	$stmt->execute([$analysis_date]);
+	$report_json = $stmt->fetchColumn();
+	if ($report_json !== false) {
+		$report = json_decode($report_json, true);
+	}
+} catch (PDOException $e) {
+	// daily_reportsテーブルがまだないDBでは結合クエリで取得する
+	$report = null;
+}
 
-// バンドウォーク検出結果を取得
-$stmt = $pdo->prepare('
-	SELECT br.*, c.name as company_name
-	FROM bandwalk_results br
-	LEFT JOIN companies c ON br.code = c.code
-	WHERE br.analysis_date = ?
-	ORDER BY br.code
-');
-$stmt->execute([$analysis_date]);
-$bandwalk_results = $stmt->fetchAll(PDO::FETCH_ASSOC);
+if (is_array($report)) {
+	$trinity_results = $report['trinity'];
+	$bandwalk_results = $report['bandwalk'];
+	$expansion_results = $report['expansion'];
+} else {
+	// レポート未作成の日付は各結果テーブルを企業名と結合して取得
 
-// エクスパンション検出結果を取得
-$stmt = $pdo->prepare('
-	SELECT er.*, c.name as company_name
-	FROM expansion_results er
-	LEFT JOIN companies c ON er.code = c.code
-	WHERE er.analysis_date = ?
-	ORDER BY er.code
-');
-$stmt->execute([$analysis_date]);
-$expansion_results = $stmt->fetchAll(PDO::FETCH_ASSOC);
+	// 三位一体モデルの分析結果を取得
+	$stmt = $pdo->prepare('
+		SELECT ar.*, c.name as company_name
+		FROM analysis_results ar
+		LEFT JOIN companies c ON ar.code = c.code
+		WHERE ar.analysis_date = ?
+		ORDER BY ar.score DESC
+	');
+	$stmt->execute([$analysis_date]);
+	$trinity_results = $stmt->fetchAll(PDO::FETCH_ASSOC);
+
+	// バンドウォーク検出結果を取得
+	$stmt = $pdo->prepare('
+		SELECT br.*, c.name as company_name
+		FROM bandwalk_results br
+		LEFT JOIN companies c ON br.code = c.code
+		WHERE br.analysis_date = ?
+		ORDER BY br.code
+	');
+	$stmt->execute([$analysis_date]);
+	$bandwalk_results = $stmt->fetchAll(PDO::FETCH_ASSOC);
+
+	// エクスパンション検出結果を取得
+	$stmt = $pdo->prepare('
+		SELECT er.*, c.name as company_name
+		FROM expansion_results er
+		LEFT JOIN companies c ON er.code = c.code
+		WHERE er.analysis_date = ?
+		ORDER BY er.code
+	');
+	$stmt->execute([$analysis_date]);
+	$expansion_results = $stmt->fetchAll(PDO::FETCH_ASSOC);
+}
 
 // 日付をフォーマット
 $date_obj = DateTime::createFromFormat('Y-m-d', $analysis_date);
@@ -0,0 +1,301 @@
+"""
+採点モデルの宣言的なルール定義
+
+ルールは指標名を使った式（例: "Close > VWAP_D", "BBB > BBB[-3]"）と点数の組で書く。
+式は (銘柄 × 日) の2次元配列に対してNumPyでまとめて評価されるため、
+銘柄数によらず1モデルにつき1回の評価で全銘柄の判定ができる。
+
+式の書き方:
+	指標名            当日の値（例: Close, RSI_9, BBB）
+	指標名[-k]        k営業日前の値（例: BBB[-3] は3日前、df.iloc[-4] に相当）
+	比較              > >= < <= == != （連結も可: 0 < RSI_9 < 70）、score in (3, 4, 6)
+	論理              and / or / not
+	算術              + - * / 、単項マイナス
+	条件式            a if 条件 else b
+	関数              abs(x), min(a, b), max(a, b), isnan(x)
+	score             直前のステージまでの合計点（ScoreModelのステージ内でのみ使用可）
+
+NaNとの比較は常にFalse（pandasで iloc の値を比較した場合と同じ）。
+"""
+import ast
+import numpy as np
+from typing import Optional, List, Dict, Tuple, Callable, Any
+
+# 式で使える関数
+FUNCTIONS: Dict[str, Callable[..., np.ndarray]] = {
+	'abs': np.abs,
+	'min': np.minimum,
+	'max': np.maximum,
+	'isnan': np.isnan
+}
+
+COMPARATORS = {
+	ast.Gt: np.greater,
+	ast.GtE: np.greater_equal,
+	ast.Lt: np.less,
+	ast.LtE: np.less_equal,
+	ast.Eq: np.equal,
+	ast.NotEq: np.not_equal
+}
+
+BINARY_OPERATORS = {
+	ast.Add: np.add,
+	ast.Sub: np.subtract,
+	ast.Mult: np.multiply,
+	ast.Div: np.true_divide
+}
+
+class RuleSyntaxError(ValueError):
+	"""ルール式に使えない構文・名前が含まれている"""
+
+def shift(values: np.ndarray, periods: int) -> np.ndarray:
+	"""日付の軸（最後の軸）に沿ってperiods日ずらす（先頭はNaN）"""
+	if periods == 0:
+		return values
+	out = np.full(values.shape, np.nan)
+	if periods < values.shape[-1]:
+		out[..., periods:] = values[..., :-periods]
+	return out
+
+def _lookback(node: ast.Subscript, expr: str) -> int:
+	"""X[-k] の k を取り出す（未来の値 X[1] などは使えない）"""
+	index = node.slice
+	if isinstance(index, ast.Constant) and index.value == 0:
+		return 0
+	if isinstance(index, ast.UnaryOp) and isinstance(index.op, ast.USub) and \
+	   isinstance(index.operand, ast.Constant) and isinstance(index.operand.value, int):
+		return index.operand.value
+	raise RuleSyntaxError(f"過去の日付は X[-k] の形で指定してください: {expr}")
+
+def compile_expression(expr: str) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+	"""
+	ルール式を評価関数に変換
+
+	Returns:
+		環境（名前 → (N, T) 配列）を受け取り、(N, T) 配列を返す関数
+	"""
+	try:
+		tree = ast.parse(expr, mode='eval').body
+	except SyntaxError as e:
+		raise RuleSyntaxError(f"ルール式を解析できません: {expr}") from e
+
+	def build(node) -> Callable[[Dict[str, np.ndarray]], Any]:
+		if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+			value = float(node.value)
+			return lambda env: value
+
+		if isinstance(node, ast.Name):
+			name = node.id
+			return lambda env: env[name]
+
+		if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+			name = node.value.id
+			periods = _lookback(node, expr)
+			return lambda env: shift(env[name], periods)
+
+		if isinstance(node, ast.UnaryOp):
+			operand = build(node.operand)
+			if isinstance(node.op, ast.USub):
+				return lambda env: np.negative(operand(env))
+			if isinstance(node.op, ast.Not):
+				return lambda env: np.logical_not(operand(env))
+
+		if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+			func = BINARY_OPERATORS[type(node.op)]
+			left, right = build(node.left), build(node.right)
+			return lambda env: func(left(env), right(env))
+
+		if isinstance(node, ast.BoolOp):
+			func = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+			values = [build(v) for v in node.values]
+			def bool_op(env):
+				result = values[0](env)
+				for value in values[1:]:
+					result = func(result, value(env))
+				return result
+			return bool_op
+
+		if isinstance(node, ast.Compare):
+			operands = [build(node.left)] + [
+				_build_members(c, expr) if isinstance(op, (ast.In, ast.NotIn)) else build(c)
+				for op, c in zip(node.ops, node.comparators)
+			]
+			for op in node.ops:
+				if type(op) not in COMPARATORS and not isinstance(op, (ast.In, ast.NotIn)):
+					raise RuleSyntaxError(f"使えない比較演算子です: {expr}")
+			ops = node.ops
+			def compare(env):
+				result = None
+				left = operands[0](env)
+				for op, operand in zip(ops, operands[1:]):
+					right = operand(env)
+					if isinstance(op, ast.In):
+						mask = np.isin(left, right)
+					elif isinstance(op, ast.NotIn):
+						mask = ~np.isin(left, right)
+					else:
+						mask = COMPARATORS[type(op)](left, right)
+					result = mask if result is None else np.logical_and(result, mask)
+					left = right
+				return result
+			return compare
+
+		if isinstance(node, ast.IfExp):
+			test, body, orelse = build(node.test), build(node.body), build(node.orelse)
+			return lambda env: np.where(test(env), body(env), orelse(env))
+
+		if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and \
+		   node.func.id in FUNCTIONS and not node.keywords:
+			func = FUNCTIONS[node.func.id]
+			args = [build(a) for a in node.args]
+			return lambda env: func(*(a(env) for a in args))
+
+		raise RuleSyntaxError(f"ルール式に使えない構文です: {ast.dump(node)} ({expr})")
+
+	evaluate = build(tree)
+
+	def run(env: Dict[str, np.ndarray]) -> np.ndarray:
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return evaluate(env)
+	return run
+
+def _build_members(node, expr: str) -> Callable[[Dict[str, np.ndarray]], Tuple[float, ...]]:
+	"""score in (3, 4, 6) の右辺（数値のタプル）"""
+	if isinstance(node, (ast.Tuple, ast.List)):
+		values = []
+		for element in node.elts:
+			if isinstance(element, ast.UnaryOp) and isinstance(element.op, ast.USub) and \
+			   isinstance(element.operand, ast.Constant):
+				values.append(-float(element.operand.value))
+			elif isinstance(element, ast.Constant) and isinstance(element.value, (int, float)):
+				values.append(float(element.value))
+			else:
+				raise RuleSyntaxError(f"in の右辺は数値のタプルにしてください: {expr}")
+		members = tuple(values)
+		return lambda env: members
+	raise RuleSyntaxError(f"in の右辺は数値のタプルにしてください: {expr}")
+
+class Rule:
+	"""条件式と点数の組"""
+
+	def __init__(self, expr: str, points: float = 0, name: Optional[str] = None):
+		"""
+		Args:
+			expr: 条件式（例: "Close > VWAP_D"）
+			points: 条件を満たしたときの点数
+			name: ルール名（省略時は式）
+		"""
+		self.expr = expr
+		self.points = points
+		self.name = name or expr
+		self.evaluate = compile_expression(expr)
+
+	def mask(self, env: Dict[str, np.ndarray]) -> np.ndarray:
+		"""条件を満たすかどうか（NaNはFalse）"""
+		return np.asarray(self.evaluate(env), dtype=bool)
+
+	def __repr__(self):
+		return f"Rule({self.expr!r}, {self.points})"
+
+class Model:
+	"""
+	ルールの集まり
+
+	mode:
+		'sum'   満たしたルールの点数を合計（三位一体モデルの配点）
+		'first' 上から順に最初に満たしたルールの点数だけを採用（if / elif の連鎖）
+		'all'   全ルールを満たすかどうかの判定（点数は使わない）
+	"""
+
+	MODES = ('sum', 'first', 'all')
+
+	def __init__(self, name: str, rules: List[Rule], mode: str = 'sum',
+	             when: Optional[str] = None, clip: Optional[Tuple[float, float]] = None,
+	             derived: Optional[Dict[str, str]] = None):
+		"""
+		Args:
+			name: モデル名
+			rules: ルールのリスト
+			mode: 'sum' / 'first' / 'all'
+			when: この条件を満たす銘柄・日付だけ評価する（満たさなければ0点・False）
+			clip: 合計点の範囲（例: (0, 100)）
+			derived: 評価前に計算する派生指標（名前 → 式、例: {'BB_PLUS1': 'BBM + (BBU - BBL) / 4'}）
+		"""
+		if mode not in self.MODES:
+			raise ValueError(f"unknown mode: {mode}")
+		self.name = name
+		self.rules = rules
+		self.mode = mode
+		self.when = Rule(when) if when else None
+		self.clip = clip
+		self.derived = [(key, compile_expression(expr)) for key, expr in (derived or {}).items()]
+
+	def evaluate(self, env: Dict[str, np.ndarray]) -> np.ndarray:
+		"""
+		全銘柄・全日付をまとめて評価
+
+		Returns:
+			'all' ならbool配列、それ以外は点数の配列（環境の配列と同じ形）
+		"""
+		env = with_derived(env, self.derived)
+		masks = [rule.mask(env) for rule in self.rules]
+		shape = np.broadcast_shapes(*(m.shape for m in masks))
+
+		if self.mode == 'all':
+			result = np.ones(shape, dtype=bool)
+			for mask in masks:
+				result &= mask
+		elif self.mode == 'sum':
+			result = np.zeros(shape)
+			for rule, mask in zip(self.rules, masks):
+				result += np.where(mask, rule.points, 0)
+		else:
+			# 下のルールから順に上書きし、最初に満たしたルールの点数を残す
+			result = np.zeros(shape)
+			for rule, mask in reversed(list(zip(self.rules, masks))):
+				result = np.where(mask, rule.points, result)
+
+		if self.when is not None:
+			result = np.where(self.when.mask(env), result, False if self.mode == 'all' else 0)
+		if self.clip is not None:
+			result = np.clip(result, *self.clip)
+		return result
+
+class ScoreModel:
+	"""
+	複数ステージの採点モデル
+	各ステージの点数を順に合計し、途中までの合計点を次のステージで score として参照できる
+	（CCIスコアの「シグナル → 出来高で補正 → ローソク足で補正」のような段階的な採点）
+	"""
+
+	def __init__(self, name: str, stages: List[Model], derived: Optional[Dict[str, str]] = None):
+		"""
+		Args:
+			name: モデル名
+			stages: ステージ（Model）のリスト
+			derived: 評価前に計算する派生指標（名前 → 式）
+		"""
+		self.name = name
+		self.stages = stages
+		self.derived = [(key, compile_expression(expr)) for key, expr in (derived or {}).items()]
+
+	def evaluate(self, env: Dict[str, np.ndarray]) -> np.ndarray:
+		"""全銘柄・全日付の合計点"""
+		env = with_derived(env, self.derived)
+		score = np.zeros(np.shape(next(iter(env.values()))))
+		for stage in self.stages:
+			score = score + stage.evaluate({**env, 'score': score})
+		return score
+
+def with_derived(env: Dict[str, np.ndarray], derived: List[Tuple[str, Callable]]) -> Dict[str, np.ndarray]:
+	"""派生指標を順に計算して環境に追加（後の派生指標は前の派生指標を参照できる）"""
+	if not derived:
+		return env
+	env = dict(env)
+	for key, evaluate in derived:
+		env[key] = np.asarray(evaluate(env), dtype=float)
+	return env
+
+def latest(values: np.ndarray) -> np.ndarray:
+	"""評価結果から各銘柄の最新日の値を取り出す"""
+	return values[..., -1]
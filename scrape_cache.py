@@ -0,0 +1,194 @@
+import atexit
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Callable, Tuple
+from db_manager import DatabaseManager
+
+# 日本時間（有効期限の計算に使用）
+JST = timezone(timedelta(hours=9))
+
+# 取得に失敗した結果（None・{"error": ...}）を保持する期間
+NEGATIVE_TTL = timedelta(minutes=5)
+
+# ヒット・ミス回数をDBに書き込む間隔（秒、常駐プロセス用。それ以外はプロセス終了時に1回だけ書き込む）
+STATS_FLUSH_INTERVAL = 300
+
+# プロセス終了時に実行中の裏での再取得を待つ時間（秒）
+REVALIDATE_EXIT_TIMEOUT = 5.0
+
+# 信用残の週次公表（火曜）がkabutanに反映される時刻
+CREDIT_PUBLISH_WEEKDAY = 1
+CREDIT_PUBLISH_TIME = (18, 0)
+
+def next_credit_publish_time(now: datetime) -> datetime:
+	"""次に信用倍率が更新される時刻（次の火曜のCREDIT_PUBLISH_TIME）"""
+	target = now.replace(hour=CREDIT_PUBLISH_TIME[0], minute=CREDIT_PUBLISH_TIME[1], second=0, microsecond=0)
+	target += timedelta(days=(CREDIT_PUBLISH_WEEKDAY - now.weekday()) % 7)
+	if target <= now:
+		target += timedelta(days=7)
+	return target
+
+# 取得元ごとの 有効期限の計算, 期限切れ後も古い値を返してよい期間
+POLICIES: Dict[str, Tuple[Callable[[datetime], datetime], timedelta]] = {
+	# 決算発表予定日は年に数回しか変わらない
+	'earnings_date': (lambda now: now + timedelta(days=3), timedelta(days=7)),
+	# 信用倍率は週1回の公表（銘柄ページの企業名・市場・業種も同じレコードで保持）
+	'stock_info': (next_credit_publish_time, timedelta(days=7)),
+	# ニュースは数分単位で更新される
+	'news': (lambda now: now + timedelta(minutes=10), timedelta(hours=1))
+}
+
+def is_failure(value: Any) -> bool:
+	"""取得失敗とみなす結果かどうか"""
+	return value is None or (isinstance(value, dict) and 'error' in value)
+
+class ScrapeCache:
+	"""
+	kabutan・minkabuから取得した値の永続キャッシュ（stock_analysis.dbのscrape_cacheテーブル）
+
+	(取得元, 銘柄コード) をキーに、取得元ごとの有効期限まで同じ値を返す。
+	期限切れ後もPOLICIESの期間内なら古い値をすぐ返し、裏で再取得する（stale-while-revalidate）。
+	"""
+
+	def __init__(self, db: Optional[DatabaseManager] = None):
+		self._db = db
+		self._lock = threading.Lock()
+		self._revalidating = set()
+		# 実行中の再取得スレッド
+		self._threads = set()
+		self.counts = Counter()
+		# DBにまだ書き込んでいないヒット・ミス回数
+		self._pending_counts = Counter()
+		self._last_flush = time.monotonic()
+
+	@property
+	def db(self) -> DatabaseManager:
+		if self._db is None:
+			self._db = DatabaseManager()
+		return self._db
+
+	def get(self, source: str, code: str, fetch: Callable[[], Any]) -> Any:
+		"""
+		キャッシュから値を取得し、なければfetch()で取得して保存
+
+		Args:
+			source: POLICIESのキー（'earnings_date', 'stock_info', 'news'）
+			code: 銘柄コード
+			fetch: 値を取得する関数（引数なし）
+		"""
+		now = datetime.now(JST)
+		row = self.db.get_scrape_cache(source, code)
+
+		if row:
+			expires_at = datetime.fromisoformat(row['expires_at'])
+			value = json.loads(row['value'])
+			if now < expires_at:
+				self._count(source, 'hits')
+				return value
+			if now < expires_at + POLICIES[source][1] and not is_failure(value):
+				self._count(source, 'stale_hits')
+				self._revalidate(source, code, fetch)
+				return value
+
+		self._count(source, 'misses')
+		return self._fetch_and_save(source, code, fetch)
+
+	def _fetch_and_save(self, source: str, code: str, fetch: Callable[[], Any]) -> Any:
+		"""取得して有効期限付きで保存"""
+		value = fetch()
+		now = datetime.now(JST)
+		expires_at = now + NEGATIVE_TTL if is_failure(value) else POLICIES[source][0](now)
+		self.db.save_scrape_cache(
+			source,
+			code,
+			json.dumps(value, ensure_ascii=False),
+			now.isoformat(timespec='seconds'),
+			expires_at.isoformat(timespec='seconds')
+		)
+		return value
+
+	def _revalidate(self, source: str, code: str, fetch: Callable[[], Any]) -> None:
+		"""期限切れの値を裏で取り直す（同じキーの再取得は同時に1つだけ）"""
+		key = (source, code)
+		with self._lock:
+			if key in self._revalidating:
+				return
+			self._revalidating.add(key)
+
+		def run():
+			try:
+				value = fetch()
+				# 再取得に失敗した場合は古い値を残す
+				if not is_failure(value):
+					now = datetime.now(JST)
+					self.db.save_scrape_cache(
+						source,
+						code,
+						json.dumps(value, ensure_ascii=False),
+						now.isoformat(timespec='seconds'),
+						POLICIES[source][0](now).isoformat(timespec='seconds')
+					)
+			except Exception:
+				pass
+			finally:
+				with self._lock:
+					self._revalidating.discard(key)
+					self._threads.discard(threading.current_thread())
+
+		thread = threading.Thread(target=run, daemon=True)
+		with self._lock:
+			self._threads.add(thread)
+		thread.start()
+
+	def wait(self, timeout: float = REVALIDATE_EXIT_TIMEOUT) -> None:
+		"""
+		実行中の再取得の終了を最大timeout秒待つ
+		company.pyのような1回きりのプロセスでも、終了で再取得が打ち切られないようにする
+		"""
+		deadline = time.monotonic() + timeout
+		with self._lock:
+			threads = list(self._threads)
+		for thread in threads:
+			thread.join(max(0.0, deadline - time.monotonic()))
+
+	def close(self) -> None:
+		"""プロセス終了時の後始末（再取得を待ってからヒット・ミス回数を書き込む）"""
+		self.wait()
+		self.flush()
+
+	def _count(self, source: str, field: str) -> None:
+		"""
+		ヒット・ミス回数を記録
+		キャッシュヒットのたびにDBへ書き込まないよう、DBにはflush()でまとめて加算する
+		"""
+		with self._lock:
+			self.counts[(source, field)] += 1
+			self._pending_counts[(source, field)] += 1
+			due = time.monotonic() - self._last_flush >= STATS_FLUSH_INTERVAL
+		if due:
+			self.flush()
+
+	def flush(self) -> None:
+		"""記録済みのヒット・ミス回数をDBに書き込む（プロセス終了時にもclose()から呼ばれる）"""
+		with self._lock:
+			pending = dict(self._pending_counts)
+			self._pending_counts.clear()
+			self._last_flush = time.monotonic()
+		if not pending:
+			return
+		try:
+			self.db.add_scrape_cache_stats(pending)
+		except Exception:
+			pass
+
+	def stats(self) -> Dict[str, Dict[str, int]]:
+		"""取得元ごとの累計ヒット・ミス回数（DBに記録された値）"""
+		self.flush()
+		return self.db.get_scrape_cache_stats()
+
+# プロセス内で共有するキャッシュ
+scrape_cache = ScrapeCache()
+atexit.register(scrape_cache.close)
@@ -1,16 +1,21 @@
-import yfinance as yf
-import pandas as pd
-import pandas_ta as ta
+"""
+スイングトレード銘柄分析（cronで毎営業日実行、Individual.phpから --individual で呼ばれる）
+
+cronの休場日判定やPHPからの起動を速くするため、モジュールの先頭では標準ライブラリと
+営業日カレンダーだけを読み込む。pandas・yfinance・bs4・NumPyを使うモジュールは、使う関数の中で読み込む。
+"""
+from __future__ import annotations
 from datetime import date, datetime
 import os
 import traceback
 import sys
 import argparse
-from typing import Optional, List, Dict
-from bs4 import BeautifulSoup
-import urllib.request
-import urllib.error
-import holidays
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple
+from trading_calendar import tse_calendar
+from rate_limiter import kabutan_limiter
+
+if TYPE_CHECKING:
+	import pandas as pd
 
 def fetch_ranking_stocks() -> List[Dict[str, str]]:
 	"""
@@ -22,6 +27,10 @@ def fetch_ranking_stocks() -> List[Dict[str, str]]:
 		銘柄情報のリスト（コード、企業名を含む）
 	"""
 	try:
+		import urllib.request
+		import urllib.error
+		import kabutan
+
 		stocks = []
 		base_url = "https://kabutan.jp/warning/?mode=2_1"
 
@@ -39,60 +48,14 @@ def fetch_ranking_stocks() -> List[Dict[str, str]]:
 
 			try:
 				req = urllib.request.Request(url, headers=headers)
+				kabutan_limiter.wait()
 				with urllib.request.urlopen(req, timeout=10) as response:
 					html = response.read().decode('utf-8')
 
-				soup = BeautifulSoup(html, "html.parser")
-
-				# 全てのテーブルを探して、銘柄ランキングテーブルを特定
-				tables = soup.find_all('table')
-				ranking_tbody = None
-
-				for table in tables:
-					tbody = table.find('tbody')
-					if not tbody:
-						continue
-
-					rows = tbody.find_all('tr')
-					if not rows:
-						continue
-
-					# 最初の行に銘柄コードリンクがあるかチェック
-					first_row = rows[0]
-					code_link = first_row.find('a', href=lambda x: x and '/stock/?code=' in x)
-					if code_link:
-						ranking_tbody = tbody
-						break
-
-				if not ranking_tbody:
-					continue
-
-				rows = ranking_tbody.find_all('tr')
-
-				for row in rows:
-					try:
-						# 最初のtdから銘柄コードを取得
-						code_link = row.find('a', href=lambda x: x and '/stock/?code=' in x)
-						if not code_link:
-							continue
-
-						code = code_link.get_text(strip=True)
-
-						# 次のthから企業名を取得
-						name_th = row.find('th', scope='row')
-						if not name_th:
-							continue
-
-						name = name_th.get_text(strip=True)
-
-						# 重複チェック
-						if not any(s['code'] == code for s in stocks):
-							stocks.append({
-								'code': code,
-								'name': name
-							})
-					except (AttributeError, TypeError, IndexError):
-						continue
+				# 重複チェック（ページをまたいで同じ銘柄が出ることがある）
+				for stock in kabutan.parse_ranking(html):
+					if not any(s['code'] == stock['code'] for s in stocks):
+						stocks.append(stock)
 
 				# 30件に達したら終了
 				if len(stocks) >= 30:
@@ -110,11 +73,83 @@ def fetch_ranking_stocks() -> List[Dict[str, str]]:
 		print(f"ランキング取得エラー: {str(e)}")
 		return []
 
+def load_codes_file(path: str) -> List[Dict[str, str]]:
+	"""
+	銘柄コードの一覧ファイルを読み込む
+	1行に1銘柄（「コード」または「コード,企業名」）、#以降はコメント
+
+	Returns:
+		銘柄情報のリスト（fetch_ranking_stocksと同じ形式、企業名のない行はnameが空文字）
+	"""
+	stocks = []
+	seen = set()
+	with open(path, encoding='utf-8') as f:
+		for line in f:
+			line = line.split('#', 1)[0].strip()
+			if not line:
+				continue
+			code, _, name = line.partition(',')
+			code = code.strip()
+			# 重複チェック
+			if code not in seen:
+				seen.add(code)
+				stocks.append({'code': code, 'name': name.strip()})
+	return stocks
+
+# JPXの東証上場銘柄一覧（毎月更新、Excel形式）
+JPX_LISTING_URL = "https://www.jpx.co.jp/markets/statistics-equities/misc/tvdivq0000001vg2-att/data_j.xls"
+
+UNIVERSE_CHOICES = ['ranking', 'file', 'all']
+
+def fetch_listed_stocks() -> List[Dict[str, str]]:
+	"""
+	東証の全上場銘柄（プライム・スタンダード・グロースの内国株式）を取得
+	JPXの銘柄一覧（.xls、読み込みにxlrdが必要）が取れなければ企業マスタ（companiesテーブル）の銘柄を使う
+
+	Returns:
+		銘柄情報のリスト（fetch_ranking_stocksと同じ形式）
+	"""
+	try:
+		import pandas as pd
+		listing = pd.read_excel(JPX_LISTING_URL, dtype={'コード': str})
+		listing = listing[listing['市場・商品区分'].astype(str).str.contains('内国株式')]
+		stocks = [
+			{'code': str(code).strip(), 'name': str(name).strip()}
+			for code, name in zip(listing['コード'], listing['銘柄名'])
+		]
+		print(f"JPXの銘柄一覧から {len(stocks)} 件の銘柄を取得しました")
+		return stocks
+	except ImportError:
+		print("JPXの銘柄一覧の読み込みにはxlrdが必要です（pip install xlrd）")
+	except Exception as e:
+		print(f"JPXの銘柄一覧取得エラー: {str(e)}")
+
+	from db_manager import DatabaseManager
+	stocks = DatabaseManager().get_companies()
+	print(f"企業マスタから {len(stocks)} 件の銘柄を使用します")
+	return stocks
+
+def load_universe(universe: str, codes_file: Optional[str] = None) -> List[Dict[str, str]]:
+	"""
+	分析対象の銘柄一覧を取得
+
+	Args:
+		universe: 'ranking'（kabutan.jpの値上がり率ランキング）、'file'（codes_fileの銘柄）、'all'（東証の全上場銘柄）
+		codes_file: universe='file' のときに読む銘柄コード一覧ファイル
+	"""
+	if universe == 'all':
+		return fetch_listed_stocks()
+	if universe == 'file':
+		if not codes_file:
+			raise ValueError("--universe file には --codes-file の指定が必要です")
+		return load_codes_file(codes_file)
+	return fetch_ranking_stocks()
+
 def is_market_open_day(target_date: date = None) -> bool:
 	"""
 	日本の株式市場が開いている営業日かどうかを判定
 
-	土日、日本の祝日、年末年始を除外
+	土日、日本の祝日、年末年始を除外（trading_calendar.pyの営業日カレンダーを参照）
 
 	Args:
 		target_date: 判定対象の日付（デフォルトは今日）
@@ -124,137 +159,107 @@ def is_market_open_day(target_date: date = None) -> bool:
 	"""
 	if target_date is None:
 		target_date = date.today()
+	return tse_calendar.is_session(target_date)
+
+# 各検出ロジックが必要とする最大の取得期間（三位一体・ATRの120日）
+PRICE_PERIOD_DAYS = 120
+
+# 一括取得で漏れた銘柄を個別に再取得する上限（超えた場合は再取得しない）
+MAX_RETRY_MISSING = 50
+
+def fetch_price_data(ticker_code: str, days: int = PRICE_PERIOD_DAYS) -> Optional[pd.DataFrame]:
+	"""
+	ローカルの株価ストアから日足データを取得（不足分だけyfinanceから追記）
+	三位一体・バンドウォーク・エクスパンション・ATRの計算で同じDataFrameを共有する
+
+	Args:
+		ticker_code: 銘柄コード（例: '6920'）
+		days: 取得期間（デフォルトは全検出ロジックで最大の120日）
+
+	Returns:
+		日足のDataFrame、またはエラー時はNone
+	"""
+	try:
+		from price_store import PriceStore
+		return PriceStore().load_one(ticker_code, days)
+
+	except Exception as e:
+		print(f"Error fetching price data for {ticker_code}: {str(e)}")
+		return None
 
-	# 土日は休場
-	if target_date.weekday() >= 5:  # 5=土曜日, 6=日曜日
-		return False
+def fetch_price_data_batch(ticker_codes: List[str], days: int = PRICE_PERIOD_DAYS) -> Dict[str, pd.DataFrame]:
+	"""
+	複数銘柄の日足データをまとめて取得
+	ローカルの株価ストアにない直近分は、1回のリクエストでまとめてyfinanceから取得する
 
-	# 日本の祝日を判定（holidaysライブラリを使用）
-	jp_holidays = holidays.Japan()
-	if target_date in jp_holidays:
-		return False
+	Args:
+		ticker_codes: 銘柄コードのリスト（例: ['6920', '7203']）
+		days: 取得期間
 
-	# 年末年始の休場（12月31日〜1月3日）
-	if (target_date.month == 12 and target_date.day >= 31) or \
-	   (target_date.month == 1 and target_date.day <= 3):
-		return False
+	Returns:
+		銘柄コードをキーとした日足DataFrameの辞書（取得できなかった銘柄は含まない）
+	"""
+	try:
+		from price_store import PriceStore
+		return PriceStore().load(ticker_codes, days)
 
-	return True
+	except Exception as e:
+		print(f"一括取得エラー: {str(e)}")
+		return {}
 
-def analyze_swing_trinity(ticker_code: str) -> Optional[dict]:
+def analyze_swing_trinity(ticker_code: str, df: Optional[pd.DataFrame] = None) -> Optional[dict]:
 	"""
 	VWAP、RCI、ボリンジャーバンドを使用した三位一体モデルの分析
+	採点はバッチ分析と同じルール（indicator_engine.TRINITY_MODEL）を1銘柄に適用する
 
 	Args:
 		ticker_code: 銘柄コード（例: '6920'）
+		df: 取得済みの日足データ（省略時はyfinanceから取得）
 
 	Returns:
 		採点結果の辞書、またはエラー時はNone
 	"""
 	try:
-		# .Tを付加してyfinanceで取得
-		ticker = f"{ticker_code}.T"
-		df = yf.download(ticker, period="120d", progress=False, auto_adjust=True)
-
-		# DataFrameのインデックスをリセット
-		if isinstance(df.columns, pd.MultiIndex):
-			df.columns = df.columns.get_level_values(0)
-
-		# データ不足チェック
-		if len(df) < 50:
+		# 取得済みのデータがなければyfinanceから取得
+		if df is None:
+			df = fetch_price_data(ticker_code)
+		if df is None:
 			return None
 
-		# テクニカル指標の計算
-		df.ta.vwap(append=True)
-		# RCIの代わりにRSIを使用（pandas-taではRCIが利用できない場合がある）
-		df.ta.rsi(length=9, append=True)
-		df.ta.bbands(length=20, std=2, append=True)
-
-		# 最新データの取得
-		latest = df.iloc[-1]
-		prev_day = df.iloc[-2]
-		three_days_ago = df.iloc[-4]
-
-		score = 0
-
-		# VWAP (30点)
-		if latest['Close'] > latest['VWAP_D']:
-			score += 20
-		if latest['VWAP_D'] > three_days_ago['VWAP_D']:
-			score += 10
-
-		# RSI (40点) - RCIの代わりにRSIを使用
-		rsi_latest = latest['RSI_9']
-		rsi_prev = prev_day['RSI_9']
-
-		if rsi_latest > rsi_prev:
-			score += 20
-		if rsi_latest < 70:  # 売られすぎゾーン（RSIは30以下が売られすぎ）
-			score += 20
-		if rsi_latest > 70:  # 買われすぎゾーン
-			score -= 10
-
-		# ボリンジャーバンド (30点)
-		bb_middle = latest['BBM_20_2.0']
-		bb_width = latest['BBB_20_2.0']
-		bb_width_3d = three_days_ago['BBB_20_2.0']
-
-		if latest['Close'] > bb_middle:
-			score += 15
-		if bb_width > bb_width_3d:
-			score += 15
-
-		# スコアを0-100の範囲に制限
-		score = max(0, min(100, score))
-
-		# 期待値の計算
-		expected = calculate_expected_values(ticker_code)
-
-		return {
-			'code': ticker_code,
-			'price': round(latest['Close'], 2),
-			'score': int(score),
-			'RSI_9': round(rsi_latest, 2),
-			'VWAP': round(latest['VWAP_D'], 2),
-			'BB_Width': round(bb_width, 2),
-			'profit_target': expected['profit_target'] if expected else None,
-			'stop_loss': expected['stop_loss'] if expected else None
-		}
+		from indicator_engine import analyze_panel
+		return analyze_panel({ticker_code: df}, [ticker_code])[0][0]
 
 	except Exception as e:
 		print(f"Error analyzing {ticker_code}: {str(e)}")
 		return None
 
-def calculate_expected_values(ticker_code: str) -> Optional[dict]:
+def calculate_expected_values(ticker_code: str, df: Optional[pd.DataFrame] = None) -> Optional[dict]:
 	"""
 	ATR（14日間）を使用した5日後の期待値を計算
 
 	Args:
 		ticker_code: 銘柄コード（例: '6920'）
+		df: 取得済みの日足データ（省略時はyfinanceから取得）
 
 	Returns:
 		期待値の辞書、またはエラー時はNone
 	"""
 	try:
-		# .Tを付加してyfinanceで取得
-		ticker = f"{ticker_code}.T"
-		df = yf.download(ticker, period="120d", progress=False, auto_adjust=True)
-
-		# DataFrameのインデックスをリセット
-		if isinstance(df.columns, pd.MultiIndex):
-			df.columns = df.columns.get_level_values(0)
+		# 取得済みのデータがなければyfinanceから取得
+		if df is None:
+			df = fetch_price_data(ticker_code)
+		if df is None:
+			return None
 
 		# データ不足チェック
 		if len(df) < 50:
 			return None
 
 		# ATRの計算
-		df.ta.atr(length=14, append=True)
-
-		# 最新データの取得
-		latest = df.iloc[-1]
-		current_price = latest['Close']
-		atr_value = latest['ATRr_14']
+		from indicator_engine import PricePanel, compute_indicators
+		panel = PricePanel.from_frames({ticker_code: df})
+		atr_value = compute_indicators(panel)['ATRr_14'][0, -1]
+		current_price = panel.close[0, -1]
 
 		# 期待値の計算
 		profit_target = round(current_price + (atr_value * 2.0), 2)  # 利食い目標
@@ -272,140 +277,85 @@ def calculate_expected_values(ticker_code: str) -> Optional[dict]:
 		print(f"Error calculating expected values for {ticker_code}: {str(e)}")
 		return None
 
-def check_bandwalk(ticker_code: str) -> Optional[dict]:
+def check_bandwalk(ticker_code: str, df: Optional[pd.DataFrame] = None) -> Optional[dict]:
 	"""
 	ボリンジャーバンドのバンドウォーク検出
+	判定はバッチ分析と同じルール（indicator_engine.BANDWALK_MODEL）を1銘柄に適用する
 
 	Args:
 		ticker_code: 銘柄コード（例: '6920'）
+		df: 取得済みの日足データ（省略時はyfinanceから取得）
 
 	Returns:
 		判定結果の辞書、またはエラー時はNone
 	"""
 	try:
-		# .Tを付加してyfinanceで取得
-		ticker = f"{ticker_code}.T"
-		df = yf.download(ticker, period="60d", progress=False, auto_adjust=True)
-
-		# DataFrameのインデックスをリセット
-		if isinstance(df.columns, pd.MultiIndex):
-			df.columns = df.columns.get_level_values(0)
-
-		# データ不足チェック
-		if len(df) < 25:
+		# 取得済みのデータがなければyfinanceから取得
+		if df is None:
+			df = fetch_price_data(ticker_code)
+		if df is None:
 			return None
 
-		# ボリンジャーバンドの計算
-		df.ta.bbands(length=20, std=2, append=True)
-
-		# +1σラインの計算
-		df['BB_Plus1Sigma'] = df['BBM_20_2.0'] + ((df['BBU_20_2.0'] - df['BBL_20_2.0']) / 4)
-
-		# 最新データの取得
-		latest = df.iloc[-1]
-		prev_1 = df.iloc[-2]
-		prev_2 = df.iloc[-3]
-		prev_3 = df.iloc[-4]
-
-		# 条件A: 過去3日間連続で終値が+1σを上回っている
-		condition_a = (
-			latest['Close'] > latest['BB_Plus1Sigma'] and
-			prev_1['Close'] > prev_1['BB_Plus1Sigma'] and
-			prev_2['Close'] > prev_2['BB_Plus1Sigma']
-		)
-
-		# 条件B: バンド幅が拡大傾向
-		bb_width_3d = df.iloc[-4]['BBB_20_2.0']
-		condition_b = latest['BBB_20_2.0'] > bb_width_3d
-
-		# バンドウォーク判定
-		is_bandwalk = condition_a and condition_b
-
-		# 期待値の計算
-		expected = calculate_expected_values(ticker_code)
-
-		return {
-			'code': ticker_code,
-			'is_bandwalk': is_bandwalk,
-			'price': round(latest['Close'], 2),
-			'bb_width': round(latest['BBB_20_2.0'], 2),
-			'profit_target': expected['profit_target'] if expected else None,
-			'stop_loss': expected['stop_loss'] if expected else None
-		}
+		from indicator_engine import analyze_panel
+		return analyze_panel({ticker_code: df}, [ticker_code])[0][1]
 
 	except Exception as e:
 		print(f"Error checking bandwalk for {ticker_code}: {str(e)}")
 		return None
 
-def check_expansion(ticker_code: str) -> Optional[dict]:
+def check_expansion(ticker_code: str, df: Optional[pd.DataFrame] = None) -> Optional[dict]:
 	"""
 	ボリンジャーバンドのエクスパンション検出
 	バンド幅が急速に拡大している状態を検知
+	判定はバッチ分析と同じルール（indicator_engine.EXPANSION_MODEL）を1銘柄に適用する
 
 	Args:
 		ticker_code: 銘柄コード（例: '6920'）
+		df: 取得済みの日足データ（省略時はyfinanceから取得）
 
 	Returns:
 		判定結果の辞書、またはエラー時はNone
 	"""
 	try:
-		# .Tを付加してyfinanceで取得
-		ticker = f"{ticker_code}.T"
-		df = yf.download(ticker, period="60d", progress=False, auto_adjust=True)
+		# 取得済みのデータがなければyfinanceから取得
+		if df is None:
+			df = fetch_price_data(ticker_code)
+		if df is None:
+			return None
 
-		# DataFrameのインデックスをリセット
-		if isinstance(df.columns, pd.MultiIndex):
-			df.columns = df.columns.get_level_values(0)
+		from indicator_engine import analyze_panel
+		return analyze_panel({ticker_code: df}, [ticker_code])[0][2]
 
-		# データ不足チェック
-		if len(df) < 25:
-			return None
+	except Exception as e:
+		print(f"Error checking expansion for {ticker_code}: {str(e)}")
+		return None
 
-		# ボリンジャーバンドの計算
-		df.ta.bbands(length=20, std=2, append=True)
-
-		# 最新データの取得
-		latest = df.iloc[-1]
-		prev_1 = df.iloc[-2]
-		prev_2 = df.iloc[-3]
-		prev_3 = df.iloc[-4]
-		prev_4 = df.iloc[-5]
-
-		# バンド幅の取得
-		bb_width_latest = latest['BBB_20_2.0']
-		bb_width_1d = prev_1['BBB_20_2.0']
-		bb_width_2d = prev_2['BBB_20_2.0']
-		bb_width_3d = prev_3['BBB_20_2.0']
-		bb_width_4d = prev_4['BBB_20_2.0']
-
-		# エクスパンション判定
-		# 条件: バンド幅が過去4日間で継続的に拡大している
-		is_expanding = (
-			bb_width_latest > bb_width_1d and
-			bb_width_1d > bb_width_2d and
-			bb_width_2d > bb_width_3d and
-			bb_width_3d > bb_width_4d
-		)
-
-		# 拡大率の計算
-		expansion_rate = ((bb_width_latest - bb_width_4d) / bb_width_4d * 100) if bb_width_4d > 0 else 0
+def analyze_stock(ticker_code: str, df: Optional[pd.DataFrame] = None) -> Tuple[Optional[dict], Optional[dict], Optional[dict]]:
+	"""
+	1銘柄の三位一体・バンドウォーク・エクスパンションをまとめて分析
+	指標の計算（indicator_engine.analyze_panel）は1回だけ行い、3つの判定で共有する
+	バッチ分析では全銘柄をまとめて計算するindicator_engine.analyze_panelを使う
 
-		# 期待値の計算
-		expected = calculate_expected_values(ticker_code)
+	Args:
+		ticker_code: 銘柄コード（例: '6920'）
+		df: 取得済みの日足データ（省略時は取得）
 
-		return {
-			'code': ticker_code,
-			'is_expansion': is_expanding,
-			'price': round(latest['Close'], 2),
-			'bb_width': round(bb_width_latest, 2),
-			'expansion_rate': round(expansion_rate, 2),
-			'profit_target': expected['profit_target'] if expected else None,
-			'stop_loss': expected['stop_loss'] if expected else None
-		}
+	Returns:
+		(三位一体, バンドウォーク, エクスパンション) の結果のタプル（エラー時はそれぞれNone）
+	"""
+	try:
+		# 取得済みのデータがなければyfinanceから取得
+		if df is None:
+			df = fetch_price_data(ticker_code)
+		if df is None:
+			return None, None, None
+
+		from indicator_engine import analyze_panel
+		return analyze_panel({ticker_code: df}, [ticker_code])[0]
 
 	except Exception as e:
-		print(f"Error checking expansion for {ticker_code}: {str(e)}")
-		return None
+		print(f"Error analyzing {ticker_code}: {str(e)}")
+		return None, None, None
 
 def format_price(price: float) -> str:
 	"""
@@ -424,91 +374,98 @@ def format_percentage(current_price: float, target_price: float) -> str:
 
 
 
-def analyze_individual_stock(stock_code: str):
+def individual_report(stock_code: str) -> str:
 	"""
-	個別銘柄の分析を実行
+	個別銘柄の分析結果をテキストで作成（常駐サーバーからも呼ばれる）
 	"""
-	print(f"個別銘柄分析開始: {stock_code}")
-	print("-" * 50)
+	lines = []
+	lines.append(f"個別銘柄分析開始: {stock_code}")
+	lines.append("-" * 50)
 
 	# 企業名を取得（可能であれば）
 	company_name = get_company_name(stock_code)
 
+	# 株価データの取得と指標の計算は1回だけ行い、3つの分析で共有
+	df = fetch_price_data(stock_code)
+	trinity, bandwalk, expansion = analyze_stock(stock_code, df)
+
 	# 三位一体モデルの分析
-	trinity = analyze_swing_trinity(stock_code)
 	if trinity:
-		print(f"\n【三位一体モデル評価結果】")
-		print(f"銘柄コード: {stock_code}")
+		lines.append(f"\n【三位一体モデル評価結果】")
+		lines.append(f"銘柄コード: {stock_code}")
 		if company_name:
-			print(f"企業名: {company_name}")
-		print(f"現在価格: {format_price(trinity['price'])}")
-		print(f"スコア: {trinity['score']}点")
-		print(f"RSI_9: {trinity['RSI_9']}")
-		print(f"VWAP: {format_price(trinity['VWAP'])}")
-		print(f"BBバンド幅: {trinity['BB_Width']}")
+			lines.append(f"企業名: {company_name}")
+		lines.append(f"現在価格: {format_price(trinity['price'])}")
+		lines.append(f"スコア: {trinity['score']}点")
+		lines.append(f"RSI_9: {trinity['RSI_9']}")
+		lines.append(f"VWAP: {format_price(trinity['VWAP'])}")
+		lines.append(f"BBバンド幅: {trinity['BB_Width']}")
 		if trinity['profit_target']:
-			print(f"利食い目標: {format_percentage(trinity['price'], trinity['profit_target'])}")
+			lines.append(f"利食い目標: {format_percentage(trinity['price'], trinity['profit_target'])}")
 		if trinity['stop_loss']:
-			print(f"損切りライン: {format_percentage(trinity['price'], trinity['stop_loss'])}")
+			lines.append(f"損切りライン: {format_percentage(trinity['price'], trinity['stop_loss'])}")
 	else:
-		print("三位一体分析: データ取得に失敗しました")
+		lines.append("三位一体分析: データ取得に失敗しました")
 
 	# バンドウォーク検出
-	bandwalk = check_bandwalk(stock_code)
 	if bandwalk:
-		print(f"\n【バンドウォーク検出銘柄】")
-		print(f"銘柄コード: {stock_code}")
+		lines.append(f"\n【バンドウォーク検出銘柄】")
+		lines.append(f"銘柄コード: {stock_code}")
 		if company_name:
-			print(f"企業名: {company_name}")
-		print(f"現在価格: {format_price(bandwalk['price'])}")
+			lines.append(f"企業名: {company_name}")
+		lines.append(f"現在価格: {format_price(bandwalk['price'])}")
 		status = "⭕ 発生中" if bandwalk['is_bandwalk'] else "❌ なし"
-		print(f"バンドウォーク: {status}")
-		print(f"BBバンド幅: {bandwalk['bb_width']}")
+		lines.append(f"バンドウォーク: {status}")
+		lines.append(f"BBバンド幅: {bandwalk['bb_width']}")
 		if bandwalk['profit_target']:
-			print(f"利食い目標: {format_percentage(bandwalk['price'], bandwalk['profit_target'])}")
+			lines.append(f"利食い目標: {format_percentage(bandwalk['price'], bandwalk['profit_target'])}")
 		if bandwalk['stop_loss']:
-			print(f"損切りライン: {format_percentage(bandwalk['price'], bandwalk['stop_loss'])}")
+			lines.append(f"損切りライン: {format_percentage(bandwalk['price'], bandwalk['stop_loss'])}")
 	else:
-		print("バンドウォーク分析: データ取得に失敗しました")
+		lines.append("バンドウォーク分析: データ取得に失敗しました")
 
 	# エクスパンション検出
-	expansion = check_expansion(stock_code)
 	if expansion:
-		print(f"\n【エクスパンション検出銘柄】")
-		print(f"銘柄コード: {stock_code}")
+		lines.append(f"\n【エクスパンション検出銘柄】")
+		lines.append(f"銘柄コード: {stock_code}")
 		if company_name:
-			print(f"企業名: {company_name}")
-		print(f"現在価格: {format_price(expansion['price'])}")
+			lines.append(f"企業名: {company_name}")
+		lines.append(f"現在価格: {format_price(expansion['price'])}")
 		status = "⭕ 発生中" if expansion['is_expansion'] else "❌ なし"
-		print(f"エクスパンション: {status}")
-		print(f"BBバンド幅: {expansion['bb_width']}")
-		print(f"拡大率: {expansion['expansion_rate']}%")
+		lines.append(f"エクスパンション: {status}")
+		lines.append(f"BBバンド幅: {expansion['bb_width']}")
+		lines.append(f"拡大率: {expansion['expansion_rate']}%")
 		if expansion['profit_target']:
-			print(f"利食い目標: {format_percentage(expansion['price'], expansion['profit_target'])}")
+			lines.append(f"利食い目標: {format_percentage(expansion['price'], expansion['profit_target'])}")
 		if expansion['stop_loss']:
-			print(f"損切りライン: {format_percentage(expansion['price'], expansion['stop_loss'])}")
+			lines.append(f"損切りライン: {format_percentage(expansion['price'], expansion['stop_loss'])}")
 	else:
-		print("エクスパンション分析: データ取得に失敗しました")
+		lines.append("エクスパンション分析: データ取得に失敗しました")
+
+	return "\n".join(lines)
+
+def analyze_individual_stock(stock_code: str):
+	"""
+	個別銘柄の分析を実行
+	常駐サーバーが起動していれば、その結果キャッシュから受け取る（重いモジュールを読み込まずに済む）
+	"""
+	from analysis_client import request_server
+
+	result = request_server('individual', stock_code)
+	if result is not None and 'text' in result:
+		print(result['text'])
+		return
+	print(individual_report(stock_code))
 
 def get_company_name(stock_code: str) -> str:
 	"""
 	銘柄コードから企業名を取得（簡易版）
+	kabutan.jpの銘柄ページはcompany.pyの信用倍率と共通のキャッシュ済みレコードから読む
 	"""
+	import kabutan
 	try:
-		# kabutan.jpから企業名を取得
-		url = f"https://kabutan.jp/stock/?code={stock_code}"
-		headers = {
-			'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-		}
-		req = urllib.request.Request(url, headers=headers)
-		with urllib.request.urlopen(req, timeout=10) as response:
-			html = response.read().decode('utf-8')
-
-		soup = BeautifulSoup(html, "html.parser")
-		# 企業名を取得
-		company_name_element = soup.find('span', class_='company_name')
-		if company_name_element:
-			return company_name_element.get_text(strip=True)
+		info = kabutan.get_stock_info(stock_code)
+		return info.name if info else ""
 	except Exception:
 		pass
 	return ""
@@ -518,7 +475,16 @@ def main():
 	# 引数の解析
 	parser = argparse.ArgumentParser(description='スイングトレード銘柄分析')
 	parser.add_argument('--individual', type=str, help='個別銘柄分析（銘柄コードを指定）')
+	parser.add_argument('--workers', type=int, default=1, help='株価の個別再取得の並列数（1なら逐次処理）')
+	parser.add_argument('--universe', choices=UNIVERSE_CHOICES, default=None,
+	                    help='分析対象（ranking: 値上がり率ランキング、file: --codes-fileの銘柄、all: 東証の全上場銘柄）')
+	parser.add_argument('--codes-file', type=str, help='銘柄コード一覧ファイル（1行1銘柄、「コード」または「コード,企業名」）')
+	parser.add_argument('--recompute-indicators', action='store_true',
+	                    help='保存済みの指標の途中経過を使わず、全銘柄の指標を日足から計算し直す')
 	args = parser.parse_args()
+	workers = max(1, args.workers)
+	# --codes-fileだけ指定された場合はファイルの銘柄を対象にする
+	universe = args.universe or ('file' if args.codes_file else 'ranking')
 
 	# 個別分析モード
 	if args.individual:
@@ -527,8 +493,6 @@ def main():
 
 	# 通常のバッチ分析モード
 	try:
-		from db_manager import DatabaseManager
-
 		today = date.today()
 		print(f"分析開始: {today}")
 		print("-" * 50)
@@ -538,15 +502,37 @@ def main():
 			print(f"本日 {today} は株式市場の休場日です。分析をスキップします。")
 			return
 
-		# Y!ファイナンスのランキングから銘柄を取得
-		print("kabutan.jpのランキングを取得中...")
-		stocks = fetch_ranking_stocks()
+		# 休場日でなければ分析に使うモジュールを読み込む
+		import pandas as pd
+		from concurrent.futures import ThreadPoolExecutor
+		from db_manager import DatabaseManager
+		from indicator_state import IndicatorStateStore
+
+		# 分析対象の銘柄を取得（デフォルトはkabutan.jpのランキング）
+		if universe == 'ranking':
+			print("kabutan.jpのランキングを取得中...")
+		stocks = load_universe(universe, args.codes_file)
 
 		if not stocks:
 			print("エラー: 銘柄情報を取得できませんでした")
 			return
 
 		print(f"対象銘柄数: {len(stocks)}")
+
+		# 全銘柄の株価データをまとめて取得（ローカルの日足に不足分だけ追記）
+		codes = [stock['code'] for stock in stocks]
+		price_data = fetch_price_data_batch(codes)
+
+		# 一括取得で漏れた銘柄は個別に再取得（レート制限付きでスレッド並列）
+		# 全銘柄スキャンでは上場廃止などで大量に漏れることがあるため、少数のときだけ再取得する
+		missing = [code for code in codes if code not in price_data]
+		if missing and len(missing) <= MAX_RETRY_MISSING:
+			with ThreadPoolExecutor(max_workers=workers) as executor:
+				for code, df in zip(missing, executor.map(fetch_price_data, missing)):
+					if df is not None:
+						price_data[code] = df
+
+		print(f"株価データ取得: {len(price_data)}/{len(stocks)} 銘柄")
 		print("-" * 50)
 
 		# データベース初期化
@@ -557,38 +543,42 @@ def main():
 		bandwalk_results = []
 		expansion_results = []
 
-		# 各銘柄を分析
-		for stock in stocks:
+		# 指標は前回の途中経過に当日の日足を畳み込んで更新し、判定は全銘柄まとめて行う（結果は入力順）
+		analyses = IndicatorStateStore(db).analyze(price_data, codes, full=args.recompute_indicators)
+
+		# 各銘柄の結果を集計
+		for stock, (trinity, bandwalk, expansion) in zip(stocks, analyses):
 			code = stock['code']
-			company_name = stock['name']
+			company_name = stock['name'] or code
 			print(f"分析中: {code} ({company_name})")
 
-			# 企業情報をDB保存
-			db.upsert_company(code, company_name)
-
 			# 三位一体モデルの分析
-			trinity = analyze_swing_trinity(code)
 			if trinity:
 				trinity['company_name'] = company_name
 				trinity_results.append(trinity)
-				# DB保存
-				db.save_analysis_result(analysis_date, trinity)
 
 			# バンドウォーク検出
-			bandwalk = check_bandwalk(code)
 			if bandwalk:
 				bandwalk['company_name'] = company_name
 				bandwalk_results.append(bandwalk)
-				# DB保存
-				db.save_bandwalk_result(analysis_date, bandwalk)
 
 			# エクスパンション検出
-			expansion = check_expansion(code)
 			if expansion:
 				expansion['company_name'] = company_name
 				expansion_results.append(expansion)
-				# DB保存
-				db.save_expansion_result(analysis_date, expansion)
+
+		# 企業情報と当日の分析結果を1トランザクションでまとめてDB保存
+		with db.session():
+			# 企業名のない銘柄（コードだけの一覧ファイル）は企業マスタの名前を上書きしない
+			# （日別レポートは企業マスタの名前で作られ、過去分は作り直さないため）
+			db.upsert_companies_many([(stock['code'], stock['name']) for stock in stocks if stock['name']])
+			db.save_analysis_results_many(analysis_date, trinity_results)
+			db.save_bandwalk_results_many(analysis_date, bandwalk_results)
+			db.save_expansion_results_many(analysis_date, expansion_results)
+			# report.php用の日別レポート（当日分は再実行に合わせて作り直し、過去分は未作成の日だけ作る）
+			db.save_daily_report(analysis_date, replace=True)
+			for past_date in db.get_unreported_dates():
+				db.save_daily_report(past_date)
 
 		print("-" * 50)
 
@@ -599,7 +589,7 @@ def main():
 
 		# 三位一体モデルをスコアの降順でソート
 		if len(trinity_df) > 0:
-			trinity_df = trinity_df.sort_values('score', ascending=False).reset_index(drop=True)
+			trinity_df = trinity_df.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
 			print("\n【三位一体モデル評価結果】")
 			print(trinity_df[['company_name', 'code', 'price', 'score', 'RSI_9', 'VWAP', 'BB_Width']])
 
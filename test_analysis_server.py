@@ -0,0 +1,53 @@
+"""
+analysis_server.py の結果キャッシュのテスト（件数の上限と有効期限）
+
+実行方法:
+	python3 -m pytest test_analysis_server.py -q
+"""
+import pytest
+import analysis_server
+from analysis_server import ResultCache
+
+@pytest.fixture
+def clock(monkeypatch):
+	"""time.monotonicを進められる時計に差し替える"""
+	now = [1000.0]
+	monkeypatch.setattr(analysis_server.time, 'monotonic', lambda: now[0])
+	return now
+
+def test_evicts_least_recently_used(clock):
+	cache = ResultCache(ttl=60, max_size=2)
+	cache.set(('company', '1001'), {'n': 1})
+	cache.set(('company', '1002'), {'n': 2})
+	# 1001を使うと、次に追加したときは1002が捨てられる
+	assert cache.get(('company', '1001')) == {'n': 1}
+	cache.set(('company', '1003'), {'n': 3})
+	assert len(cache) == 2
+	assert cache.get(('company', '1002')) is None
+	assert cache.get(('company', '1001')) == {'n': 1}
+	assert cache.get(('company', '1003')) == {'n': 3}
+
+def test_expired_entries_are_dropped(clock):
+	cache = ResultCache(ttl=60, max_size=10)
+	cache.set(('company', '1001'), {'n': 1})
+	cache.set(('individual', '1001'), {'n': 2})
+	clock[0] += 30
+	cache.set(('company', '1002'), {'n': 3})
+	clock[0] += 30
+	# 期限切れの2件は追加時に捨てられ、期限内の1件だけ残る
+	cache.set(('company', '1003'), {'n': 4})
+	assert len(cache) == 2
+	assert cache.get(('company', '1001')) is None
+	assert cache.get(('company', '1002')) == {'n': 3}
+	clock[0] += 60
+	assert cache.get(('company', '1002')) is None
+	assert len(cache) == 1
+
+def test_overwrite_refreshes_entry(clock):
+	cache = ResultCache(ttl=60, max_size=2)
+	cache.set(('company', '1001'), {'n': 1})
+	cache.set(('company', '1002'), {'n': 2})
+	cache.set(('company', '1001'), {'n': 10})
+	cache.set(('company', '1003'), {'n': 3})
+	assert cache.get(('company', '1001')) == {'n': 10}
+	assert cache.get(('company', '1002')) is None
@@ -0,0 +1,39 @@
+"""
+company.py のベータ値のテスト（calc_beta_many と 1銘柄ずつの calc_beta の一致）
+
+実行方法:
+	python3 -m pytest test_beta.py -q
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from company import calc_beta, calc_beta_many
+
+def make_closes(seed: int = 0):
+	"""指数の終値と、欠損日のある銘柄を含む日付×銘柄の終値"""
+	rng = np.random.default_rng(seed)
+	dates = pd.bdate_range('2026-01-05', periods=60)
+	index_close = pd.Series(30000 * np.exp(np.cumsum(rng.normal(0, 0.01, 60))), index=dates)
+	closes = pd.DataFrame({
+		f"{1000 + i}": 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, 60) + 0.8 * np.log(index_close).diff().fillna(0)))
+		for i in range(6)
+	}, index=dates)
+	closes.iloc[[10, 30, 31], 1] = np.nan        # 途中の欠損
+	closes.iloc[:20, 2] = np.nan                 # 上場が遅い銘柄
+	closes.iloc[:52, 3] = np.nan                 # データ不足（リターン10本未満）
+	closes = closes.drop(dates[5])               # 全銘柄が欠けた日（指数だけ取引）
+	return closes, index_close
+
+def test_calc_beta_many_matches_calc_beta():
+	closes, index_close = make_closes()
+	index_returns = index_close.pct_change().dropna()
+	batch = calc_beta_many(closes, index_returns)
+
+	for code in closes.columns:
+		single = calc_beta(closes[code].dropna(), index_returns=index_returns)
+		if single is None:
+			assert np.isnan(batch[code]), code
+		else:
+			assert batch[code] == pytest.approx(single, rel=1e-12), code
+	assert np.isnan(batch['1003'])
+	assert batch.notna().sum() == 5
@@ -0,0 +1,45 @@
+"""
+company.py のCCIのテスト（calc_cci と従来の rolling().apply による計算の一致）
+
+実行方法:
+	python3 -m pytest test_cci.py -q
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from company import calc_cci, calc_cci_score
+
+def make_bars(n: int, seed: int) -> pd.DataFrame:
+	rng = np.random.default_rng(seed)
+	close = 1000 + np.cumsum(rng.normal(0, 10, n))
+	return pd.DataFrame({
+		'Open': close + rng.normal(0, 3, n),
+		'High': close + rng.random(n) * 15,
+		'Low': close - rng.random(n) * 15,
+		'Close': close,
+		'Volume': rng.integers(1, 10, n) * 1000.0
+	}, index=pd.bdate_range('2026-01-05', periods=n))
+
+def procedural_cci(df: pd.DataFrame, length: int = 14) -> np.ndarray:
+	"""従来のcalc_cci_scoreの計算（rolling().apply(lambda) の移動平均偏差）"""
+	tp = (df['High'] + df['Low'] + df['Close']) / 3
+	sma = tp.rolling(window=length).mean()
+	mean_deviation = tp.rolling(window=length).apply(lambda x: np.mean(np.abs(x - x.mean())))
+	return ((tp - sma) / (0.015 * mean_deviation)).to_numpy()
+
+@pytest.mark.parametrize('n, seed', [(60, 1), (14, 2), (10, 3)])
+def test_calc_cci_matches_rolling_apply(n, seed):
+	df = make_bars(n, seed)
+	np.testing.assert_allclose(calc_cci(df['High'], df['Low'], df['Close']), procedural_cci(df), rtol=1e-9, equal_nan=True)
+
+def test_calc_cci_rows_match_single_series():
+	frames = [make_bars(60, seed) for seed in range(4)]
+	high, low, close = (np.array([df[column] for df in frames]) for column in ('High', 'Low', 'Close'))
+	cci = calc_cci(high, low, close)
+	for i, df in enumerate(frames):
+		np.testing.assert_array_equal(cci[i], calc_cci(df['High'], df['Low'], df['Close']))
+
+def test_calc_cci_score_uses_calc_cci():
+	df = make_bars(60, 5)
+	result = calc_cci_score(df, '9999')
+	assert result['cci_value'] == pytest.approx(procedural_cci(df)[-1], rel=1e-9)
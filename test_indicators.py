@@ -0,0 +1,177 @@
+"""
+indicators.py のテスト
+
+indicators_reference.npz は自前の参照値で、pandas_taの出力ではない。
+pandas_taの rsi / bbands / vwap / atr の定義をpandasの ewm / rolling で書いた reference_outputs() の出力を保存したもので、
+NumPyのカーネルが別の実装と同じ値を返し続けることを確認する（回帰テスト）。
+pandas_taとの一致は、pandas_taがインストールされている環境でだけ test_pandas_ta で確認される。
+
+実行方法:
+	python3 -m pytest test_indicators.py -q
+
+参照値の作り直し:
+	python3 test_indicators.py
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import rsi, bbands, vwap, atr, rma
+
+def make_bars(n: int, seed: int, flat: bool = False) -> pd.DataFrame:
+	"""ランダムな日足（flat=Trueなら高値=安値の日を含む）"""
+	rng = np.random.default_rng(seed)
+	close = 1000 + np.cumsum(rng.normal(0, 10, n))
+	high = close + rng.random(n) * 15
+	low = close - rng.random(n) * 15
+	if flat:
+		high[n // 2] = low[n // 2] = close[n // 2]
+	volume = rng.integers(0, 5, n) * 1000.0
+	return pd.DataFrame(
+		{'Open': close, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+		index=pd.bdate_range('2025-01-06', periods=n)
+	)
+
+def columns(df: pd.DataFrame):
+	return [df[c].to_numpy(dtype=float) for c in ('High', 'Low', 'Close', 'Volume')]
+
+CASES = [(120, 1, False), (90, 2, True), (30, 3, False), (10, 4, False)]
+
+# reference_outputs() の出力（python3 test_indicators.py で作り直す）
+REFERENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indicators_reference.npz')
+
+# 参照値の出どころ（npzのsourceに保存）
+REFERENCE_SOURCE = 'reference_outputs() in test_indicators.py (pandas ewm/rolling), not pandas_ta output'
+
+INDICATOR_COLUMNS = ['VWAP_D', 'RSI_9', 'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'ATRr_14']
+
+def case_key(n: int, seed: int, flat: bool) -> str:
+	return f"{n}_{seed}_{int(flat)}"
+
+def pandas_ta_outputs(df: pd.DataFrame) -> dict:
+	"""pandas_taで指標を計算（データ不足で追加されない列はNaN）"""
+	expected = df.copy()
+	expected.ta.vwap(append=True)
+	expected.ta.rsi(length=9, append=True)
+	expected.ta.bbands(length=20, std=2, append=True)
+	expected.ta.atr(length=14, append=True)
+	return {
+		column: expected[column].to_numpy(dtype=float) if column in expected.columns else np.full(len(df), np.nan)
+		for column in INDICATOR_COLUMNS
+	}
+
+def reference_outputs(df: pd.DataFrame) -> dict:
+	"""
+	pandas_taの定義をpandasで書いた参照実装（NumPyのカーネルとは別の計算方法）
+	rma = ewm(alpha=1/n, min_periods=n)、標準偏差はddof=0、ATRは高値=安値の日があれば値幅に微小値を加え、最初の日足はNaN
+	"""
+	high, low, close, volume = df['High'], df['Low'], df['Close'], df['Volume']
+
+	def rma(values: pd.Series, length: int) -> pd.Series:
+		return values.ewm(alpha=1 / length, min_periods=length).mean()
+
+	# 日足では1日1本のため、日次アンカーの累積は1本分だけになる
+	typical_price = (high + low + close) / 3
+	day = df.index.to_period('D')
+	vwap_d = (typical_price * volume).groupby(day).cumsum() / volume.groupby(day).cumsum()
+
+	diff = close.diff()
+	positive_avg = rma(diff.clip(lower=0), 9)
+	negative_avg = rma(diff.clip(upper=0), 9)
+	rsi_9 = 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+	mid = close.rolling(20, min_periods=20).mean()
+	deviations = 2.0 * close.rolling(20, min_periods=20).std(ddof=0)
+	lower, upper = mid - deviations, mid + deviations
+
+	high_low = high - low
+	if (high_low == 0).any():
+		high_low = high_low + sys.float_info.epsilon
+	prev_close = close.shift(1)
+	true_range = pd.concat([high_low, high - prev_close, prev_close - low], axis=1).abs().max(axis=1)
+	true_range.iloc[:1] = np.nan
+
+	outputs = {
+		'VWAP_D': vwap_d, 'RSI_9': rsi_9,
+		'BBL_20_2.0': lower, 'BBM_20_2.0': mid, 'BBU_20_2.0': upper, 'BBB_20_2.0': 100 * (upper - lower) / mid,
+		'ATRr_14': rma(true_range, 14)
+	}
+	return {column: values.to_numpy(dtype=float) for column, values in outputs.items()}
+
+def kernel_outputs(df: pd.DataFrame) -> dict:
+	"""indicators.pyで同じ指標を計算"""
+	high, low, close, volume = columns(df)
+	bands = bbands(close, 20, 2.0)
+	return {
+		'VWAP_D': vwap(high, low, close, volume),
+		'RSI_9': rsi(close, 9),
+		'BBL_20_2.0': bands['lower'],
+		'BBM_20_2.0': bands['mid'],
+		'BBU_20_2.0': bands['upper'],
+		'BBB_20_2.0': bands['bandwidth'],
+		'ATRr_14': atr(high, low, close, 14)
+	}
+
+def check_outputs(actual: dict, expected: dict) -> None:
+	for column in INDICATOR_COLUMNS:
+		np.testing.assert_allclose(actual[column], expected[column], rtol=1e-9, equal_nan=True, err_msg=column)
+
+@pytest.mark.parametrize('n, seed, flat', CASES)
+def test_reference_fixture(n, seed, flat):
+	reference = np.load(REFERENCE_PATH)
+	assert str(reference['source']) == REFERENCE_SOURCE
+	key = case_key(n, seed, flat)
+	df = make_bars(n, seed, flat)
+	# 入力も参照値と同じであること（乱数生成の違いで別のデータを比べないように）
+	np.testing.assert_array_equal(np.array(columns(df)), reference[f"{key}/input"])
+	check_outputs(kernel_outputs(df), {column: reference[f"{key}/{column}"] for column in INDICATOR_COLUMNS})
+
+@pytest.mark.parametrize('n, seed, flat', CASES)
+def test_reference_implementation(n, seed, flat):
+	df = make_bars(n, seed, flat)
+	check_outputs(kernel_outputs(df), reference_outputs(df))
+
+@pytest.mark.parametrize('n, seed, flat', CASES)
+def test_pandas_ta(n, seed, flat):
+	# インストールされていれば、その場で計算したpandas_taの出力とも突き合わせる
+	pytest.importorskip('pandas_ta')
+	df = make_bars(n, seed, flat)
+	check_outputs(kernel_outputs(df), pandas_ta_outputs(df))
+
+def test_rma_matches_pandas_ewm():
+	values = make_bars(60, 5)['Close'].diff()
+	expected = values.ewm(alpha=1 / 14, min_periods=14).mean()
+	np.testing.assert_allclose(rma(values.to_numpy(), 14), expected.to_numpy(), rtol=1e-12, equal_nan=True)
+
+def test_panel_rows_match_single_series():
+	# 右揃えで先頭をNaNで埋めた2次元配列の各行は、1銘柄ずつ計算した値と一致する
+	frames = [make_bars(n, seed, flat) for n, seed, flat in CASES]
+	width = max(len(df) for df in frames)
+	panel = np.full((len(frames), 4, width), np.nan)
+	for i, df in enumerate(frames):
+		panel[i, :, width - len(df):] = np.array(columns(df))
+	high, low, close, volume = (panel[:, k] for k in range(4))
+
+	for i, df in enumerate(frames):
+		h, l, c, v = columns(df)
+		row = slice(width - len(df), None)
+		np.testing.assert_array_equal(atr(high, low, close, 14)[i, row], atr(h, l, c, 14))
+		np.testing.assert_array_equal(rsi(close, 9)[i, row], rsi(c, 9))
+		np.testing.assert_array_equal(bbands(close)['bandwidth'][i, row], bbands(c)['bandwidth'])
+		np.testing.assert_array_equal(vwap(high, low, close, volume)[i, row], vwap(h, l, c, v))
+
+def write_reference() -> None:
+	"""reference_outputs() の出力をindicators_reference.npzに保存"""
+	arrays = {'source': np.array(REFERENCE_SOURCE)}
+	for n, seed, flat in CASES:
+		key = case_key(n, seed, flat)
+		df = make_bars(n, seed, flat)
+		arrays[f"{key}/input"] = np.array(columns(df))
+		for column, values in reference_outputs(df).items():
+			arrays[f"{key}/{column}"] = values
+	np.savez_compressed(REFERENCE_PATH, **arrays)
+	print(f"{REFERENCE_PATH} を作成しました")
+
+if __name__ == '__main__':
+	write_reference()
@@ -0,0 +1,38 @@
+"""
+intraday_archive.py のテスト（一時ディレクトリに書き込み、ネットワークには接続しない）
+
+実行方法:
+	python3 -m pytest test_intraday_archive.py -q
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+from intraday_archive import IntradayArchive
+
+SESSION = date(2026, 10, 16)
+
+def make_bars(periods: int = 20) -> pd.DataFrame:
+	"""SESSIONの前場の5分足（15:25の足はない）"""
+	index = pd.date_range('2026-10-16 09:00', periods=periods, freq='5min', tz='Asia/Tokyo')
+	values = np.arange(periods, dtype=float) + 100
+	return pd.DataFrame({column: values for column in ('Open', 'High', 'Low', 'Close', 'Volume')}, index=index)
+
+def test_empty_fetch_does_not_mark_session(tmp_path):
+	archive = IntradayArchive(str(tmp_path))
+	assert archive.append('1000', pd.DataFrame(), fetched_through=SESSION) == 0
+	assert not archive.has_session('1000', SESSION)
+	assert archive.fetched_through('1000') is None
+
+def test_fetch_without_closing_bar_marks_session(tmp_path):
+	# 売買のない時間帯の足がなくても、保存できた取得は取得済みとして記録する
+	archive = IntradayArchive(str(tmp_path))
+	assert archive.append('1000', make_bars(), fetched_through=SESSION) == 20
+	assert archive.has_session('1000', SESSION)
+	assert not archive.has_session('1000', date(2026, 10, 19))
+
+def test_append_without_mark_requires_closing_bar(tmp_path):
+	archive = IntradayArchive(str(tmp_path))
+	archive.append('1000', make_bars())
+	assert not archive.has_session('1000', SESSION)
+	archive.append('1000', make_bars(78))
+	assert archive.has_session('1000', SESSION)
@@ -0,0 +1,45 @@
+"""
+kabutan.py のページ解析のテスト（ネットワークには接続しない）
+
+実行方法:
+	python3 -m pytest test_kabutan.py -q
+"""
+import pytest
+import kabutan
+
+def stock_page(credit_cell: str) -> str:
+	"""stockinfo_i3テーブルの信用倍率欄だけを持つ銘柄ページ"""
+	return f'''
+		<html><body>
+		<span class="company_name">テスト株式会社</span>
+		<div id="stockinfo_i3"><table>
+			<thead><tr><th>売残</th><th>買残</th><th>信用倍率</th></tr></thead>
+			<tbody><tr><td>1,000</td><td>12,300</td><td>{credit_cell}</td></tr></tbody>
+		</table></div>
+		</body></html>
+	'''
+
+@pytest.mark.parametrize('cell, expected', [
+	('12.3倍', 12.3),
+	('12.3倍（前週11.0倍）', 12.3),
+	('1,234.5倍', 1234.5),
+	('－倍', None),
+])
+def test_parse_credit_ratio(cell, expected):
+	assert kabutan.parse_credit_ratio(stock_page(cell)) == expected
+
+def test_parse_credit_ratio_th_fallback():
+	html = '<table><tr><th>信用倍率</th><td>3.5倍（前週4.0倍）</td></tr></table>'
+	assert kabutan.parse_credit_ratio(html) == 3.5
+
+def test_parse_stock_page():
+	info = kabutan.parse_stock_page(stock_page('12.3倍（前週11.0倍）'), '9999')
+	assert info.name == 'テスト株式会社'
+	assert info.credit_ratio == 12.3
+
+def test_fetch_stock_info_returns_none_on_parse_error(monkeypatch):
+	def broken_parse(html, code=''):
+		raise ValueError('broken page')
+	monkeypatch.setattr(kabutan, 'fetch_html', lambda url, session=None, timeout=10: stock_page('12.3倍'))
+	monkeypatch.setattr(kabutan, 'parse_stock_page', broken_parse)
+	assert kabutan.fetch_stock_info('9999') is None
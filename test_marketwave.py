@@ -0,0 +1,124 @@
+"""
+marketwave.py のうねり指数のテスト（配列での計算と、日ごとにgroupbyで走査していた従来の計算の一致）
+
+実行方法:
+	python3 -m pytest test_marketwave.py -q
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from marketwave import MarketWaveAnalyzer
+
+def groupby_uneri(data: pd.DataFrame) -> list:
+	"""従来のuneri()の日ごとの集計（groupbyで1日ずつ、5分足をilocで走査）"""
+	daily_results = []
+	for date, day_data in data.groupby('date'):
+		if len(day_data) < 10:
+			continue
+
+		start_price = day_data.iloc[0]['Open']
+		cross_count = 0
+		current_direction = None
+		max_up_percent = 0
+		max_down_percent = 0
+		threshold = 0.3
+
+		for i in range(1, len(day_data)):
+			current_price = day_data.iloc[i]['Close']
+			with np.errstate(divide='ignore', invalid='ignore'):
+				price_diff_percent = ((current_price - start_price) / start_price) * 100
+
+			if abs(price_diff_percent) < threshold:
+				continue
+
+			if price_diff_percent > max_up_percent:
+				max_up_percent = price_diff_percent
+			if price_diff_percent < max_down_percent:
+				max_down_percent = price_diff_percent
+
+			if price_diff_percent > 0:
+				new_direction = 1
+			elif price_diff_percent < 0:
+				new_direction = -1
+			else:
+				new_direction = current_direction
+
+			if current_direction is not None and new_direction != current_direction:
+				cross_count += 1
+
+			current_direction = new_direction
+
+		daily_results.append({
+			'date': str(date),
+			'cross_count': cross_count,
+			'max_up_percent': round(max_up_percent, 2),
+			'max_down_percent': round(max_down_percent, 2)
+		})
+	return daily_results
+
+def make_day(day: str, bars: int, rng: np.random.Generator) -> pd.DataFrame:
+	"""9:00からのbars本の5分足（始値の周りを上下する終値）"""
+	index = pd.date_range(f"{day} 09:00", periods=bars, freq='5min', tz='Asia/Tokyo')
+	close = 1000 * (1 + np.cumsum(rng.normal(0, 0.004, bars)))
+	return pd.DataFrame({'Open': np.r_[1000.0, close[:-1]], 'Close': close}, index=index)
+
+def make_data(seed: int, shuffle: bool) -> pd.DataFrame:
+	rng = np.random.default_rng(seed)
+	frames = [
+		make_day('2026-10-01', 66, rng),
+		make_day('2026-10-02', 9, rng),       # 10本未満（集計しない）
+		make_day('2026-10-05', 10, rng),      # ちょうど10本
+		make_day('2026-10-06', 66, rng),      # 途中の始値・終値が欠損
+		make_day('2026-10-07', 66, rng),      # 最初の足の始値が欠損
+		make_day('2026-10-08', 66, rng),      # 最初の足の始値が0
+		make_day('2026-10-09', 66, rng),      # 値動きが閾値未満
+		make_day('2026-10-13', 1, rng)        # 1本だけ
+	]
+	frames[3].iloc[[5, 6, 20], frames[3].columns.get_loc('Close')] = np.nan
+	frames[3].iloc[[3, 30], frames[3].columns.get_loc('Open')] = np.nan
+	frames[4].iloc[0, frames[4].columns.get_loc('Open')] = np.nan
+	frames[5].iloc[0, frames[5].columns.get_loc('Open')] = 0.0
+	frames[5].iloc[[10, 11], frames[5].columns.get_loc('Close')] = 0.0
+	frames[6]['Close'] = 1000 + rng.normal(0, 0.5, 66)
+	frames[6].iloc[0, frames[6].columns.get_loc('Open')] = 1000.0
+
+	data = pd.concat(frames)
+	if shuffle:
+		# 日付をまたいで順番が入れ替わった足（日内の順序も元の並びのまま扱われる）
+		data = data.iloc[rng.permutation(len(data))]
+	data['date'] = data.index.date
+	return data
+
+def analyzer_for(data: pd.DataFrame) -> MarketWaveAnalyzer:
+	"""データ取得をせずにMarketWaveAnalyzerを作る"""
+	analyzer = MarketWaveAnalyzer.__new__(MarketWaveAnalyzer)
+	analyzer.ticker = '9999'
+	analyzer.data = data
+	return analyzer
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_uneri_matches_groupby(seed, shuffle):
+	data = make_data(seed, shuffle)
+	result = analyzer_for(data).uneri()
+	expected = groupby_uneri(data)
+	assert result['daily_results'] == expected
+	assert [r['date'] for r in expected] == [
+		'2026-10-01', '2026-10-05', '2026-10-06', '2026-10-07', '2026-10-08', '2026-10-09'
+	]
+	assert result['total_days_analyzed'] == len(expected)
+
+def test_uneri_edge_days():
+	results = {r['date']: r for r in analyzer_for(make_data(0, False)).uneri()['daily_results']}
+	# 始値が欠損した日は変動率を計算できないため0
+	assert results['2026-10-07'] == {'date': '2026-10-07', 'cross_count': 0, 'max_up_percent': 0, 'max_down_percent': 0}
+	# 始値が0の日は正の終値がすべて+inf、終値0の足は除外
+	assert results['2026-10-08']['max_up_percent'] == np.inf
+	assert results['2026-10-08']['cross_count'] == 0
+	# 閾値未満の変動だけの日は往復なし
+	assert results['2026-10-09']['cross_count'] == 0
+
+def test_uneri_without_full_day():
+	data = make_data(0, False)
+	data = data[data['date'].astype(str).isin(['2026-10-02', '2026-10-13'])]
+	assert analyzer_for(data).uneri() == {"error": "分析可能なデータがありません"}
@@ -0,0 +1,338 @@
+"""
+rules.py で定義した採点モデルのテスト（ルール化する前の if 文による判定との一致）
+
+TRINITY_MODEL / BANDWALK_MODEL / EXPANSION_MODEL（indicator_engine）と
+CCI_SCORE_MODEL（company）を、置き換える前の手続き的な判定と同じ入力で突き合わせる。
+指標はどちらもindicators.pyで計算する（pandas_taのない環境でも動くように）。
+
+実行方法:
+	python3 -m pytest test_models.py -q
+"""
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import rsi, bbands, vwap, atr
+from indicator_engine import PricePanel, analyze_panel, evaluate_models
+from company import CCI_SCORE_MODEL
+from rules import latest
+
+# === 置き換える前の判定（swing_analysis / company.calc_cci_score の if 文をそのまま移したもの） ===
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+	"""df.ta.vwap / rsi / bbands / atr と同じ列名で指標を追加"""
+	df = df.copy()
+	high, low, close, volume = (df[c].to_numpy(dtype=float) for c in ('High', 'Low', 'Close', 'Volume'))
+	bands = bbands(close, 20, 2.0)
+	df['VWAP_D'] = vwap(high, low, close, volume)
+	df['RSI_9'] = rsi(close, 9)
+	df['BBL_20_2.0'] = bands['lower']
+	df['BBM_20_2.0'] = bands['mid']
+	df['BBU_20_2.0'] = bands['upper']
+	df['BBB_20_2.0'] = bands['bandwidth']
+	df['ATRr_14'] = atr(high, low, close, 14)
+	return df
+
+def procedural_expected(df: pd.DataFrame):
+	if len(df) < 50:
+		return None
+	latest_row = df.iloc[-1]
+	return {
+		'profit_target': round(latest_row['Close'] + (latest_row['ATRr_14'] * 2.0), 2),
+		'stop_loss': round(latest_row['Close'] - (latest_row['ATRr_14'] * 1.5), 2)
+	}
+
+def procedural_trinity(code: str, df: pd.DataFrame):
+	if len(df) < 50:
+		return None
+	latest_row = df.iloc[-1]
+	prev_day = df.iloc[-2]
+	three_days_ago = df.iloc[-4]
+
+	score = 0
+	if latest_row['Close'] > latest_row['VWAP_D']:
+		score += 20
+	if latest_row['VWAP_D'] > three_days_ago['VWAP_D']:
+		score += 10
+
+	rsi_latest = latest_row['RSI_9']
+	rsi_prev = prev_day['RSI_9']
+	if rsi_latest > rsi_prev:
+		score += 20
+	if rsi_latest < 70:
+		score += 20
+	if rsi_latest > 70:
+		score -= 10
+
+	bb_width = latest_row['BBB_20_2.0']
+	if latest_row['Close'] > latest_row['BBM_20_2.0']:
+		score += 15
+	if bb_width > three_days_ago['BBB_20_2.0']:
+		score += 15
+
+	score = max(0, min(100, score))
+	expected = procedural_expected(df)
+	return {
+		'code': code,
+		'price': round(latest_row['Close'], 2),
+		'score': int(score),
+		'RSI_9': round(rsi_latest, 2),
+		'VWAP': round(latest_row['VWAP_D'], 2),
+		'BB_Width': round(bb_width, 2),
+		'profit_target': expected['profit_target'] if expected else None,
+		'stop_loss': expected['stop_loss'] if expected else None
+	}
+
+def procedural_bandwalk(code: str, df: pd.DataFrame):
+	if len(df) < 25:
+		return None
+	df = df.copy()
+	df['BB_Plus1Sigma'] = df['BBM_20_2.0'] + ((df['BBU_20_2.0'] - df['BBL_20_2.0']) / 4)
+	latest_row, prev_1, prev_2 = df.iloc[-1], df.iloc[-2], df.iloc[-3]
+	condition_a = (
+		latest_row['Close'] > latest_row['BB_Plus1Sigma'] and
+		prev_1['Close'] > prev_1['BB_Plus1Sigma'] and
+		prev_2['Close'] > prev_2['BB_Plus1Sigma']
+	)
+	condition_b = latest_row['BBB_20_2.0'] > df.iloc[-4]['BBB_20_2.0']
+	expected = procedural_expected(df)
+	return {
+		'code': code,
+		'is_bandwalk': bool(condition_a and condition_b),
+		'price': round(latest_row['Close'], 2),
+		'bb_width': round(latest_row['BBB_20_2.0'], 2),
+		'profit_target': expected['profit_target'] if expected else None,
+		'stop_loss': expected['stop_loss'] if expected else None
+	}
+
+def procedural_expansion(code: str, df: pd.DataFrame):
+	if len(df) < 25:
+		return None
+	widths = [df.iloc[-k]['BBB_20_2.0'] for k in range(1, 6)]
+	is_expanding = widths[0] > widths[1] and widths[1] > widths[2] and widths[2] > widths[3] and widths[3] > widths[4]
+	expansion_rate = ((widths[0] - widths[4]) / widths[4] * 100) if widths[4] > 0 else 0
+	expected = procedural_expected(df)
+	return {
+		'code': code,
+		'is_expansion': bool(is_expanding),
+		'price': round(df.iloc[-1]['Close'], 2),
+		'bb_width': round(widths[0], 2),
+		'expansion_rate': round(expansion_rate, 2),
+		'profit_target': expected['profit_target'] if expected else None,
+		'stop_loss': expected['stop_loss'] if expected else None
+	}
+
+def procedural_cci_score(cci_T, cci_T_minus_1, volume_T, volume_sma5_T, open_T, close_T, high_T, low_T) -> int:
+	"""calc_cci_scoreのステップA・C・D（NaNはto_float_or_noneと同じくNoneで渡す）"""
+	total_score = 0
+
+	if cci_T_minus_1 is not None and cci_T is not None:
+		if cci_T > 100:
+			total_score = 5 if cci_T > cci_T_minus_1 else 3
+		elif cci_T < -100:
+			total_score = -5 if cci_T < cci_T_minus_1 else -3
+		elif cci_T_minus_1 < -200 and cci_T >= -200:
+			total_score = 6
+		elif cci_T_minus_1 > 200 and cci_T <= 200:
+			total_score = -6
+		elif cci_T_minus_1 < -100 and cci_T >= -100:
+			total_score = 4
+		elif cci_T_minus_1 > 100 and cci_T <= 100:
+			total_score = -4
+		elif cci_T_minus_1 < 0 and cci_T >= 0:
+			total_score = 3
+		elif cci_T_minus_1 > 0 and cci_T <= 0:
+			total_score = -3
+
+	if volume_T is not None and volume_sma5_T is not None and volume_sma5_T > 0:
+		volume_ratio = volume_T / volume_sma5_T
+	else:
+		volume_ratio = 1.0
+
+	if cci_T > 100:
+		if volume_ratio < 1.0:
+			total_score -= 4
+		elif volume_ratio >= 1.5:
+			total_score += 2
+	elif cci_T < -100:
+		if volume_ratio < 1.0:
+			total_score += 4
+		elif volume_ratio >= 1.5:
+			total_score -= 2
+	elif total_score in [6, 4, 3, -6, -4, -3]:
+		if volume_ratio >= 1.5:
+			if total_score > 0:
+				total_score += 2
+			elif total_score < 0:
+				total_score -= 2
+
+	if (open_T is not None and close_T is not None and
+		high_T is not None and low_T is not None and
+		high_T != low_T):
+		body = abs(close_T - open_T)
+		range_val = high_T - low_T
+		body_ratio = body / range_val
+		if total_score > 0:
+			if (close_T > open_T and body_ratio >= 0.7) or \
+			   (min(open_T, close_T) - low_T) / range_val >= 0.5:
+				total_score += 2
+		elif total_score < 0:
+			if (open_T > close_T and body_ratio >= 0.7) or \
+			   (high_T - max(open_T, close_T)) / range_val >= 0.5:
+				total_score -= 2
+
+	return total_score
+
+# === テストデータ ===
+
+def make_bars(n: int, seed: int, drift: float = 0.0, flat: bool = False) -> pd.DataFrame:
+	"""ランダムな日足（driftで上昇・下落の傾き、flat=Trueなら値動きのない銘柄）"""
+	rng = np.random.default_rng(seed)
+	if flat:
+		close = np.full(n, 1000.0)
+		high = low = close
+	else:
+		close = 1000 + np.cumsum(rng.normal(drift, 10, n))
+		high = close + rng.random(n) * 15
+		low = close - rng.random(n) * 15
+	return pd.DataFrame({
+		'Open': close + (0 if flat else rng.normal(0, 3, n)),
+		'High': high,
+		'Low': low,
+		'Close': close,
+		'Volume': rng.integers(1, 10, n) * 1000.0
+	}, index=pd.bdate_range('2026-01-05', periods=n))
+
+def accelerating_bars(n: int) -> pd.DataFrame:
+	"""終盤に上昇が加速する日足（バンドウォーク・エクスパンションになる）"""
+	close = np.concatenate([1000 + 5 * np.sin(np.arange(n - 8)), 1000 * 1.03 ** np.arange(1, 9)])
+	return pd.DataFrame({
+		'Open': close - 1, 'High': close + 2, 'Low': close - 3, 'Close': close,
+		'Volume': np.full(n, 5000.0)
+	}, index=pd.bdate_range('2026-01-05', periods=n))
+
+# 日数はMIN_BARS（三位一体50日・バンドウォーク/エクスパンション25日）の前後を含める
+PANEL = {
+	'1001': make_bars(24, 1),
+	'1002': make_bars(25, 2),
+	'1003': make_bars(26, 3, drift=3),
+	'1004': make_bars(49, 4),
+	'1005': make_bars(50, 5, drift=-3),
+	'1006': make_bars(51, 6),
+	'1007': make_bars(120, 7, drift=4),
+	'1008': make_bars(60, 8, flat=True),
+	'1009': accelerating_bars(60),
+	'1010': accelerating_bars(30)
+}
+
+def assert_same(actual, expected):
+	"""結果の辞書を比較（NaN同士は等しいとみなす）"""
+	if expected is None:
+		assert actual is None
+		return
+	assert actual is not None and actual.keys() == expected.keys()
+	for key, value in expected.items():
+		if isinstance(value, float) and math.isnan(value):
+			assert math.isnan(actual[key]), key
+		else:
+			assert actual[key] == value, key
+
+# === テスト ===
+
+@pytest.mark.parametrize('code', list(PANEL))
+def test_panel_matches_procedural(code):
+	# 日数の違う銘柄を1つのパネルで判定しても、1銘柄ずつのif文と同じ結果になる
+	results = dict(zip(PANEL, analyze_panel(PANEL, list(PANEL))))
+	df = add_indicators(PANEL[code])
+	trinity, bandwalk, expansion = results[code]
+	assert_same(trinity, procedural_trinity(code, df))
+	assert_same(bandwalk, procedural_bandwalk(code, df))
+	assert_same(expansion, procedural_expansion(code, df))
+
+def test_panel_covers_signals():
+	# 上の比較が「常にFalse」同士の一致にならないこと
+	results = analyze_panel(PANEL, list(PANEL))
+	assert any(bandwalk and bandwalk['is_bandwalk'] for _, bandwalk, _ in results)
+	assert any(expansion and expansion['is_expansion'] for _, _, expansion in results)
+	assert len({trinity['score'] for trinity, _, _ in results if trinity}) > 1
+
+# 閾値ちょうど・前日と同じ値（比較の不等号の向き）を含む最新5日分の指標
+TIE_CASES = {
+	'rsi_70': {'RSI_9': [60, 60, 60, 65, 70]},
+	'rsi_flat': {'RSI_9': [50, 50, 50, 50, 50]},
+	'rsi_nan': {'RSI_9': [np.nan] * 5},
+	'close_eq_vwap': {'VWAP_D': [100, 100, 100, 100, 100]},
+	'vwap_eq_3d': {'VWAP_D': [90, 95, 91, 92, 95]},
+	'close_eq_bbm': {'BBM_20_2.0': [100, 100, 100, 100, 100]},
+	'bbb_eq_3d': {'BBB_20_2.0': [10, 12, 11, 13, 12]},
+	'bbb_streak_tie': {'BBB_20_2.0': [10, 11, 12, 12, 13]},
+	'bbb_streak': {'BBB_20_2.0': [10, 11, 12, 13, 14]},
+	'bbb_zero_base': {'BBB_20_2.0': [0, 1, 2, 3, 4]},
+	'plus1sigma_tie': {'BBM_20_2.0': [90, 90, 90, 90, 90], 'BBU_20_2.0': [120, 120, 120, 120, 120],
+	                   'BBL_20_2.0': [80, 80, 80, 80, 80], 'Close': [100, 101, 100, 102, 103]},
+	'plus1sigma_above': {'BBM_20_2.0': [90, 90, 90, 90, 90], 'BBU_20_2.0': [120, 120, 120, 120, 120],
+	                     'BBL_20_2.0': [80, 80, 80, 80, 80], 'Close': [100, 101, 101, 102, 103],
+	                     'BBB_20_2.0': [10, 11, 12, 13, 14]}
+}
+
+def tie_frame(overrides: dict, n: int) -> pd.DataFrame:
+	"""指標の列を直接与えたn日分のデータ（最新5日だけoverridesの値）"""
+	base = {
+		'Open': 100.0, 'High': 105.0, 'Low': 95.0, 'Close': 100.0, 'Volume': 1000.0,
+		'VWAP_D': 98.0, 'RSI_9': 55.0, 'BBL_20_2.0': 90.0, 'BBM_20_2.0': 99.0,
+		'BBU_20_2.0': 108.0, 'BBB_20_2.0': 18.0, 'ATRr_14': 3.0
+	}
+	df = pd.DataFrame({column: np.full(n, value) for column, value in base.items()},
+	                  index=pd.bdate_range('2026-01-05', periods=n))
+	for column, values in overrides.items():
+		df.iloc[-5:, df.columns.get_loc(column)] = values
+	return df
+
+@pytest.mark.parametrize('n', [24, 25, 49, 50])
+@pytest.mark.parametrize('case', list(TIE_CASES))
+def test_models_at_thresholds(case, n):
+	df = tie_frame(TIE_CASES[case], n)
+	arrays = {column: df[column].to_numpy(dtype=float)[np.newaxis, :] for column in df.columns}
+	panel = PricePanel(['9999'], arrays['Open'], arrays['High'], arrays['Low'],
+	                   arrays['Close'], arrays['Volume'], np.array([n]))
+	ind = {column: arrays[column] for column in
+	       ('VWAP_D', 'RSI_9', 'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'ATRr_14')}
+	trinity, bandwalk, expansion = evaluate_models(panel, ind)['9999']
+	assert_same(trinity, procedural_trinity('9999', df))
+	assert_same(bandwalk, procedural_bandwalk('9999', df))
+	assert_same(expansion, procedural_expansion('9999', df))
+
+# CCIの各ライン（±100・±200・0）ちょうどとその前後
+CCI_LEVELS = [-250.0, -200.0, -150.0, -100.0, -50.0, 0.0, 50.0, 100.0, 150.0, 200.0, 250.0]
+# (出来高, 5日平均) → 出来高比率 0.5 / 1.0 / 1.5 / 2.0 と、出来高なし・平均0
+VOLUMES = [(500.0, 1000.0), (1000.0, 1000.0), (1500.0, 1000.0), (2000.0, 1000.0), (np.nan, 1000.0), (1000.0, 0.0)]
+# (始値, 終値, 高値, 安値) → 大陽線・大陰線・下ヒゲ・上ヒゲ・実体比率0.7ちょうど・高値=安値・小さい足
+CANDLES = [(100, 108, 110, 99), (108, 100, 110, 99), (105, 106, 107, 95), (95, 94, 107, 93),
+           (100, 107, 110, 100), (100, 100, 100, 100), (100, 101, 104, 96)]
+
+def cci_cases():
+	for cci in CCI_LEVELS:
+		for previous in CCI_LEVELS + [np.nan]:
+			for volume in VOLUMES:
+				for candle in CANDLES:
+					yield cci, previous, volume, candle
+
+def test_cci_score_model_matches_procedural():
+	cases = list(cci_cases())
+	# 1行1ケース、列は (前日, 当日)
+	cci = np.array([[previous, value] for value, previous, _, _ in cases])
+	volume = np.array([[1000.0, v] for _, _, (v, _), _ in cases])
+	volume_sma5 = np.array([[1000.0, s] for _, _, (_, s), _ in cases])
+	candles = np.array([candle for _, _, _, candle in cases], dtype=float)
+	env = {'CCI': cci, 'Volume': volume, 'Volume_SMA5': volume_sma5}
+	for k, column in enumerate(('Open', 'Close', 'High', 'Low')):
+		env[column] = np.column_stack([np.full(len(cases), 100.0), candles[:, k]])
+
+	scores = latest(CCI_SCORE_MODEL.evaluate(env))
+
+	def none_if_nan(value):
+		return None if math.isnan(value) else float(value)
+
+	for i, (value, previous, (v, s), (o, c, h, l)) in enumerate(cases):
+		expected = procedural_cci_score(value, none_if_nan(previous), none_if_nan(v), s, o, c, h, l)
+		assert int(scores[i]) == expected, cases[i]
@@ -0,0 +1,69 @@
+"""
+swing_analysis.py の起動時間のテスト（python -X importtime で計測）
+
+cronの休場日判定とIndividual.phpからの起動は毎回新しいプロセスで行われるため、
+モジュールの読み込みだけでpandas・yfinanceなどの重いモジュールを読み込まないことを確認する。
+
+実行方法:
+	python3 -m pytest test_startup_time.py -q
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# swing_analysis の読み込みにかけてよい時間（マイクロ秒、importtimeの累計）
+IMPORT_BUDGET_US = 50_000
+
+# 起動時に読み込んではいけないモジュール
+HEAVY_MODULES = ['pandas', 'numpy', 'yfinance', 'pandas_ta', 'bs4', 'lxml', 'requests']
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+	return subprocess.run(
+		[sys.executable, *args],
+		cwd=ROOT,
+		capture_output=True,
+		text=True,
+		timeout=60
+	)
+
+def parse_importtime(stderr: str) -> dict:
+	"""-X importtime の出力を モジュール名 → 累計時間（マイクロ秒） に変換"""
+	times = {}
+	for line in stderr.splitlines():
+		if not line.startswith('import time:'):
+			continue
+		_, cumulative, name = line[len('import time:'):].split('|')
+		if cumulative.strip().isdigit():
+			times[name.strip()] = int(cumulative)
+	return times
+
+def test_import_is_light():
+	result = run_python('-X', 'importtime', '-c', 'import swing_analysis')
+	assert result.returncode == 0, result.stderr
+
+	times = parse_importtime(result.stderr)
+	loaded = [name for name in HEAVY_MODULES if name in times]
+	assert not loaded, f"起動時に重いモジュールを読み込んでいます: {loaded}"
+	assert times['swing_analysis'] < IMPORT_BUDGET_US, \
+		f"swing_analysis の読み込みに {times['swing_analysis']}us かかっています（上限 {IMPORT_BUDGET_US}us）"
+
+def test_holiday_exit_skips_heavy_imports():
+	# 元日（休場日）としてバッチ分析を起動し、判定だけで終了することを確認
+	code = '\n'.join([
+		'import sys, datetime',
+		'import swing_analysis',
+		'class Holiday(datetime.date):',
+		'	@classmethod',
+		'	def today(cls):',
+		'		return cls(2026, 1, 1)',
+		'swing_analysis.date = Holiday',
+		"sys.argv = ['swing_analysis.py']",
+		'swing_analysis.main()',
+		"print('loaded:', sorted(m for m in %r if m in sys.modules))" % HEAVY_MODULES
+	])
+	result = run_python('-c', code)
+	assert result.returncode == 0, result.stderr
+	assert '休場日' in result.stdout
+	assert 'loaded: []' in result.stdout
@@ -0,0 +1,50 @@
+"""
+trading_calendar.py のテスト（期間を広げる作り直しと、並行して参照するスレッド）
+
+実行方法:
+	python3 -m pytest test_trading_calendar.py -q
+"""
+import threading
+from datetime import date
+from trading_calendar import TradingCalendar, build_calendar
+
+# 2015〜2030年を一度に作った、作り直しのない参照用カレンダー
+REFERENCE = build_calendar(2015, 2030)
+
+def expected_previous(target_date: date, n: int):
+	end = REFERENCE.count(date.fromordinal(target_date.toordinal() - 1))
+	return REFERENCE.sessions[end - n:end]
+
+def test_widening_keeps_answers():
+	calendar = TradingCalendar(2026, 2026)
+	assert calendar.previous_n_sessions(date(2026, 1, 6), 3) == expected_previous(date(2026, 1, 6), 3)
+	assert calendar.first_year == 2025
+	assert calendar.next_session(date(2026, 12, 30)) == date(2027, 1, 4)
+	assert calendar.last_year == 2027
+	assert calendar.sessions_in_range(date(2020, 12, 28), date(2021, 1, 6)) == [
+		s for s in REFERENCE.sessions if date(2020, 12, 28) <= s <= date(2021, 1, 6)
+	]
+	assert (calendar.first_year, calendar.last_year) == (2020, 2027)
+
+def test_concurrent_widening():
+	# 過去・未来の両方向に広げるスレッドと参照するスレッドが、番号の振り直し途中の状態を見ないこと
+	calendar = TradingCalendar(2026, 2026)
+	errors = []
+
+	def worker(k: int):
+		try:
+			for i in range(40):
+				year = 2016 + (k * 7 + i) % 14
+				target = date(year, 6, 10)
+				assert calendar.previous_n_sessions(target, 250) == expected_previous(target, 250)
+				assert calendar.is_session(target) == (target in REFERENCE.sessions)
+				assert calendar.next_session(target) == REFERENCE.sessions[REFERENCE.count(target)]
+		except AssertionError as e:
+			errors.append(e)
+
+	threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert not errors
@@ -0,0 +1,149 @@
+"""
+東証の営業日カレンダー
+
+土日・日本の祝日・年末年始（12月31日〜1月3日）を除いた営業日を、対象期間の分だけ最初に一度だけ計算する。
+日付ごとに「その日以前の最後の営業日の番号」を持つ配列を作っておくため、
+営業日の判定・n営業日前・次の営業日はいずれも配列の参照だけで求まる（祝日の集合を毎回作り直さない）。
+期間外の日付が指定された場合は、その年を含むように作り直す。
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional
+
+# 最初に計算する期間（今年の前後の年数、cronの休場日判定で待たせないよう短めにして必要に応じて広げる）
+DEFAULT_YEARS_BACK = 5
+DEFAULT_YEARS_AHEAD = 2
+
+def is_year_end_holiday(target_date: date) -> bool:
+	"""年末年始の休場日（12月31日〜1月3日）かどうか"""
+	return (target_date.month == 12 and target_date.day >= 31) or \
+	       (target_date.month == 1 and target_date.day <= 3)
+
+@dataclass(frozen=True)
+class CalendarState:
+	"""計算済みの期間と配列（作り直すときは丸ごと差し替え、途中の状態は見せない）"""
+	first_year: int
+	last_year: int
+	first_ordinal: int
+	# 日付ごとの、その日以前（当日を含む）の営業日の数
+	counts: List[int]
+	sessions: List[date]
+
+	def covers(self, dates) -> bool:
+		"""すべての日付が期間内かどうか"""
+		return all(self.first_year <= d.year <= self.last_year for d in dates)
+
+	def count(self, target_date: date) -> int:
+		"""target_date以前（当日を含む）の営業日の数"""
+		return self.counts[target_date.toordinal() - self.first_ordinal]
+
+def build_calendar(first_year: int, last_year: int) -> CalendarState:
+	"""first_year〜last_yearの営業日の配列と、日付 → その日以前の営業日の数 の配列を作る"""
+	import holidays
+
+	jp_holidays = holidays.Japan(years=range(first_year, last_year + 1))
+	first = date(first_year, 1, 1)
+	last = date(last_year, 12, 31)
+
+	sessions = []
+	counts = []
+	day = first
+	while day <= last:
+		if day.weekday() < 5 and day not in jp_holidays and not is_year_end_holiday(day):
+			sessions.append(day)
+		counts.append(len(sessions))
+		day += timedelta(days=1)
+
+	return CalendarState(first_year, last_year, first.toordinal(), counts, sessions)
+
+class TradingCalendar:
+	"""東証の営業日カレンダー"""
+
+	def __init__(self, first_year: Optional[int] = None, last_year: Optional[int] = None):
+		"""
+		Args:
+			first_year: 計算する最初の年（省略時は今年からDEFAULT_YEARS_BACK年前）
+			last_year: 計算する最後の年（省略時は今年からDEFAULT_YEARS_AHEAD年後）
+		"""
+		self._initial_years = (first_year or date.today().year - DEFAULT_YEARS_BACK,
+		                       last_year or date.today().year + DEFAULT_YEARS_AHEAD)
+		self._lock = threading.Lock()
+		self._state: Optional[CalendarState] = None
+
+	@property
+	def first_year(self) -> int:
+		"""計算する期間の最初の年"""
+		return self._state.first_year if self._state else self._initial_years[0]
+
+	@property
+	def last_year(self) -> int:
+		"""計算する期間の最後の年"""
+		return self._state.last_year if self._state else self._initial_years[1]
+
+	def _ensure(self, *dates: date) -> CalendarState:
+		"""
+		指定した日付をすべて含む期間のカレンダーを用意（範囲を広げると営業日の番号は振り直される）
+
+		Returns:
+			用意したカレンダー（番号の振り直しと混ざらないよう、呼び出し側はこの1つだけを参照する）
+		"""
+		state = self._state
+		if state is not None and state.covers(dates):
+			return state
+		with self._lock:
+			state = self._state
+			if state is not None and state.covers(dates):
+				return state
+			first_year, last_year = (state.first_year, state.last_year) if state else self._initial_years
+			# ローカル変数に作ってから、期間と配列をまとめて差し替える
+			state = build_calendar(min([first_year] + [d.year for d in dates]),
+			                       max([last_year] + [d.year for d in dates]))
+			self._state = state
+			return state
+
+	def is_session(self, target_date: date) -> bool:
+		"""営業日かどうか"""
+		state = self._ensure(target_date)
+		count = state.count(target_date)
+		return count > 0 and state.sessions[count - 1] == target_date
+
+	def session_on_or_before(self, target_date: date) -> date:
+		"""target_date以前（当日を含む）の最後の営業日"""
+		return self.previous_n_sessions(target_date + timedelta(days=1), 1)[0]
+
+	def previous_session(self, target_date: date) -> date:
+		"""target_dateより前の最後の営業日"""
+		return self.previous_n_sessions(target_date, 1)[0]
+
+	def previous_n_sessions(self, target_date: date, n: int) -> List[date]:
+		"""
+		target_dateより前のn営業日（古い順、当日は含まない）
+
+		例: 当日を含めない10営業日分の5分足を取るときの期間
+		"""
+		day = target_date - timedelta(days=1)
+		state = self._ensure(day)
+		while state.count(day) < n:
+			# 期間の先頭より前にさかのぼる場合は前の年まで広げる
+			state = self._ensure(day, date(state.first_year - 1, 1, 1))
+		end = state.count(day)
+		return state.sessions[end - n:end]
+
+	def next_session(self, target_date: date) -> date:
+		"""target_dateより後の最初の営業日"""
+		state = self._ensure(target_date)
+		while state.count(target_date) >= len(state.sessions):
+			# 期間の末尾より後の場合は次の年まで広げる
+			state = self._ensure(target_date, date(state.last_year + 1, 1, 1))
+		return state.sessions[state.count(target_date)]
+
+	def sessions_in_range(self, start: date, end: date) -> List[date]:
+		"""start〜end（両端を含む）の営業日"""
+		if end < start:
+			return []
+		state = self._ensure(start - timedelta(days=1), end)
+		return state.sessions[state.count(start - timedelta(days=1)):state.count(end)]
+
+# プロセス内で共有するカレンダー（最初の利用時に計算）
+tse_calendar = TradingCalendar()